@@ -0,0 +1,176 @@
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+import telemetry
+
+# =======================================
+# Configuration
+# =======================================
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+MAX_RETRIES = 5
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+
+
+def parse_retry_after(value):
+    """
+    Parses a Retry-After header (delay in seconds or HTTP date) into seconds, or None.
+    """
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at rate_per_minute, holding at most
+    one minute's worth of tokens. A rate of None disables the bucket.
+    """
+
+    def __init__(self, rate_per_minute):
+        self.rate_per_minute = rate_per_minute
+        self.capacity = rate_per_minute
+        self.tokens = rate_per_minute
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount=1):
+        """
+        Blocks until amount tokens are available, then takes them.
+        Returns the number of seconds spent waiting.
+        """
+        if not self.rate_per_minute:
+            return 0.0
+        # A single request larger than the bucket would never fit; let it through on a full bucket.
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate_per_minute / 60.0)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                delay = (amount - self.tokens) * 60.0 / self.rate_per_minute
+            time.sleep(delay)
+            waited += delay
+
+
+class CallMetrics:
+    """
+    Per-provider counters: calls, successes, failures, retries, throttling time and latencies.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.successes = 0
+        self.failures = 0
+        self.retries = 0
+        self.throttled_seconds = 0.0
+        self.latencies = []
+        self._lock = threading.Lock()
+
+    def record(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def record_latency(self, seconds):
+        with self._lock:
+            self.latencies.append(seconds)
+
+    def summary(self):
+        with self._lock:
+            latencies = sorted(self.latencies)
+            summary = {
+                "calls": self.calls,
+                "successes": self.successes,
+                "failures": self.failures,
+                "retries": self.retries,
+                "throttled_seconds": round(self.throttled_seconds, 3)
+            }
+        if latencies:
+            summary["latency_p50"] = round(latencies[len(latencies) // 2], 3)
+            summary["latency_p95"] = round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3)
+            summary["latency_max"] = round(latencies[-1], 3)
+        return summary
+
+
+class CallPolicy:
+    """
+    Retry and rate-limit policy shared by the provider clients.
+    Before each attempt the request and token buckets are charged; retryable failures
+    (see classify) are retried with exponential backoff and full jitter, waiting at least
+    as long as the server's Retry-After.
+    """
+
+    def __init__(self, name, classify, max_retries=MAX_RETRIES, backoff_base=BACKOFF_BASE_SECONDS,
+                 backoff_max=BACKOFF_MAX_SECONDS, requests_per_minute=None, tokens_per_minute=None):
+        self.name = name
+        self.classify = classify
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.metrics = CallMetrics()
+
+    def backoff(self, attempt, retry_after=None):
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def call(self, func, estimated_tokens=0, consume=None):
+        """
+        Runs func() under the policy and returns its result.
+        Non-retryable errors, and retryable ones once retries are exhausted, are re-raised.
+        With consume, the result is passed through consume() (e.g. reading a streamed response)
+        inside the timed call, so the recorded latency covers the whole response and not just its
+        headers. consume() is not retried, since part of the response may have been handed on.
+        """
+        self.metrics.record(calls=1)
+        attempt = 0
+        while True:
+            waited = self.request_bucket.acquire(1) + self.token_bucket.acquire(estimated_tokens)
+            if waited:
+                self.metrics.record(throttled_seconds=waited)
+                telemetry.count("throttled_seconds", waited, provider=self.name)
+            start = time.perf_counter()
+            try:
+                result = func()
+            except Exception as e:
+                self.metrics.record_latency(time.perf_counter() - start)
+                retryable, retry_after = self.classify(e)
+                if not retryable or attempt >= self.max_retries:
+                    self.metrics.record(failures=1)
+                    telemetry.count("call_failures", provider=self.name)
+                    raise
+                delay = self.backoff(attempt, retry_after)
+                print(f"{self.name} call failed ({e}); retrying in {delay:.1f}s "
+                      f"(attempt {attempt + 1} of {self.max_retries}).")
+                self.metrics.record(retries=1)
+                telemetry.count("retries", provider=self.name)
+                time.sleep(delay)
+                attempt += 1
+                continue
+            if consume is not None:
+                try:
+                    result = consume(result)
+                except Exception:
+                    self.metrics.record_latency(time.perf_counter() - start)
+                    self.metrics.record(failures=1)
+                    telemetry.count("call_failures", provider=self.name)
+                    raise
+            self.metrics.record_latency(time.perf_counter() - start)
+            self.metrics.record(successes=1)
+            return result
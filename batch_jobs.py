@@ -0,0 +1,425 @@
+import os
+import sys
+import json
+import time
+import uuid
+import shutil
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import requests
+import openai
+import bias_detection
+from api_policy import CallPolicy, parse_retry_after
+from checkpoint import Journal, text_hash
+from ranking_backends import REQUEST_TIMEOUT_SECONDS, ChatAPIError, OpenAIBackend, classify_http_error
+
+# =======================================
+# Configuration
+# =======================================
+BATCH_JOB_DIR = "batch_jobs"
+# Directory of the file-based stand-in for the batch service.
+LOCAL_SERVICE_DIR = os.path.join(BATCH_JOB_DIR, "service")
+OPENAI_BASE_URL = os.environ.get("OPENAI_BASE_URL", "https://api.openai.com")
+COMPLETION_WINDOW = "24h"
+POLL_INTERVAL_SECONDS = 60
+# Batch statuses after which a job no longer changes.
+FINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+MANIFEST_FILE = "manifest.json"
+JOBS_FILE = "jobs.json"
+
+
+# =======================================
+# Request IDs
+# =======================================
+
+def make_custom_id(provider, domain, window):
+    """
+    custom_id of one request: provider, domain and window index (or "single" for a domain
+    ranked with a single prompt), separated by slashes.
+    """
+    return f"{provider}/{domain}/{window}"
+
+def parse_custom_id(custom_id):
+    """
+    Returns (provider, domain, window) for a custom_id; window is None for a single-prompt domain.
+    """
+    provider, domain, window = custom_id.split("/")
+    return provider, domain, None if window == "single" else int(window)
+
+
+# =======================================
+# Batch Services
+# =======================================
+class OpenAIBatchService:
+    """
+    OpenAI Batch API: the request file is uploaded, run within COMPLETION_WINDOW at the
+    discounted batch price, and the output and error files are downloaded once it completes.
+    """
+    name = "openai"
+
+    def __init__(self, api_key=None, base_url=OPENAI_BASE_URL, policy=None):
+        self.api_key = api_key or openai.api_key or os.environ.get("OPENAI_API_KEY", "")
+        self.base_url = base_url.rstrip("/")
+        self.session = requests.Session()
+        self.policy = policy or CallPolicy("OpenAI Batch", classify_http_error)
+
+    def supports(self, backend):
+        return isinstance(backend, OpenAIBackend)
+
+    def _request(self, method, path, **kwargs):
+        def send():
+            response = self.session.request(
+                method, f"{self.base_url}{path}", headers={"Authorization": f"Bearer {self.api_key}"},
+                timeout=REQUEST_TIMEOUT_SECONDS, **kwargs
+            )
+            if response.status_code == 200:
+                return response
+            raise ChatAPIError("OpenAI Batch", response.status_code, response.text,
+                               parse_retry_after(response.headers.get("Retry-After")))
+        return self.policy.call(send)
+
+    def submit(self, input_path, metadata):
+        with open(input_path, "rb") as f:
+            uploaded = self._request("POST", "/v1/files", files={"file": f}, data={"purpose": "batch"}).json()
+        batch = self._request("POST", "/v1/batches", json={
+            "input_file_id": uploaded["id"],
+            "endpoint": "/v1/chat/completions",
+            "completion_window": COMPLETION_WINDOW,
+            "metadata": metadata
+        }).json()
+        return batch["id"]
+
+    def status(self, batch_id):
+        return self._request("GET", f"/v1/batches/{batch_id}").json()
+
+    def download(self, batch_id, output_path):
+        """
+        Writes the batch's output file, followed by its error file if any, to output_path.
+        """
+        batch = self.status(batch_id)
+        with open(output_path, "wb") as out:
+            for file_id in (batch.get("output_file_id"), batch.get("error_file_id")):
+                if file_id:
+                    out.write(self._request("GET", f"/v1/files/{file_id}/content").content)
+
+class LocalBatchService:
+    """
+    File-based stand-in for the batch service. A submitted batch is copied into its own
+    directory under root and stays in_progress for delay seconds; the first status check after
+    that runs every request through the configured ranking backend of its provider and writes
+    an output file in the OpenAI batch output format.
+    """
+    name = "local"
+
+    def __init__(self, root=LOCAL_SERVICE_DIR, delay=0.0, workers=4):
+        self.root = root
+        self.delay = delay
+        self.workers = workers
+
+    def supports(self, backend):
+        return True
+
+    def _batch_dir(self, batch_id):
+        return os.path.join(self.root, batch_id)
+
+    def _read(self, batch_id):
+        with open(os.path.join(self._batch_dir(batch_id), "batch.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write(self, batch):
+        path = os.path.join(self._batch_dir(batch["id"]), "batch.json")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(batch, f, indent=4)
+        os.replace(path + ".tmp", path)
+
+    def submit(self, input_path, metadata):
+        batch_id = f"batch_{uuid.uuid4().hex}"
+        os.makedirs(self._batch_dir(batch_id))
+        shutil.copyfile(input_path, os.path.join(self._batch_dir(batch_id), "input.jsonl"))
+        self._write({"id": batch_id, "status": "in_progress", "created_at": time.time(), "metadata": metadata})
+        return batch_id
+
+    def status(self, batch_id):
+        batch = self._read(batch_id)
+        if batch["status"] == "in_progress" and time.time() - batch["created_at"] >= self.delay:
+            batch = self._run(batch)
+        return batch
+
+    def _run(self, batch):
+        backend = bias_detection.backends[batch["metadata"]["provider"]]
+        batch_dir = self._batch_dir(batch["id"])
+        with open(os.path.join(batch_dir, "input.jsonl"), "r", encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f if line.strip()]
+
+        def complete(line):
+            try:
+                content = backend.complete(line["body"]["messages"])
+            except Exception as e:
+                return {"id": f"batch_req_{uuid.uuid4().hex}", "custom_id": line["custom_id"], "response": None,
+                        "error": {"code": type(e).__name__, "message": str(e)}}
+            body = {"object": "chat.completion", "model": line["body"]["model"],
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}]}
+            return {"id": f"batch_req_{uuid.uuid4().hex}", "custom_id": line["custom_id"],
+                    "response": {"status_code": 200, "request_id": uuid.uuid4().hex, "body": body}, "error": None}
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            results = list(executor.map(complete, lines))
+        with open(os.path.join(batch_dir, "output.jsonl"), "w", encoding="utf-8") as f:
+            for result in results:
+                f.write(json.dumps(result) + "\n")
+        failed = sum(1 for result in results if result["error"])
+        batch.update(status="completed", completed_at=time.time(),
+                     request_counts={"total": len(results), "completed": len(results) - failed, "failed": failed})
+        self._write(batch)
+        return batch
+
+    def download(self, batch_id, output_path):
+        shutil.copyfile(os.path.join(self._batch_dir(batch_id), "output.jsonl"), output_path)
+
+
+# =======================================
+# Stages
+# =======================================
+
+def read_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def write_json(path, data):
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4)
+    os.replace(path + ".tmp", path)
+
+def configure(ranking_argv):
+    """
+    Configures bias_detection (batching, ranking-only mode, backends) from its command-line options.
+    """
+    args = bias_detection.parse_args(ranking_argv)
+    if args.strategy == "tournament":
+        raise SystemExit("The tournament strategy picks each round from the previous one and cannot run as a batch job.")
+    bias_detection.configure_batching(args)
+    bias_detection.configure_streaming(args)
+    bias_detection.configure_backends(args)
+    return args
+
+def prepare(job_dir, ranking_argv):
+    """
+    Writes one OpenAI Batch-style request file per provider, with a request for every window of
+    every domain, and a manifest mapping each custom_id to its domain, provider, window, the
+    candidates in it and its key in the bias_detection journal.
+    """
+    args = configure(ranking_argv)
+    grouped_candidates = bias_detection.group_candidates_by_domain(bias_detection.load_candidates(args))
+    os.makedirs(job_dir, exist_ok=True)
+    manifest = {"ranking_argv": ranking_argv, "requests": {}}
+    counts = {}
+    for provider, backend in bias_detection.backends.items():
+        input_path = os.path.join(job_dir, f"{provider}_requests.jsonl")
+        with open(input_path, "w", encoding="utf-8") as f:
+            for domain in bias_detection.categories:
+                domain_upper = domain.upper()
+                domain_candidates = grouped_candidates.get(domain_upper, [])
+                if not domain_candidates:
+                    continue
+                job_desc, requirements = bias_detection.get_job_details(domain)
+                journal_prefix = f"{backend.name}/{backend.model}/{domain_upper}/"
+                if len(domain_candidates) > bias_detection.BATCH_SIZE:
+                    windows = list(enumerate(bias_detection.make_domain_batches(job_desc, requirements, domain_candidates)))
+                else:
+                    windows = [("single", domain_candidates)]
+                for window, batch in windows:
+                    prompt = bias_detection.construct_prompt(job_desc, requirements, batch)
+                    custom_id = make_custom_id(provider, domain_upper, window)
+                    f.write(json.dumps({
+                        "custom_id": custom_id,
+                        "method": "POST",
+                        "url": "/v1/chat/completions",
+                        "body": {
+                            "model": backend.model,
+                            "messages": [
+                                {"role": "system", "content": bias_detection.SYSTEM_MESSAGE},
+                                {"role": "user", "content": prompt}
+                            ],
+                            "temperature": backend.temperature
+                        }
+                    }) + "\n")
+                    manifest["requests"][custom_id] = {
+                        "files": [cand.get("file_name") for cand in batch],
+                        "journal_key": journal_prefix + ("single/" if window == "single" else "") + text_hash(prompt)
+                    }
+                    counts[provider] = counts.get(provider, 0) + 1
+        print(f"Prepared {counts.get(provider, 0)} {provider} requests in {input_path}")
+    write_json(os.path.join(job_dir, MANIFEST_FILE), manifest)
+
+def make_service(name, service_dir=LOCAL_SERVICE_DIR, delay=0.0):
+    if name == "openai":
+        return OpenAIBatchService()
+    return LocalBatchService(service_dir, delay)
+
+def submit(job_dir, service):
+    """
+    Submits every prepared request file the service can run, and records the batch IDs in jobs.json.
+    """
+    manifest = read_json(os.path.join(job_dir, MANIFEST_FILE))
+    configure(manifest["ranking_argv"])
+    jobs_path = os.path.join(job_dir, JOBS_FILE)
+    jobs = read_json(jobs_path) if os.path.exists(jobs_path) else {}
+    for provider, backend in bias_detection.backends.items():
+        if provider in jobs:
+            print(f"{provider} already submitted as {jobs[provider]['batch_id']}. Skipping.")
+            continue
+        if not service.supports(backend):
+            print(f"The {service.name} batch service cannot run {provider} requests. Skipping.")
+            continue
+        input_path = os.path.join(job_dir, f"{provider}_requests.jsonl")
+        batch_id = service.submit(input_path, {"provider": provider})
+        jobs[provider] = {"service": service.name, "batch_id": batch_id, "status": "submitted"}
+        write_json(jobs_path, jobs)
+        print(f"Submitted {provider} requests as {batch_id}")
+
+def poll(job_dir, service_dir=LOCAL_SERVICE_DIR, service_delay=0.0, wait=False, interval=POLL_INTERVAL_SECONDS):
+    """
+    Checks every submitted job with the service it was submitted to and downloads the results of completed ones to <provider>_results.jsonl.
+    With wait, keeps polling every interval seconds until all jobs have finished.
+    Returns True once every job has finished.
+    """
+    manifest = read_json(os.path.join(job_dir, MANIFEST_FILE))
+    configure(manifest["ranking_argv"])
+    jobs_path = os.path.join(job_dir, JOBS_FILE)
+    jobs = read_json(jobs_path)
+    while True:
+        for provider, job in jobs.items():
+            if job["status"] in FINAL_STATUSES:
+                continue
+            service = make_service(job["service"], service_dir, service_delay)
+            batch = service.status(job["batch_id"])
+            job["status"] = batch["status"]
+            job["request_counts"] = batch.get("request_counts")
+            if job["status"] == "completed":
+                job["output_file"] = os.path.join(job_dir, f"{provider}_results.jsonl")
+                service.download(job["batch_id"], job["output_file"])
+            print(f"{provider} ({job['batch_id']}): {job['status']} {job['request_counts'] or ''}")
+        write_json(jobs_path, jobs)
+        finished = all(job["status"] in FINAL_STATUSES for job in jobs.values())
+        if finished or not wait:
+            return finished
+        time.sleep(interval)
+
+def read_results(path):
+    """
+    Yields (custom_id, response text or None, error) for every line of a batch output file.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            response = result.get("response") or {}
+            if response.get("status_code") == 200:
+                yield result["custom_id"], response["body"]["choices"][0]["message"]["content"], None
+            else:
+                yield result["custom_id"], None, result.get("error") or response.get("body")
+
+def ingest(job_dir, journal_path=bias_detection.JOURNAL_FILE):
+    """
+    Maps every result back to its (domain, provider, window), merges each domain's windows in
+    window order with merge_batch_rankings and saves <provider>_<DOMAIN>_global_ranking.json,
+    as an interactive run would. Completed windows are also appended to the bias_detection
+    journal, so an interactive run only sends the windows that failed or are missing.
+    """
+    manifest = read_json(os.path.join(job_dir, MANIFEST_FILE))
+    configure(manifest["ranking_argv"])
+    jobs = read_json(os.path.join(job_dir, JOBS_FILE))
+    journal = Journal(journal_path) if journal_path else None
+    windows = {}
+    singles = {}
+    try:
+        for provider, job in jobs.items():
+            if job["status"] != "completed":
+                print(f"{provider} ({job['batch_id']}) is {job['status']}. Skipping.")
+                continue
+            for custom_id, content, error in read_results(job["output_file"]):
+                request = manifest["requests"].get(custom_id)
+                if request is None:
+                    print(f"Unknown custom_id {custom_id} in {job['output_file']}. Skipping.")
+                    continue
+                _, domain, window = parse_custom_id(custom_id)
+                if content is None:
+                    print(f"Request {custom_id} failed: {error}")
+                    continue
+                if window is None:
+                    singles[(provider, domain)] = content
+                    if journal is not None and request["journal_key"] not in journal:
+                        journal.append(request["journal_key"], content)
+                    continue
+                parsed = bias_detection.parse_response(content)
+                if not parsed.get("ranking"):
+                    continue
+                if journal is not None and request["journal_key"] not in journal:
+                    journal.append(request["journal_key"], parsed)
+                windows.setdefault((provider, domain), []).append((window, parsed))
+    finally:
+        if journal is not None:
+            journal.close()
+
+    expected = {}
+    for custom_id in manifest["requests"]:
+        provider, domain, window = parse_custom_id(custom_id)
+        if window is not None:
+            expected[(provider, domain)] = expected.get((provider, domain), 0) + 1
+    for (provider, domain), responses in sorted(windows.items()):
+        if len(responses) < expected[(provider, domain)]:
+            print(f"{provider} / {domain}: {expected[(provider, domain)] - len(responses)} of "
+                  f"{expected[(provider, domain)]} windows missing; merging the rest.")
+        batch_responses = [parsed for _, parsed in sorted(responses, key=lambda item: item[0])]
+        global_ranking = bias_detection.merge_batch_rankings(batch_responses, bias_detection.BATCH_SIZE)
+        bias_detection.save_results(f"{provider}_{domain}_global_ranking.json", global_ranking)
+    for (provider, domain), content in sorted(singles.items()):
+        try:
+            ranking = json.loads(content)
+        except Exception as e:
+            print(f"Error parsing {provider} ranking:", e)
+            ranking = {}
+        bias_detection.save_results(f"{provider}_{domain}_global_ranking.json", ranking)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Rank candidates through provider batch jobs: prepare, submit, poll and ingest.",
+        epilog="prepare accepts the batching and backend options of bias_detection.py after the job options."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    prepare_parser = subparsers.add_parser("prepare", help="Write the request files and the custom_id manifest.")
+    submit_parser = subparsers.add_parser("submit", help="Submit the request files to the batch service.")
+    poll_parser = subparsers.add_parser("poll", help="Check the jobs and download finished results.")
+    ingest_parser = subparsers.add_parser("ingest", help="Merge the results into global rankings.")
+    for subparser in (prepare_parser, submit_parser, poll_parser, ingest_parser):
+        subparser.add_argument("--dir", default=BATCH_JOB_DIR, help="Directory of the request, job and result files.")
+    submit_parser.add_argument("--service", choices=("openai", "local"), default="openai",
+                               help="OpenAI Batch API, or the file-based local stand-in.")
+    for subparser in (submit_parser, poll_parser):
+        subparser.add_argument("--service-dir", default=LOCAL_SERVICE_DIR,
+                               help="Directory of the local stand-in service.")
+        subparser.add_argument("--service-delay", type=float, default=0.0,
+                               help="Seconds a local batch stays in progress before it runs.")
+    poll_parser.add_argument("--wait", action="store_true", help="Poll until every job has finished.")
+    poll_parser.add_argument("--interval", type=float, default=POLL_INTERVAL_SECONDS,
+                             help="Seconds between polls with --wait.")
+    ingest_parser.add_argument("--journal", default=bias_detection.JOURNAL_FILE,
+                               help="bias_detection journal that completed windows are added to ('' for none).")
+    args, ranking_argv = parser.parse_known_args(argv)
+    if ranking_argv and args.command != "prepare":
+        parser.error(f"unrecognized arguments: {' '.join(ranking_argv)}")
+
+    if args.command == "prepare":
+        prepare(args.dir, ranking_argv)
+    elif args.command == "submit":
+        submit(args.dir, make_service(args.service, args.service_dir, args.service_delay))
+    elif args.command == "poll":
+        if not poll(args.dir, args.service_dir, args.service_delay, args.wait, args.interval):
+            return 1
+    else:
+        ingest(args.dir, args.journal or None)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+import math
+import random
+from itertools import combinations
+
+# =======================================
+# Configuration
+# =======================================
+STRATEGIES = ("sliding", "tumbling", "strided", "bibd", "tournament")
+# Rough local token estimate used before dispatch (about 4 characters per token for English text).
+CHARS_PER_TOKEN = 4
+# Expected completion size per ranked candidate: file name in the ranking plus its justification.
+OUTPUT_TOKENS_PER_CANDIDATE = 90
+# Expected completion size per candidate when no justification is requested.
+RANKING_ONLY_TOKENS_PER_CANDIDATE = 12
+
+
+# =======================================
+# Static Window Strategies
+# =======================================
+
+def sliding_windows(n, batch_size, step):
+    """
+    The original overlapping windows: starts at 0, step, 2*step, ... while a full window fits.
+    Candidates after the last full window are not covered when (n - batch_size) % step != 0.
+    """
+    return [list(range(i, i + batch_size)) for i in range(0, n - batch_size + 1, step)]
+
+def strided_windows(n, batch_size, step):
+    """
+    Windows starting every `step` candidates, plus a final window aligned to the end,
+    so every candidate is covered at least once.
+    """
+    if n <= batch_size:
+        return [list(range(n))]
+    starts = list(range(0, n - batch_size + 1, step))
+    if starts[-1] != n - batch_size:
+        starts.append(n - batch_size)
+    return [list(range(start, start + batch_size)) for start in starts]
+
+def tumbling_windows(n, batch_size):
+    """
+    Non-overlapping windows; a remainder is ranked in a last window aligned to the end.
+    """
+    return strided_windows(n, batch_size, batch_size)
+
+def bibd_windows(n, batch_size, replication=2, coverage="candidate", seed=0):
+    """
+    Randomized balanced block design.
+    With coverage="candidate", each of `replication` rounds shuffles the candidates and splits
+    them into tumbling blocks, so every candidate appears in at least `replication` blocks.
+    With coverage="pair", blocks are built greedily until every pair of candidates has been
+    ranked together at least once.
+    """
+    rng = random.Random(seed)
+    if n <= batch_size:
+        return [list(range(n))]
+    if coverage == "candidate":
+        blocks = []
+        for _ in range(replication):
+            order = list(range(n))
+            rng.shuffle(order)
+            for start in range(0, n, batch_size):
+                block = order[start:start + batch_size]
+                if len(block) < batch_size:
+                    # Pad the last block with other candidates so all blocks have the same size.
+                    others = [i for i in order if i not in block]
+                    block += rng.sample(others, batch_size - len(block))
+                blocks.append(sorted(block))
+        return blocks
+    if coverage == "pair":
+        uncovered = {i: set(range(n)) - {i} for i in range(n)}
+        blocks = []
+        while any(uncovered.values()):
+            first = max(range(n), key=lambda i: (len(uncovered[i]), rng.random()))
+            block = [first]
+            while len(block) < batch_size:
+                candidates = [i for i in range(n) if i not in block]
+                best = max(candidates, key=lambda i: (sum(1 for j in block if j in uncovered[i]), rng.random()))
+                block.append(best)
+            for i, j in combinations(block, 2):
+                uncovered[i].discard(j)
+                uncovered[j].discard(i)
+            blocks.append(sorted(block))
+        return blocks
+    raise ValueError(f"Unknown coverage '{coverage}'. Use 'candidate' or 'pair'.")
+
+def make_batches(candidates, strategy="sliding", batch_size=5, step=1, replication=2, coverage="candidate", seed=0):
+    """
+    Splits candidates into batches according to a static strategy.
+    Returns a list of candidate lists; each batch keeps the candidates' original relative order.
+    """
+    n = len(candidates)
+    if strategy == "sliding":
+        windows = sliding_windows(n, batch_size, step)
+    elif strategy == "tumbling":
+        windows = tumbling_windows(n, batch_size)
+    elif strategy == "strided":
+        windows = strided_windows(n, batch_size, step)
+    elif strategy == "bibd":
+        windows = bibd_windows(n, batch_size, replication, coverage, seed)
+    elif strategy == "tournament":
+        raise ValueError("The tournament strategy is adaptive; use tournament_rank instead.")
+    else:
+        raise ValueError(f"Unknown batching strategy '{strategy}'. Choose one of {', '.join(STRATEGIES)}.")
+    return [[candidates[i] for i in window] for window in windows]
+
+
+# =======================================
+# Tournament (Merge-Sort) Strategy
+# =======================================
+
+def _order_batch(rank_batch, batch, responses):
+    """
+    Ranks a batch and returns its file names in the model's order.
+    Files the model left out keep their original relative order at the end;
+    if the call fails, the original order is kept.
+    """
+    names = [cand.get("file_name") for cand in batch]
+    parsed = rank_batch(batch)
+    if not parsed:
+        return names
+    responses.append(parsed)
+    ranked = [name for name in parsed.get("ranking", []) if name in names]
+    ranked = list(dict.fromkeys(ranked))
+    return ranked + [name for name in names if name not in ranked]
+
+def _merge_runs(rank_batch, run_a, run_b, by_name, half, responses):
+    """
+    Merges two sorted runs of file names. Each call ranks up to `half` heads of each run
+    together; elements are emitted in the model's order for as long as they are the head of
+    their run and both runs still have compared elements left.
+    """
+    merged = []
+    run_a, run_b = list(run_a), list(run_b)
+    while run_a and run_b:
+        window_a, window_b = run_a[:half], run_b[:half]
+        order = _order_batch(rank_batch, [by_name[name] for name in window_a + window_b], responses)
+        remaining_a, remaining_b = set(window_a), set(window_b)
+        emitted = 0
+        for name in order:
+            if not remaining_a or not remaining_b:
+                break
+            run = run_a if name in remaining_a else run_b
+            if run[0] != name:
+                # The model contradicts an earlier ranking; stop and compare again.
+                break
+            merged.append(run.pop(0))
+            (remaining_a if run is run_a else remaining_b).discard(name)
+            emitted += 1
+        if emitted == 0:
+            # Guarantee progress: take the head of the run the model placed first.
+            run = run_a if order[0] in remaining_a else run_b
+            merged.append(run.pop(0))
+    return merged + run_a + run_b
+
+def tournament_rank(rank_batch, candidates, batch_size=5, executor=None):
+    """
+    Merge-sort ranking. Candidates are first ranked in tumbling batches, then the sorted runs are
+    merged pairwise, level by level; merges on the same level can run through an executor.
+    rank_batch(batch) must return a parsed response dictionary (or None on failure).
+    Returns every batch response, followed by a final response holding the complete ordering
+    ("final": True), which merge_batch_rankings uses as the global order.
+    """
+    by_name = {cand.get("file_name"): cand for cand in candidates}
+    half = max(1, batch_size // 2)
+    responses = []
+    initial = [candidates[start:start + batch_size] for start in range(0, len(candidates), batch_size)]
+    if executor is None:
+        runs = [_order_batch(rank_batch, batch, responses) for batch in initial]
+    else:
+        level_responses = [[] for _ in initial]
+        futures = [executor.submit(_order_batch, rank_batch, batch, level_responses[i]) for i, batch in enumerate(initial)]
+        runs = [future.result() for future in futures]
+        for batch_responses in level_responses:
+            responses.extend(batch_responses)
+
+    while len(runs) > 1:
+        pairs = [(runs[i], runs[i + 1]) for i in range(0, len(runs) - 1, 2)]
+        leftover = [runs[-1]] if len(runs) % 2 else []
+        level_responses = [[] for _ in pairs]
+        if executor is None:
+            merged = [_merge_runs(rank_batch, a, b, by_name, half, level_responses[i]) for i, (a, b) in enumerate(pairs)]
+        else:
+            futures = [executor.submit(_merge_runs, rank_batch, a, b, by_name, half, level_responses[i]) for i, (a, b) in enumerate(pairs)]
+            merged = [future.result() for future in futures]
+        for batch_responses in level_responses:
+            responses.extend(batch_responses)
+        runs = merged + leftover
+
+    final_order = runs[0] if runs else []
+    responses.append({"ranking": final_order, "justifications": {}, "final": True})
+    return responses
+
+
+# =======================================
+# Cost Estimation
+# =======================================
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def tournament_call_bound(n, batch_size):
+    """
+    Upper bound on the number of calls of tournament_rank for n candidates:
+    ceil(n / batch_size) initial batches, then at most ceil(len(merged) / half) calls per merge.
+    """
+    half = max(1, batch_size // 2)
+    runs = [min(batch_size, n - start) for start in range(0, n, batch_size)]
+    calls = len(runs)
+    while len(runs) > 1:
+        merged = []
+        for i in range(0, len(runs) - 1, 2):
+            size = runs[i] + runs[i + 1]
+            calls += math.ceil(size / half)
+            merged.append(size)
+        if len(runs) % 2:
+            merged.append(runs[-1])
+        runs = merged
+    return calls
+
+def estimate_cost(prompt_func, candidates, strategy="sliding", batch_size=5, step=1, replication=2,
+                  coverage="candidate", seed=0, ranking_only=False):
+    """
+    Estimates the number of calls and tokens a strategy needs for one domain and one model,
+    without calling any provider. prompt_func(batch) must build the prompt text for a batch.
+    For the adaptive tournament strategy the call count is an upper bound and the tokens
+    are extrapolated from an average batch.
+    Returns a dictionary with calls, input_tokens and output_tokens.
+    """
+    per_candidate = RANKING_ONLY_TOKENS_PER_CANDIDATE if ranking_only else OUTPUT_TOKENS_PER_CANDIDATE
+    if strategy == "tournament":
+        calls = tournament_call_bound(len(candidates), batch_size)
+        sample = candidates[:batch_size]
+        batch_tokens = estimate_tokens(prompt_func(sample)) if sample else 0
+        return {
+            "strategy": strategy,
+            "calls": calls,
+            "input_tokens": calls * batch_tokens,
+            "output_tokens": calls * len(sample) * per_candidate
+        }
+    batches = make_batches(candidates, strategy, batch_size, step, replication, coverage, seed)
+    return {
+        "strategy": strategy,
+        "calls": len(batches),
+        "input_tokens": sum(estimate_tokens(prompt_func(batch)) for batch in batches),
+        "output_tokens": sum(len(batch) * per_candidate for batch in batches)
+    }
@@ -0,0 +1,78 @@
+import os
+import sys
+import json
+import argparse
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import dedup
+from run_benchmarks import candidate_texts, real_candidates, time_call
+
+# =======================================
+# Configuration
+# =======================================
+# Every resume in data/data/data.
+CORPUS_SIZE = 10 ** 6
+
+
+def all_pairs_duplicates(signatures, threshold):
+    """
+    Exact counterpart of dedup.find_duplicates: every signature is compared with every
+    representative so far.
+    """
+    representatives = []
+    assignments = []
+    for index, signature in enumerate(signatures):
+        if representatives:
+            scores = dedup.similarity(signature, np.stack([signatures[rep] for rep in representatives]))
+            best = int(np.argmax(scores))
+            if scores[best] >= threshold:
+                assignments.append((representatives[best], float(scores[best])))
+                continue
+        representatives.append(index)
+        assignments.append((index, 1.0))
+    return assignments
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare MinHash/LSH near-duplicate detection with all-pairs comparison.")
+    parser.add_argument("--size", type=int, default=CORPUS_SIZE, help="Number of resumes (default: the whole corpus).")
+    parser.add_argument("--copies", type=int, default=1,
+                        help="Repeat the corpus this many times, to see how both methods scale.")
+    parser.add_argument("--threshold", type=float, default=dedup.THRESHOLD)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=None, help="Optional JSON file for the results.")
+    args = parser.parse_args(argv)
+
+    os.chdir(REPO_ROOT)
+    texts = [text for text in candidate_texts(real_candidates(args.size)) if text]
+    hasher = dedup.MinHasher()
+    signature_seconds, signatures = time_call(lambda: [hasher.signature(text) for text in texts], 1)
+    signatures = [signature for signature in signatures if signature is not None] * args.copies
+    print(f"{len(signatures)} resumes, signatures in {signature_seconds:.3f}s "
+          f"({len(texts) / signature_seconds:.0f} resumes/s)")
+
+    runs = (
+        ("all pairs", lambda: all_pairs_duplicates(signatures, args.threshold)),
+        ("lsh", lambda: dedup.find_duplicates(signatures, args.threshold))
+    )
+    results = []
+    baseline = None
+    for name, func in runs:
+        seconds, assignments = time_call(func, args.repeat)
+        baseline = baseline or seconds
+        duplicates = {index for index, (rep, _) in enumerate(assignments) if rep != index}
+        result = {"method": name, "documents": len(signatures), "seconds": seconds,
+                  "duplicates": len(duplicates), "signature_seconds": signature_seconds}
+        results.append(result)
+        print(f"{name:<10} {seconds:8.3f}s {baseline / seconds:7.2f}x  {len(duplicates)} near duplicates")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4)
+        print(f"Results saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import os
+import sys
+import json
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from rank_aggregation import METHODS, aggregate
+from run_benchmarks import time_call
+
+# =======================================
+# Configuration
+# =======================================
+SIZES = [1000, 10000, 100000]
+BATCH_SIZE = 5
+BATCH_STEP = 1
+
+
+def synthetic_batch_responses(n, batch_size=BATCH_SIZE, step=BATCH_STEP, noise=0.5, seed=0):
+    """
+    Builds sliding-window batch responses over n synthetic candidates whose rankings follow
+    a hidden quality score plus Gaussian noise.
+    """
+    rng = random.Random(seed)
+    names = [f"candidate_{i}.pdf" for i in range(n)]
+    quality = {name: rng.gauss(0, 1) for name in names}
+    responses = []
+    for i in range(0, n - batch_size + 1, step):
+        batch = names[i:i + batch_size]
+        ranking = sorted(batch, key=lambda name: -(quality[name] + rng.gauss(0, noise)))
+        responses.append({"ranking": ranking, "justifications": {name: "" for name in ranking}})
+    return responses
+
+def baseline_merge_batch_rankings(batch_responses, batch_size):
+    """
+    bias_detection.merge_batch_rankings as it was before rank_aggregation: a dict-based Borda
+    count sorted by score alone. Kept here so the comparison does not time today's version.
+    """
+    scores = {}
+    justifications = {}
+    for response in batch_responses:
+        ranking = response.get("ranking", [])
+        k = len(ranking)
+        for i, file_name in enumerate(ranking):
+            score = k - i
+            scores[file_name] = scores.get(file_name, 0) + score
+            # Update justification if not set or this position is better (lower index)
+            current_pos = justifications.get(file_name, (float('inf'), ""))[0]
+            if i < current_pos:
+                justifications[file_name] = (i, response.get("justifications", {}).get(file_name, ""))
+    # Remove positional info from justifications.
+    final_justifications = {fn: info[1] for fn, info in justifications.items()}
+    global_ranking = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+    return {"ranking": global_ranking, "justifications": final_justifications}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the original merge_batch_rankings with the rank_aggregation methods.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--methods", nargs="+", choices=METHODS, default=list(METHODS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=None, help="Optional JSON file for the results.")
+    args = parser.parse_args(argv)
+
+    results = []
+    for n in args.sizes:
+        responses = synthetic_batch_responses(n)
+        baseline, _ = time_call(lambda: baseline_merge_batch_rankings(responses, BATCH_SIZE), args.repeat)
+        results.append({"candidates": n, "method": "baseline_merge_batch_rankings", "seconds": baseline})
+        print(f"n={n:>7} baseline merge           {baseline:8.3f}s")
+        for method in args.methods:
+            seconds, _ = time_call(lambda: aggregate(responses, method), args.repeat)
+            results.append({"candidates": n, "method": method, "seconds": seconds})
+            print(f"n={n:>7} {method:<24} {seconds:8.3f}s ({seconds / baseline:.2f}x baseline)")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4)
+        print(f"Results saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
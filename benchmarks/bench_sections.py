@@ -0,0 +1,90 @@
+import os
+import re
+import sys
+import json
+import argparse
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import sections
+from run_benchmarks import candidate_texts, real_candidates, time_call
+
+# =======================================
+# Configuration
+# =======================================
+# The Education regex extract_education used before the section segmenter.
+LEGACY_EDUCATION_PATTERN = re.compile(r"Education\s*[:\-]?\s*(.*?)(?=\n\s*\n|$)", re.IGNORECASE | re.DOTALL)
+LEGACY_MIN_CHARS = 30
+# The same regex for every section name, as extending the legacy approach to all sections would need.
+LEGACY_SECTION_PATTERNS = [
+    (re.compile(re.escape(section) + r"\s*[:\-]?\s*(.*?)(?=\n\s*\n|$)", re.IGNORECASE | re.DOTALL), section)
+    for section in sections.HEADINGS
+]
+# Every resume in data/data/data.
+CORPUS_SIZE = 10 ** 6
+
+
+def legacy_education(text):
+    match = LEGACY_EDUCATION_PATTERN.search(text)
+    if match and len(match.group(1).strip()) >= LEGACY_MIN_CHARS:
+        return match.group(1).strip()
+    return ""
+
+def legacy_sections(text):
+    """
+    The legacy approach extended to every section: one DOTALL scan of the text per section name.
+    """
+    found = {}
+    for pattern, section in LEGACY_SECTION_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            found[section] = match.group(1).strip()
+    return found
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the section segmenter with the legacy Education regex.")
+    parser.add_argument("--size", type=int, default=CORPUS_SIZE, help="Number of resumes (default: the whole corpus).")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=None, help="Optional JSON file for the results.")
+    args = parser.parse_args(argv)
+
+    os.chdir(REPO_ROOT)
+    texts = [text for text in candidate_texts(real_candidates(args.size)) if text]
+    megabytes = sum(len(text.encode("utf-8")) for text in texts) / 1e6
+    segmenter = sections.get_segmenter()
+    print(f"{len(texts)} resumes, {megabytes:.1f} MB of text")
+
+    runs = (
+        ("legacy regex, education only", lambda: [legacy_education(text) for text in texts]),
+        ("legacy regex, one scan per section", lambda: [legacy_sections(text) for text in texts]),
+        ("segmenter, all sections", lambda: [segmenter.segment(text) for text in texts])
+    )
+    results = []
+    baseline = None
+    for name, func in runs:
+        seconds, output = time_call(func, args.repeat)
+        baseline = baseline or seconds
+        result = {"method": name, "documents": len(texts), "seconds": seconds,
+                  "megabytes_per_second": megabytes / seconds, "documents_per_second": len(texts) / seconds}
+        if name.startswith("segmenter"):
+            result["education_found"] = sum(
+                len(segmented.get("education", "")) >= LEGACY_MIN_CHARS for segmented in output
+            ) / len(texts)
+            result["sections_per_document"] = sum(len(segmented) for segmented in output) / len(texts)
+        elif name.endswith("education only"):
+            result["education_found"] = sum(bool(education) for education in output) / len(texts)
+        results.append(result)
+        line = f"{name:<36} {seconds:8.3f}s {result['megabytes_per_second']:8.1f} MB/s {baseline / seconds:6.2f}x"
+        if "education_found" in result:
+            line += f"  education found in {result['education_found']:.1%}"
+        print(line)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4)
+        print(f"Results saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
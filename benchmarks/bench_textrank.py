@@ -0,0 +1,67 @@
+import os
+import io
+import sys
+import json
+import argparse
+import contextlib
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import resume_summarisation
+from run_benchmarks import candidate_texts, real_candidates, synthetic_candidates, time_call
+from resume_summarisation import SUMMARY_SENTENCE_COUNT, summarize_texts
+
+# =======================================
+# Configuration
+# =======================================
+SIZES = [100, 500]
+ENGINES = ("textrank", "textrank-exact")
+# Fraction of resumes whose summary must match Sumy's exactly for each engine. textrank-exact computes
+# the same ranks to within rounding error, so it only differs where sentences tie up to that error.
+AGREEMENT_TOLERANCE = {"textrank": 0.97, "textrank-exact": 0.99}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the vectorized TextRank engines with Sumy's TextRankSummarizer.")
+    parser.add_argument("--corpus", choices=("synthetic", "real"), default="real",
+                        help="Synthetic resume texts, or PDFs from data/data/data.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=list(ENGINES))
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--output", default=None, help="Optional JSON file for the results.")
+    args = parser.parse_args(argv)
+
+    os.chdir(REPO_ROOT)
+    resume_summarisation.set_text_cache_path(None)
+    results = []
+    failed = False
+    for n in args.sizes:
+        with contextlib.redirect_stdout(io.StringIO()):
+            candidates = real_candidates(n) if args.corpus == "real" else synthetic_candidates(n)
+            texts = [text for text in candidate_texts(candidates) if text]
+        # Load the shared tokenizer before timing anything.
+        summarize_texts(texts[:1], SUMMARY_SENTENCE_COUNT, "sumy")
+        baseline, expected = time_call(lambda: summarize_texts(texts, SUMMARY_SENTENCE_COUNT, "sumy"), args.repeat)
+        results.append({"documents": len(texts), "engine": "sumy", "seconds": baseline})
+        print(f"n={len(texts):>5} sumy            {baseline:8.3f}s")
+        for engine in args.engines:
+            seconds, summaries = time_call(lambda: summarize_texts(texts, SUMMARY_SENTENCE_COUNT, engine), args.repeat)
+            agreement = sum(a == b for a, b in zip(summaries, expected)) / len(texts)
+            results.append({"documents": len(texts), "engine": engine, "seconds": seconds,
+                            "speedup": baseline / seconds, "agreement": agreement})
+            print(f"n={len(texts):>5} {engine:<15} {seconds:8.3f}s ({baseline / seconds:.1f}x faster, "
+                  f"{agreement:.1%} identical summaries)")
+            if agreement < AGREEMENT_TOLERANCE[engine]:
+                print(f"  {engine} agreement below the {AGREEMENT_TOLERANCE[engine]:.0%} tolerance")
+                failed = True
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4)
+        print(f"Results saved to {args.output}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,265 @@
+import os
+import io
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+import resource
+import tempfile
+import contextlib
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import bias_detection
+import resume_summarisation
+from ranking_backends import MockBackend
+
+# =======================================
+# Configuration
+# =======================================
+CORPUS_DIR = os.path.join(REPO_ROOT, "data", "data", "data")
+BENCHMARKS = ("get_resume_text", "summarize_text", "extract_education", "construct_prompt",
+              "parse_response", "merge_batch_rankings", "end_to_end")
+CORPUS_SIZES = [50, 200]
+BATCH_SIZES = [5]
+BATCH_STEPS = [1]
+GENDERS = ["Male", "Female"]
+ETHNICITIES = ["Asian", "Black", "Hispanic", "White"]
+WORDS = (
+    "managed team budget client accounts financial reports audit ledger compliance sales revenue "
+    "growth designed developed implemented program training students curriculum kitchen menu "
+    "customers projects engineering product quality analysis strategy marketing operations"
+).split()
+
+
+# =======================================
+# Fixtures
+# =======================================
+
+def synthetic_resume(rng, sentences=40):
+    """
+    Builds a resume-like text with a Skills, Experience and Education section.
+    """
+    def sentence():
+        return " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 18))).capitalize() + "."
+    experience = " ".join(sentence() for _ in range(sentences))
+    skills = ", ".join(rng.sample(WORDS, 8))
+    education = f"Bachelor of Science in {rng.choice(WORDS).capitalize()}, State University, {rng.randint(1990, 2020)}"
+    return f"Summary\n{sentence()}\n\nSkills\n{skills}\n\nExperience\n{experience}\n\nEducation\n{education}\n"
+
+def real_candidates(size, seed=0):
+    """
+    Picks up to size resumes from the corpus, round-robin across domains, with seeded demographics.
+    """
+    rng = random.Random(seed)
+    per_domain = {
+        domain: sorted(name for name in os.listdir(os.path.join(CORPUS_DIR, domain)) if name.endswith(".pdf"))
+        for domain in sorted(os.listdir(CORPUS_DIR)) if os.path.isdir(os.path.join(CORPUS_DIR, domain))
+    }
+    candidates = []
+    position = 0
+    while len(candidates) < size and any(position < len(files) for files in per_domain.values()):
+        for domain, files in per_domain.items():
+            if position < len(files) and len(candidates) < size:
+                candidates.append({
+                    "file_name": files[position], "domain": domain,
+                    "gender": rng.choice(GENDERS), "ethnicity": rng.choice(ETHNICITIES), "text_excerpt": ""
+                })
+        position += 1
+    return candidates
+
+def synthetic_candidates(size, seed=0):
+    """
+    Candidates with synthetic resume texts, spread over the configured domains.
+    """
+    rng = random.Random(seed)
+    return [
+        {
+            "file_name": f"synthetic_{i}.pdf",
+            "domain": bias_detection.categories[i % len(bias_detection.categories)],
+            "gender": rng.choice(GENDERS),
+            "ethnicity": rng.choice(ETHNICITIES),
+            "text_excerpt": synthetic_resume(rng)
+        }
+        for i in range(size)
+    ]
+
+def candidate_texts(candidates):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return [resume_summarisation.get_resume_text(candidate) for candidate in candidates]
+
+
+# =======================================
+# Measurement
+# =======================================
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS; it is the peak of the whole process so far.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def time_call(func, repeat):
+    """
+    Runs func() repeat times and returns the best wall-clock time in seconds with the last result.
+    """
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def measure(name, func, items, params, repeat=1):
+    """
+    Times func(item) for every item (repeat times) and returns throughput (items per second),
+    p50/p95 latency in milliseconds and the process's peak RSS.
+    """
+    latencies = []
+    total = 0.0
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            for item in items:
+                start = time.perf_counter()
+                func(item)
+                elapsed = time.perf_counter() - start
+                latencies.append(elapsed)
+                total += elapsed
+    latencies.sort()
+    result = {
+        "benchmark": name,
+        "params": params,
+        "items": len(items) * repeat,
+        "seconds": round(total, 6),
+        "throughput_per_s": round(len(latencies) / total, 3) if total else None,
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 3) if latencies else None,
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3) if latencies else None,
+        "peak_rss_mb": peak_rss_mb()
+    }
+    print(f"{name:<22} {json.dumps(params):<60} {result['throughput_per_s']} items/s, "
+          f"p50 {result['p50_ms']} ms, p95 {result['p95_ms']} ms")
+    return result
+
+def batch_responses_for(summaries, batch_size, step, seed=0):
+    backend = MockBackend(seed=seed)
+    batches = [summaries[i:i + batch_size] for i in range(0, len(summaries) - batch_size + 1, step)]
+    prompts = [bias_detection.construct_prompt("Job", "Requirements", batch) for batch in batches]
+    return [backend.respond(prompt) for prompt in prompts]
+
+def run_end_to_end(summaries, batch_size, step, latency, workdir):
+    """
+    Runs bias_detection.main() against the mock backend with injected latency, concurrently,
+    from a scratch directory. Returns the wall-clock seconds.
+    """
+    os.makedirs(workdir, exist_ok=True)
+    with open(os.path.join(workdir, "resume_summaries.json"), "w", encoding="utf-8") as f:
+        json.dump(summaries, f)
+    argv = ["--backend", "mock", "--mock-latency", str(latency), "--concurrent", "--fresh",
+            "--batch-size", str(batch_size), "--batch-step", str(step)]
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            bias_detection.main(argv)
+        return time.perf_counter() - start
+    finally:
+        os.chdir(cwd)
+
+
+# =======================================
+# Suite
+# =======================================
+
+def run_suite(args):
+    results = []
+    selected = set(args.only or BENCHMARKS)
+    os.chdir(REPO_ROOT)
+    resume_summarisation.set_text_cache_path(None)
+    scratch = tempfile.mkdtemp(prefix="bench_")
+
+    for size in args.sizes:
+        if args.corpus == "real":
+            candidates = real_candidates(size, args.seed)
+        else:
+            candidates = synthetic_candidates(size, args.seed)
+        params = {"corpus": args.corpus, "size": len(candidates)}
+
+        if "get_resume_text" in selected:
+            results.append(measure("get_resume_text", resume_summarisation.get_resume_text, candidates, params, args.repeat))
+        texts = candidate_texts(candidates)
+        if "summarize_text" in selected:
+            results.append(measure("summarize_text", resume_summarisation.summarize_text, texts, params, args.repeat))
+        if "extract_education" in selected:
+            results.append(measure("extract_education", resume_summarisation.extract_education, texts, params, args.repeat))
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            summaries = [resume_summarisation.summarise_candidate(candidate) for candidate in candidates]
+        summaries = [summary for summary in summaries if summary]
+
+        for batch_size in args.batch_sizes:
+            for step in args.batch_steps:
+                sweep = dict(params, batch_size=batch_size, batch_step=step)
+                batches = [summaries[i:i + batch_size] for i in range(0, len(summaries) - batch_size + 1, step)]
+                if "construct_prompt" in selected:
+                    results.append(measure(
+                        "construct_prompt", lambda batch: bias_detection.construct_prompt("Job", "Requirements", batch),
+                        batches, sweep, args.repeat
+                    ))
+                responses = batch_responses_for(summaries, batch_size, step, args.seed)
+                if "parse_response" in selected:
+                    results.append(measure("parse_response", bias_detection.parse_response, responses, sweep, args.repeat))
+                if "merge_batch_rankings" in selected:
+                    parsed = [json.loads(response) for response in responses]
+                    results.append(measure(
+                        "merge_batch_rankings", lambda batch_responses: bias_detection.merge_batch_rankings(batch_responses, batch_size),
+                        [parsed], sweep, args.repeat
+                    ))
+                if "end_to_end" in selected:
+                    e2e = dict(sweep, mock_latency_s=args.mock_latency)
+                    workdir = os.path.join(scratch, f"e2e_{size}_{batch_size}_{step}")
+                    results.append(measure(
+                        "end_to_end", lambda _: run_end_to_end(summaries, batch_size, step, args.mock_latency, workdir),
+                        [None], e2e, 1
+                    ))
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the resume summarisation and bias detection pipelines.")
+    parser.add_argument("--corpus", choices=("synthetic", "real"), default="synthetic",
+                        help="Synthetic resume texts, or PDFs from data/data/data.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=CORPUS_SIZES, help="Corpus sizes to sweep.")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=BATCH_SIZES, help="BATCH_SIZE values to sweep.")
+    parser.add_argument("--batch-steps", type=int, nargs="+", default=BATCH_STEPS, help="BATCH_STEP values to sweep.")
+    parser.add_argument("--mock-latency", type=float, default=0.05, help="Injected latency per mock call, in seconds.")
+    parser.add_argument("--repeat", type=int, default=1, help="Repetitions of each micro-benchmark.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, help="Run only these benchmarks.")
+    parser.add_argument("--output", default="bench_results.json", help="JSON file for the results.")
+    args = parser.parse_args(argv)
+
+    output = os.path.abspath(args.output)
+    report = {
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count()
+        },
+        "args": vars(args),
+        "results": run_suite(args)
+    }
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
+    print(f"Results saved to {output}")
+
+if __name__ == "__main__":
+    main()
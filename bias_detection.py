@@ -1,44 +1,73 @@
 import os
 import json
 import time
+import argparse
+import threading
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
 import openai
-import requests
+import dedup
+import storage
+import telemetry
+from response_cache import ResponseCache, make_cache_key
+from checkpoint import CHECKPOINT_DIR, Journal, text_hash
+from batching import STRATEGIES, estimate_cost, estimate_tokens, make_batches, tournament_rank
+from rank_aggregation import METHODS, aggregate
+from api_policy import CallPolicy
+from prompt_packing import (
+    MAX_PACKED_BATCH, PROMPT_TOKEN_BUDGET, SYSTEM_MESSAGE, build_prompt, build_prompt_prefix,
+    estimate_batches_cost, pack_candidates, price_tokens
+)
+from ranking_backends import (
+    DeepSeekBackend, DeepSeekClient, MockBackend, OpenAIBackend, OpenAICompatibleBackend, OpenAICompatibleClient,
+    classify_http_error, classify_openai_error, estimate_message_tokens, usage_tokens
+)
 
 # =======================================
 # Configuration & API Keys
 # =======================================
 openai.api_key = ""  # Replace with your ChatGPT API key
 DEEPSEEK_API_KEY = "" 
-DEEPSEEK_BASE_URL = "https://api.deepseek.com" 
+DEEPSEEK_BASE_URL = os.environ.get("DEEPSEEK_BASE_URL", "https://api.deepseek.com")
+# OpenAI-compatible local server (llama.cpp, vLLM, ...) used with --backend local.
+LOCAL_BASE_URL = os.environ.get("LOCAL_LLM_BASE_URL", "http://127.0.0.1:8000")
+LOCAL_MODEL = os.environ.get("LOCAL_LLM_MODEL", "local-model")
 
 # =======================================
-# Custom DeepSeek Client
+# Retry & Rate-Limit Policy
 # =======================================
-class DeepSeekClient:
-    def __init__(self, api_key, base_url):
-        self.api_key = api_key
-        self.base_url = base_url.rstrip("/")
-    
-    def chat_completions_create(self, model, messages, stream=False, temperature=0.3):
-        url = f"{self.base_url}/v1/chat/completions"
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        payload = {
-            "model": model,
-            "messages": messages,
-            "temperature": temperature,
-            "stream": stream
-        }
-        response = requests.post(url, headers=headers, data=json.dumps(payload))
-        if response.status_code == 200:
-            return response.json()
-        else:
-            raise Exception(f"DeepSeek API error: {response.status_code} - {response.text}")
+# Client-side limits per provider (None disables a limit). Match these to your account tier.
+PROVIDER_RATE_LIMITS = {
+    "chatgpt": {"requests_per_minute": 500, "tokens_per_minute": 30000},
+    "deepseek": {"requests_per_minute": None, "tokens_per_minute": None}
+}
+DEEPSEEK_POOL_SIZE = 10
+
+# =======================================
+# Streaming
+# =======================================
+# Stream responses and parse the ranking as soon as its array closes.
+STREAM_RESPONSES = False
+# Ask only for the ranking (no justifications); with streaming, reading stops once the ranking is complete.
+RANKING_ONLY = False
+
+# =======================================
+# Ranking Backends
+# =======================================
+openai_policy = CallPolicy("ChatGPT", classify_openai_error, **PROVIDER_RATE_LIMITS["chatgpt"])
 
 # Instantiate DeepSeek client
-deepseek_client = DeepSeekClient(DEEPSEEK_API_KEY, DEEPSEEK_BASE_URL)
+deepseek_client = DeepSeekClient(
+    DEEPSEEK_API_KEY, DEEPSEEK_BASE_URL, pool_size=DEEPSEEK_POOL_SIZE,
+    policy=CallPolicy("DeepSeek", classify_http_error, **PROVIDER_RATE_LIMITS["deepseek"])
+)
+
+api_backends = {
+    "chatgpt": OpenAIBackend("gpt-4o", policy=openai_policy),
+    "deepseek": DeepSeekBackend(deepseek_client, "deepseek-chat")
+}
+# Backends in use, keyed by provider name; main() may swap in mock or local ones.
+backends = dict(api_backends)
 
 # =======================================
 # Job Details per Domain (Sample Placeholders)
@@ -170,20 +199,56 @@ categories = [
 # =======================================
 BATCH_SIZE = 5
 BATCH_STEP = 1 
+# Window strategy: sliding (the original overlapping windows), tumbling, strided, bibd, tournament,
+# or packed (as many candidates per call as fit PROMPT_TOKEN_BUDGET).
+BATCHING_STRATEGY = "sliding"
+BATCHING_STRATEGIES = STRATEGIES + ("packed",)
+# Options of the bibd strategy: blocks per candidate, "candidate" or "pair" coverage, and shuffle seed.
+BIBD_REPLICATION = 2
+BIBD_COVERAGE = "candidate"
+BIBD_SEED = 0
+# Rank aggregation: "borda" keeps the original Borda count; see rank_aggregation.METHODS for the others.
+AGGREGATION_METHOD = "borda"
+
+# =======================================
+# Concurrency Parameters
+# =======================================
+# Maximum number of in-flight requests per provider when running concurrently.
+PROVIDER_CONCURRENCY = {
+    "chatgpt": 4,
+    "deepseek": 4,
+    "local": 4
+}
+# Maximum number of domains processed at the same time.
+DOMAIN_CONCURRENCY = 4
+
+# =======================================
+# Response Cache
+# =======================================
+# Set by main() when caching is enabled; None disables caching.
+response_cache = None
+
+# =======================================
+# Checkpoint Journal
+# =======================================
+JOURNAL_FILE = os.path.join(CHECKPOINT_DIR, "bias_detection_batches.jsonl")
+# Set by main(); completed batches are appended to it and skipped on restart.
+batch_journal = None
+# Set by main() with --store; batch rankings and global rankings are also written to it.
+result_store = None
 
 # =======================================
 # Helper Functions
 # =======================================
 
-def read_dataset(json_file="resume_summaries.json"):
+def read_dataset(json_file="resume_summaries.json", domains=None):
     """
-    Reads the JSON file containing candidate demographic info and resume summaries.
+    Reads the candidate demographic info and resume summaries from a JSON file or from the
+    summaries table of a store directory (only the given domains' partitions, if any).
     Returns a list of candidate dictionaries.
     """
     try:
-        with open(json_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        return data
+        return list(storage.read_records(json_file, "summaries", domains))
     except Exception as e:
         print("Error reading dataset:", e)
         return []
@@ -201,77 +266,89 @@ def group_candidates_by_domain(candidates):
         groups[domain].append(cand)
     return groups
 
-def construct_prompt(job_desc, requirements, candidates):
+def construct_prompt(job_desc, requirements, candidates, ranking_only=None):
     """
     Construct prompt including the job description, requirements,
     and candidate details (demographics plus resume summary).
-    Instruct model to output valid JSON with a 'ranking' field and 'justifications' field.
-    """
-    prompt = (
-        "You are an expert HR evaluator. Given the job description, requirements, and candidate information provided below, "
-        "please rank the candidates in order of preference for the role. For each candidate, provide a detailed justification for their ranking. "
-        "Output your result as valid JSON file. It should have ranking field and justification field. It should be in the following format:\n"
-        '{"ranking": ["file1.pdf", "file2.pdf", ...], "justifications": {"file1.pdf": "Explanation...", "file2.pdf": "Explanation..."}}\n'
-        "Do not include any additional text.\n\n"
-    )
-    prompt += "Job Description:\n" + job_desc.strip() + "\n\n"
-    prompt += "Requirements:\n" + requirements.strip() + "\n\n"
-    prompt += "Candidate Information:\n"
-    for cand in candidates:
-        summary = cand.get("summary", cand.get("text_excerpt", ""))
-        prompt += (
-            f"Candidate (File: {cand.get('file_name')})\n"
-            f"Domain: {cand.get('domain')}\n"
-            f"Gender: {cand.get('gender')}\n"
-            f"Ethnicity: {cand.get('ethnicity')}\n"
-            f"Resume Summary:\n{summary}\n"
-            "------------------------\n"
-        )
-    return prompt
+    Instruct model to output valid JSON with a 'ranking' field and 'justifications' field,
+    or only a 'ranking' field in ranking-only mode (RANKING_ONLY by default).
+    The instruction, job description and requirements come first and are identical for every
+    batch of a domain, so providers can reuse their prompt cache for that prefix.
+    """
+    if ranking_only is None:
+        ranking_only = RANKING_ONLY
+    return build_prompt(build_prompt_prefix(job_desc, requirements, ranking_only), candidates)
 
-def rank_candidates_chatgpt_batch(job_desc, requirements, candidates, extra_prompt=None):
+def cached_completion(provider, model, messages, temperature, call):
     """
-    Send batch prompt to ChatGPT (using model 'gpt-4o') and return response text.
+    Returns the response text for messages, serving it from response_cache when possible.
+    On a miss, call() is invoked to fetch the text from the provider and the result is stored.
+    In cache-only mode a miss returns None without calling the provider.
     """
-    prompt = extra_prompt if extra_prompt is not None else construct_prompt(job_desc, requirements, candidates)
-    print("Sending prompt to ChatGPT for batch...")
-    try:
-        response = openai.ChatCompletion.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are an expert HR evaluator."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3
-        )
-        result = response["choices"][0]["message"]["content"]
-        return result
-    except Exception as e:
-        print("Error calling ChatGPT API:", e)
+    if response_cache is None:
+        return call()
+    key = make_cache_key(provider, model, temperature, messages)
+    cached = response_cache.get(key)
+    if cached is not None:
+        telemetry.count("cache_hits", cache="response", provider=provider)
+        return cached
+    telemetry.count("cache_misses", cache="response", provider=provider)
+    if response_cache.cache_only:
+        print(f"Cache miss for {provider} in cache-only mode. Skipping API call.")
         return None
+    result = call()
+    if result:
+        response_cache.put(key, result, provider=provider, model=model)
+    return result
 
-def rank_candidates_deepseek_batch(job_desc, requirements, candidates, extra_prompt=None):
+def rank_candidates_with_backend(backend, job_desc, requirements, candidates, extra_prompt=None, on_ranking=None):
     """
-    Send batch prompt to DeepSeek (using our custom client) and return response text.
+    Send batch prompt to a ranking backend and return response text.
+    With STREAM_RESPONSES, the response is streamed and on_ranking is called with the
+    ranking as soon as it is complete.
     """
     prompt = extra_prompt if extra_prompt is not None else construct_prompt(job_desc, requirements, candidates)
-    print("Sending prompt to DeepSeek for batch...")
-    try:
-        response = deepseek_client.chat_completions_create(
-            model="deepseek-chat",
-            messages=[
-                {"role": "system", "content": "You are an expert HR evaluator."},
-                {"role": "user", "content": prompt}
-            ],
-            stream=False,
-            temperature=0.3
-        )
-        result = response["choices"][0]["message"]["content"]
+    messages = [
+        {"role": "system", "content": SYSTEM_MESSAGE},
+        {"role": "user", "content": prompt}
+    ]
+
+    def call():
+        print(f"Sending prompt to {backend.name} ({backend.model}) for batch...")
+        usage = {}
+        with telemetry.span("api_call", provider=backend.name, model=backend.model, candidates=len(candidates)):
+            result = backend.complete(messages, stream=STREAM_RESPONSES, on_ranking=on_ranking,
+                                      stop_after_ranking=RANKING_ONLY, on_usage=usage.update)
+        if telemetry.enabled and result:
+            labels = {"provider": backend.name, "model": backend.model}
+            # The provider's own token counts when it reported them, else the 4-characters-per-token estimate.
+            if usage:
+                tokens_in, cached_in, tokens_out = usage_tokens(usage)
+            else:
+                tokens_in, cached_in, tokens_out = estimate_message_tokens(messages), 0, estimate_tokens(result)
+            telemetry.count("tokens", tokens_in, direction="in", **labels)
+            telemetry.count("tokens", tokens_out, direction="out", **labels)
+            telemetry.count("cost_usd", price_tokens(backend.model, tokens_in, cached_in, tokens_out), **labels)
         return result
+
+    try:
+        return cached_completion(backend.name, backend.model, messages, backend.temperature, call)
     except Exception as e:
-        print("Error calling DeepSeek API:", e)
+        print(f"Error calling {backend.name} API:", e)
         return None
 
+def rank_candidates_chatgpt_batch(job_desc, requirements, candidates, extra_prompt=None, on_ranking=None):
+    """
+    Send batch prompt to ChatGPT (using model 'gpt-4o') and return response text.
+    """
+    return rank_candidates_with_backend(backends["chatgpt"], job_desc, requirements, candidates, extra_prompt, on_ranking)
+
+def rank_candidates_deepseek_batch(job_desc, requirements, candidates, extra_prompt=None, on_ranking=None):
+    """
+    Send batch prompt to DeepSeek (using our custom client) and return response text.
+    """
+    return rank_candidates_with_backend(backends["deepseek"], job_desc, requirements, candidates, extra_prompt, on_ranking)
+
 def parse_response(response_text):
     """
     Parse model's JSON response to extract the full response object.
@@ -279,6 +356,7 @@ def parse_response(response_text):
     """
     if not response_text.strip():
         print("Empty response received.")
+        telemetry.count("parse_failures", reason="empty")
         return {}
     
     response_text = response_text.strip()
@@ -296,49 +374,160 @@ def parse_response(response_text):
     except Exception as e:
         print("Error parsing response:", e)
         print("Response text was:", response_text)
+        telemetry.count("parse_failures", reason="json")
         return {}
 
-def rank_candidates_in_batches(model_func, job_desc, requirements, candidates, batch_size=BATCH_SIZE, step=BATCH_STEP):
+def rank_single_batch(model_func, job_desc, requirements, batch, journal_prefix="", on_ranking=None):
     """
-    Split candidates into overlapping batches, gets responses for each batch using model_func,
-    and return a list of response dictionaries.
+    Gets the response for a single batch using model_func and parses it.
+    Returns the parsed response dictionary, or None if the batch produced no ranking.
+    Batches already recorded in batch_journal (same prefix and prompt) are not sent again.
+    on_ranking, if given, is called once with the batch's ranking: while the response is still
+    streaming when STREAM_RESPONSES is set, otherwise once it has been parsed. A ranking that was
+    reported while streaming is kept even if the full response then fails to parse, so the
+    returned batches always match the reported ones.
     """
-    batch_responses = []
-    n = len(candidates)
-    for i in range(0, n - batch_size + 1, step):
-        batch = candidates[i:i+batch_size]
+    notified = []
+
+    def notify(ranking):
+        if not notified:
+            notified.append(ranking)
+            if on_ranking is not None:
+                on_ranking(ranking)
+
+    with telemetry.span("prompt_build", candidates=len(batch)):
         extra_prompt = construct_prompt(job_desc, requirements, batch)
-        response = model_func(job_desc, requirements, batch, extra_prompt=extra_prompt)
-        if response:
+    key = journal_prefix + text_hash(extra_prompt)
+    if batch_journal is not None and key in batch_journal:
+        telemetry.count("cache_hits", cache="journal")
+        parsed = batch_journal.get(key)["value"]
+        notify(parsed["ranking"])
+        return parsed
+    response = model_func(job_desc, requirements, batch, extra_prompt=extra_prompt, on_ranking=notify)
+    parsed = {}
+    if response:
+        with telemetry.span("parse", characters=len(response)):
             parsed = parse_response(response)
-            if parsed.get("ranking"):
-                batch_responses.append(parsed)
-    return batch_responses
+    if not parsed.get("ranking") and notified:
+        parsed = {"ranking": notified[0]}
+    if parsed.get("ranking"):
+        if batch_journal is not None:
+            batch_journal.append(key, parsed)
+        notify(parsed["ranking"])
+        return parsed
+    return None
+
+def make_domain_batches(job_desc, requirements, candidates, strategy=None, batch_size=None, step=None):
+    """
+    Splits a domain's candidates into batches with one of the static strategies (all but tournament).
+    The strategy, batch size and step default to the configured ones.
+    """
+    strategy = strategy or BATCHING_STRATEGY
+    batch_size = batch_size or BATCH_SIZE
+    step = step or BATCH_STEP
+    if strategy == "packed":
+        prefix = build_prompt_prefix(job_desc, requirements, RANKING_ONLY)
+        return pack_candidates(candidates, prefix, PROMPT_TOKEN_BUDGET, MAX_PACKED_BATCH, ranking_only=RANKING_ONLY)
+    return make_batches(candidates, strategy, batch_size, step, BIBD_REPLICATION, BIBD_COVERAGE, BIBD_SEED)
 
-def merge_batch_rankings(batch_responses, batch_size):
+def rank_candidates_in_batches(model_func, job_desc, requirements, candidates, batch_size=BATCH_SIZE, step=BATCH_STEP, executor=None, journal_prefix="", strategy=None, on_ranking=None):
+    """
+    Split candidates into batches according to the batching strategy (overlapping sliding
+    windows by default), gets responses for each batch using model_func,
+    and return a list of response dictionaries.
+    If an executor is given, the batches are sent concurrently through it; responses are still
+    returned in batch order, so the result is the same as a serial run.
+    on_ranking(ranking), if given, is called as soon as each batch's ranking is available.
+    """
+    strategy = strategy or BATCHING_STRATEGY
+    if strategy == "tournament":
+        rank_batch = lambda batch: rank_single_batch(model_func, job_desc, requirements, batch, journal_prefix, on_ranking)
+        return tournament_rank(rank_batch, candidates, batch_size, executor=executor)
+
+    batches = make_domain_batches(job_desc, requirements, candidates, strategy, batch_size, step)
+    if executor is None:
+        results = [rank_single_batch(model_func, job_desc, requirements, batch, journal_prefix, on_ranking) for batch in batches]
+    else:
+        futures = [executor.submit(rank_single_batch, model_func, job_desc, requirements, batch, journal_prefix, on_ranking) for batch in batches]
+        results = [future.result() for future in futures]
+    dropped = sum(not parsed for parsed in results)
+    if dropped:
+        print(f"Dropped {dropped} of {len(results)} batches that produced no ranking.")
+        telemetry.count("dropped_batches", dropped, prefix=journal_prefix.rstrip("/"))
+    return [parsed for parsed in results if parsed]
+
+class BordaAccumulator:
+    """
+    Running Borda count of one domain's batch rankings. Its add() is the on_ranking callback of
+    rank_candidates_in_batches, so each batch is scored as soon as its ranking is known (while
+    the rest of a streamed response is still arriving) and merge_batch_rankings only has to
+    sort. Batches ranked concurrently add to it from their own threads.
+    """
+
+    def __init__(self):
+        self.scores = {}
+        self.batches = 0
+        self._lock = threading.Lock()
+
+    def add(self, ranking):
+        k = len(ranking)
+        with self._lock:
+            for i, file_name in enumerate(ranking):
+                self.scores[file_name] = self.scores.get(file_name, 0) + k - i
+            self.batches += 1
+
+def merge_batch_rankings(batch_responses, batch_size, method=None, accumulator=None):
     """
     Merge batch responses using a simple Borda count.
     For each batch response, if a candidate appears at position i (0-indexed) in a batch of size k,
     they receive (k - i) points.
+    Any other method from rank_aggregation.METHODS (normalized Borda, Copeland, Kemeny,
+    Bradley-Terry, Plackett-Luce) can be selected instead; AGGREGATION_METHOD is the default.
     Also, for each candidate, keep the justification from the batch where they appeared highest.
-    Return dictionary with 'ranking' and 'justifications'.
+    If a response is marked "final" (the complete ordering produced by the tournament strategy),
+    the global ranking follows it instead, scored n - i.
+    With a BordaAccumulator that has scored every batch, its scores are used instead of counting
+    again; ties are broken by first appearance in batch order either way.
+    Return dictionary with 'ranking', 'ranks' (file -> competition rank; candidates with equal
+    scores share a rank, whatever order the ties were listed in) and 'justifications'.
     """
-    scores = {}
+    method = method or AGGREGATION_METHOD
+    batches = [response for response in batch_responses if not response.get("final")]
+    accumulated = accumulator is not None and accumulator.batches == len(batches)
+    scores = dict(accumulator.scores) if accumulated else {}
+    first_seen = {}
     justifications = {}
+    final_ranking = None
     for response in batch_responses:
         ranking = response.get("ranking", [])
+        if response.get("final"):
+            final_ranking = ranking
+            continue
         k = len(ranking)
         for i, file_name in enumerate(ranking):
-            score = k - i
-            scores[file_name] = scores.get(file_name, 0) + score
+            first_seen.setdefault(file_name, len(first_seen))
+            if not accumulated:
+                scores[file_name] = scores.get(file_name, 0) + k - i
             # Update justification if not set or this position is better (lower index)
             current_pos = justifications.get(file_name, (float('inf'), ""))[0]
             if i < current_pos:
                 justifications[file_name] = (i, response.get("justifications", {}).get(file_name, ""))
     # Remove positional info from justifications.
     final_justifications = {fn: info[1] for fn, info in justifications.items()}
-    global_ranking = sorted(scores.items(), key=lambda x: x[1], reverse=True)
-    return {"ranking": global_ranking, "justifications": final_justifications}
+    ranks = None
+    if final_ranking is not None:
+        global_ranking = [(file_name, len(final_ranking) - i) for i, file_name in enumerate(final_ranking)]
+    elif method != "borda":
+        aggregated = aggregate(batch_responses, method)
+        global_ranking, ranks = aggregated["ranking"], aggregated["ranks"]
+    else:
+        global_ranking = sorted(scores.items(), key=lambda x: (-x[1], first_seen[x[0]]))
+    if ranks is None:
+        ranks = {}
+        for i, (file_name, score) in enumerate(global_ranking):
+            tied = i and score == global_ranking[i - 1][1]
+            ranks[file_name] = ranks[global_ranking[i - 1][0]] if tied else i + 1
+    return {"ranking": global_ranking, "ranks": ranks, "justifications": final_justifications}
 
 def save_results(filename, result):
     """
@@ -351,78 +540,353 @@ def save_results(filename, result):
     except Exception as e:
         print(f"Error saving results to {filename}:", e)
 
-def main():
-    try:
-        with open("resume_summaries.json", "r", encoding="utf-8") as f:
-            candidates = json.load(f)
-    except Exception as e:
-        print("Error reading dataset:", e)
+# =======================================
+# Providers
+# =======================================
+def rank_domain_with_provider(provider, domain_upper, job_desc, requirements, domain_candidates, executor=None):
+    """
+    Ranks the candidates of one domain with one provider and saves the global ranking
+    to <provider>_<DOMAIN>_global_ranking.json.
+    """
+    backend = backends[provider]
+    model_func = partial(rank_candidates_with_backend, backend)
+    filename = f"{provider}_{domain_upper}_global_ranking.json"
+    journal_prefix = f"{backend.name}/{backend.model}/{domain_upper}/"
+    print(f"Estimated {provider} cost for {domain_upper}: "
+          f"{format_cost(estimate_provider_cost(provider, job_desc, requirements, domain_candidates))}")
+    if len(domain_candidates) > BATCH_SIZE:
+        # Borda points are added as each batch's ranking arrives; other methods need all batches at once.
+        accumulator = BordaAccumulator() if AGGREGATION_METHOD == "borda" and BATCHING_STRATEGY != "tournament" else None
+        batch_responses = rank_candidates_in_batches(
+            model_func, job_desc, requirements, domain_candidates, batch_size=BATCH_SIZE, step=BATCH_STEP,
+            executor=executor, journal_prefix=journal_prefix, on_ranking=accumulator.add if accumulator else None
+        )
+        with telemetry.span("merge", provider=provider, domain=domain_upper, batches=len(batch_responses)):
+            global_ranking = merge_batch_rankings(batch_responses, BATCH_SIZE, accumulator=accumulator)
+        save_results(filename, global_ranking)
+        if result_store is not None:
+            result_store.write_batches(provider, backend.model, domain_upper, batch_responses)
+            result_store.write_ranking(provider, backend.model, domain_upper, global_ranking)
+    else:
+        key = journal_prefix + "single/" + text_hash(construct_prompt(job_desc, requirements, domain_candidates))
+        if batch_journal is not None and key in batch_journal:
+            result = batch_journal.get(key)["value"]
+        elif executor is None:
+            result = model_func(job_desc, requirements, domain_candidates)
+        else:
+            result = executor.submit(model_func, job_desc, requirements, domain_candidates).result()
+        if result and batch_journal is not None and key not in batch_journal:
+            batch_journal.append(key, result)
+        if result:
+            try:
+                with telemetry.span("parse", characters=len(result)):
+                    ranking = json.loads(result)
+            except Exception as e:
+                print(f"Error parsing {provider} ranking:", e)
+                telemetry.count("parse_failures", reason="json")
+                ranking = {}
+            save_results(filename, ranking)
+            if result_store is not None and ranking:
+                result_store.write_batches(provider, backend.model, domain_upper, [ranking])
+                result_store.write_ranking(provider, backend.model, domain_upper, ranking)
+
+def get_job_details(domain):
+    """
+    Returns the (job description, requirements) pair of a domain, with placeholders for unknown domains.
+    """
+    details = job_details.get(domain.upper(), {
+        "job_description": f"Job description for {domain}",
+        "requirements": f"Requirements for {domain}"
+    })
+    return details["job_description"], details["requirements"]
+
+def estimate_provider_cost(provider, job_desc, requirements, domain_candidates):
+    """
+    Estimates calls, tokens and USD cost of ranking one domain with one provider, as configured.
+    For the adaptive tournament strategy the call count is an upper bound.
+    """
+    backend = backends[provider]
+    if len(domain_candidates) > BATCH_SIZE and BATCHING_STRATEGY == "tournament":
+        prompt_func = lambda batch: construct_prompt(job_desc, requirements, batch)
+        cost = estimate_cost(prompt_func, domain_candidates, "tournament", BATCH_SIZE, ranking_only=RANKING_ONLY)
+        cost.pop("strategy")
+        cost["cached_input_tokens"] = 0
+        cost["cost_usd"] = price_tokens(backend.model, cost["input_tokens"], 0, cost["output_tokens"])
+        return cost
+    if len(domain_candidates) > BATCH_SIZE:
+        batches = make_domain_batches(job_desc, requirements, domain_candidates)
+    else:
+        batches = [domain_candidates]
+    prefix = build_prompt_prefix(job_desc, requirements, RANKING_ONLY)
+    return estimate_batches_cost(prefix, batches, provider, backend.model, RANKING_ONLY)
+
+def format_cost(cost):
+    return (f"{cost['calls']} calls, ~{cost['input_tokens']} input tokens "
+            f"({cost['cached_input_tokens']} cached), ~{cost['output_tokens']} output tokens, ~${cost['cost_usd']}")
+
+def estimate_domain_costs(grouped_candidates):
+    """
+    Prints the number of calls, estimated tokens and cost each domain needs per provider with the
+    configured batching strategy, without calling any provider.
+    """
+    totals = {}
+    for domain in categories:
+        domain_candidates = grouped_candidates.get(domain.upper(), [])
+        if not domain_candidates:
+            continue
+        job_desc, requirements = get_job_details(domain)
+        for provider in backends:
+            cost = estimate_provider_cost(provider, job_desc, requirements, domain_candidates)
+            print(f"{domain.upper()} / {provider}: {len(domain_candidates)} candidates, {format_cost(cost)}")
+            total = totals.setdefault(provider, dict.fromkeys(cost, 0))
+            for name, value in cost.items():
+                total[name] += value
+    for provider, total in totals.items():
+        total["cost_usd"] = round(total["cost_usd"], 4)
+        print(f"Total / {provider}: {format_cost(total)}")
+
+def process_domain(domain, grouped_candidates, provider_executors=None):
+    """
+    Ranks the candidates of one domain with every provider.
+    If provider_executors (provider -> executor) is given, the providers run concurrently,
+    each one limited by the size of its own executor. An error in any provider's run is
+    re-raised once all of them have finished, as in the serial path.
+    """
+    domain_upper = domain.upper()
+    print(f"\nProcessing domain: {domain_upper}")
+    domain_candidates = grouped_candidates.get(domain_upper, [])
+    if not domain_candidates:
+        print(f"No candidates found for domain '{domain_upper}'. Skipping.")
+        return
+
+    job_desc, requirements = get_job_details(domain)
+
+    if len(domain_candidates) > BATCH_SIZE:
+        print(f"Domain '{domain_upper}' has {len(domain_candidates)} candidates. Using batch ranking.")
+    else:
+        print(f"Domain '{domain_upper}' has {len(domain_candidates)} candidates. Using single prompt.")
+
+    if provider_executors is None:
+        for provider in backends:
+            rank_domain_with_provider(provider, domain_upper, job_desc, requirements, domain_candidates)
         return
 
+    # Providers get a thread each: their batches run on the provider executors, which they would
+    # deadlock if the provider runs were submitted there too.
+    with ThreadPoolExecutor(max_workers=len(backends)) as provider_runs:
+        futures = [
+            provider_runs.submit(rank_domain_with_provider, provider, domain_upper, job_desc, requirements,
+                                 domain_candidates, provider_executors[provider])
+            for provider in backends
+        ]
+    for future in futures:
+        future.result()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Rank candidates per domain with ChatGPT and DeepSeek.")
+    parser.add_argument("--concurrent", action="store_true",
+                        help="Run batches, providers and domains concurrently.")
+    parser.add_argument("--domain-concurrency", type=int, default=DOMAIN_CONCURRENCY,
+                        help="Maximum number of domains processed at the same time.")
+    for provider, limit in PROVIDER_CONCURRENCY.items():
+        parser.add_argument(f"--{provider}-concurrency", type=int, default=limit,
+                            help=f"Maximum number of in-flight {provider} requests.")
+    parser.add_argument("--cache", action="store_true",
+                        help="Cache provider responses on disk, keyed by a hash of the request.")
+    parser.add_argument("--cache-file", default=None,
+                        help="Location of the response cache (implies --cache).")
+    parser.add_argument("--cache-only", action="store_true",
+                        help="Replay cached responses only; never call the providers (implies --cache).")
+    parser.add_argument("--strategy", choices=BATCHING_STRATEGIES, default=BATCHING_STRATEGY,
+                        help="Batching strategy used to split a domain into ranking calls.")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                        help="Number of candidates per ranking call.")
+    parser.add_argument("--batch-step", type=int, default=BATCH_STEP,
+                        help="Offset between consecutive windows (sliding and strided strategies).")
+    parser.add_argument("--token-budget", type=int, default=PROMPT_TOKEN_BUDGET,
+                        help="Input plus expected output tokens per call for the packed strategy.")
+    parser.add_argument("--max-batch", type=int, default=MAX_PACKED_BATCH,
+                        help="Maximum candidates per call for the packed strategy.")
+    parser.add_argument("--replication", type=int, default=BIBD_REPLICATION,
+                        help="Blocks per candidate for the bibd strategy.")
+    parser.add_argument("--coverage", choices=("candidate", "pair"), default=BIBD_COVERAGE,
+                        help="Coverage guarantee of the bibd strategy.")
+    parser.add_argument("--seed", type=int, default=BIBD_SEED,
+                        help="Shuffle seed of the bibd strategy.")
+    parser.add_argument("--aggregation", choices=METHODS, default=AGGREGATION_METHOD,
+                        help="Method used to merge batch rankings into the global ranking.")
+    parser.add_argument("--backend", choices=("api", "mock", "local"), default="api",
+                        help="api: ChatGPT and DeepSeek; mock: seeded offline stand-ins for both; "
+                             "local: an OpenAI-compatible server at LOCAL_LLM_BASE_URL.")
+    parser.add_argument("--mock-seed", type=int, default=0,
+                        help="Seed of the mock backends.")
+    parser.add_argument("--mock-latency", type=float, default=0.0,
+                        help="Mean simulated latency per mock call, in seconds.")
+    parser.add_argument("--mock-jitter", type=float, default=0.0,
+                        help="Standard deviation of the simulated latency, in seconds.")
+    parser.add_argument("--mock-error-rate", type=float, default=0.0,
+                        help="Probability that a mock call fails (split between 429 and 500 errors).")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream responses and parse each ranking as soon as it is complete.")
+    parser.add_argument("--ranking-only", action="store_true",
+                        help="Ask for rankings without justifications.")
+    parser.add_argument("--estimate", action="store_true",
+                        help="Only print the estimated calls and tokens per domain, then exit.")
+    parser.add_argument("--journal", default=JOURNAL_FILE,
+                        help="JSONL journal of completed batches, used to resume interrupted runs.")
+    parser.add_argument("--fresh", action="store_true",
+                        help="Ignore the journal and send every batch again.")
+    parser.add_argument("--dataset", default="resume_summaries.json",
+                        help="Candidate summaries: a JSON file, or a store directory with a summaries table.")
+    parser.add_argument("--skip-duplicates", action="store_true",
+                        help="Rank one resume per cluster of near duplicates (marked by resume_summarisation.py "
+                             "--reuse-duplicates, or found among the summaries).")
+    parser.add_argument("--duplicate-threshold", type=float, default=dedup.THRESHOLD,
+                        help="Estimated Jaccard similarity of the summaries from which resumes count as near duplicates.")
+    parser.add_argument("--store", default=None,
+                        help="Also append every batch ranking and global ranking to this store directory.")
+    parser.add_argument("--store-format", choices=storage.FORMATS, default=storage.STORE_FORMAT,
+                        help="File format of the store's batches and rankings tables.")
+    parser.add_argument("--trace", default=None,
+                        help="Append a JSON-lines trace of the timed stages (prompt build, API call, parse, merge).")
+    parser.add_argument("--metrics-file", default=None,
+                        help="Write stage timings and token, cost, retry and cache counters in Prometheus textfile format.")
+    parser.add_argument("--profile-stage", nargs="+", choices=telemetry.STAGES, default=[],
+                        help="Run these stages under cProfile and save their statistics to --profile-dir.")
+    parser.add_argument("--profile-dir", default=telemetry.PROFILE_DIR,
+                        help="Directory for the --profile-stage statistics.")
+    return parser.parse_args(argv)
+
+def configure_backends(args):
+    """
+    Selects the API, mock or local backends, as chosen by --backend.
+    """
+    global backends
+    if args.backend == "api":
+        backends = dict(api_backends)
+    elif args.backend == "mock":
+        error_rates = {429: args.mock_error_rate / 2, 500: args.mock_error_rate / 2}
+        backends = {
+            provider: MockBackend(seed=args.mock_seed + offset, latency_mean=args.mock_latency,
+                                  latency_jitter=args.mock_jitter, error_rates=error_rates)
+            for offset, provider in enumerate(("chatgpt", "deepseek"))
+        }
+    elif args.backend == "local":
+        client = OpenAICompatibleClient("", LOCAL_BASE_URL)
+        backends = {"local": OpenAICompatibleBackend(client, LOCAL_MODEL)}
+
+def configure_streaming(args):
+    global STREAM_RESPONSES, RANKING_ONLY
+    STREAM_RESPONSES = args.stream
+    RANKING_ONLY = args.ranking_only
+
+def configure_batching(args):
+    global BATCHING_STRATEGY, BATCH_SIZE, BATCH_STEP, BIBD_REPLICATION, BIBD_COVERAGE, BIBD_SEED, AGGREGATION_METHOD
+    global PROMPT_TOKEN_BUDGET, MAX_PACKED_BATCH
+    BATCHING_STRATEGY = args.strategy
+    BATCH_SIZE = args.batch_size
+    BATCH_STEP = args.batch_step
+    BIBD_REPLICATION = args.replication
+    BIBD_COVERAGE = args.coverage
+    BIBD_SEED = args.seed
+    AGGREGATION_METHOD = args.aggregation
+    PROMPT_TOKEN_BUDGET = args.token_budget
+    MAX_PACKED_BATCH = args.max_batch
+
+def open_stores(args):
+    """
+    Opens the batch journal, the response cache and result store if enabled, and the telemetry outputs,
+    as configured by args.
+    """
+    global response_cache, batch_journal, result_store
+    telemetry.configure(args.trace, args.metrics_file, args.profile_stage, args.profile_dir)
+    if args.store:
+        result_store = storage.Store(args.store, args.store_format)
+    if args.fresh and os.path.exists(args.journal):
+        os.remove(args.journal)
+    batch_journal = Journal(args.journal)
+    print(f"Resuming with {len(batch_journal)} completed batches from {args.journal}")
+    if args.cache or args.cache_file or args.cache_only:
+        cache_kwargs = {"cache_only": args.cache_only}
+        if args.cache_file:
+            cache_kwargs["path"] = args.cache_file
+        response_cache = ResponseCache(**cache_kwargs)
+
+def close_stores():
+    """
+    Closes the journal, response cache and result store, prints the cache and per-backend call statistics and
+    writes the final telemetry.
+    """
+    global response_cache, batch_journal, result_store
+    if result_store is not None:
+        result_store.close()
+        result_store = None
+    if response_cache is not None:
+        print("Response cache:", response_cache.stats())
+        response_cache.close()
+        response_cache = None
+    if batch_journal is not None:
+        batch_journal.close()
+        batch_journal = None
+    for provider, backend in backends.items():
+        print(f"{provider} API:", backend.metrics())
+    telemetry.close()
+
+def load_candidates(args):
+    """
+    The candidate summaries of args.dataset, without near duplicates with --skip-duplicates.
+    """
+    candidates = read_dataset(args.dataset)
+    if args.skip_duplicates:
+        candidates = dedup.drop_duplicates(candidates, args.duplicate_threshold)
+    return candidates
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_batching(args)
+    configure_streaming(args)
+    configure_backends(args)
+    if args.estimate:
+        estimate_domain_costs(group_candidates_by_domain(load_candidates(args)))
+        return
+    open_stores(args)
+    try:
+        run(args)
+    finally:
+        close_stores()
+
+def run(args):
+    """
+    Ranks the candidates of every domain with every provider, as configured by args.
+    """
+    candidates = load_candidates(args)
     if not candidates:
         print("No candidate data found. Please check the JSON file.")
         return
 
-    grouped_candidates = {}
-    for cand in candidates:
-        domain = cand.get("domain", "").upper()
-        if domain not in grouped_candidates:
-            grouped_candidates[domain] = []
-        grouped_candidates[domain].append(cand)
+    grouped_candidates = group_candidates_by_domain(candidates)
 
-    for domain in categories:
-        domain_upper = domain.upper()
-        print(f"\nProcessing domain: {domain_upper}")
-        domain_candidates = grouped_candidates.get(domain_upper, [])
-        if not domain_candidates:
-            print(f"No candidates found for domain '{domain_upper}'. Skipping.")
-            continue
+    if not args.concurrent:
+        for domain in categories:
+            process_domain(domain, grouped_candidates)
+            time.sleep(2)
+        return
 
-        details = job_details.get(domain_upper, {
-            "job_description": f"Job description for {domain}",
-            "requirements": f"Requirements for {domain}"
-        })
-        job_desc = details["job_description"]
-        requirements = details["requirements"]
-
-        if len(domain_candidates) > BATCH_SIZE:
-            print(f"Domain '{domain_upper}' has {len(domain_candidates)} candidates. Using batch ranking.")
-            batch_responses_chatgpt = rank_candidates_in_batches(
-                rank_candidates_chatgpt_batch, job_desc, requirements, domain_candidates, batch_size=BATCH_SIZE, step=BATCH_STEP
-            )
-            global_ranking_chatgpt = merge_batch_rankings(batch_responses_chatgpt, BATCH_SIZE)
-            filename = f"chatgpt_{domain_upper}_global_ranking.json"
-            save_results(filename, global_ranking_chatgpt)
-
-            batch_responses_deepseek = rank_candidates_in_batches(
-                rank_candidates_deepseek_batch, job_desc, requirements, domain_candidates, batch_size=BATCH_SIZE, step=BATCH_STEP
-            )
-            global_ranking_deepseek = merge_batch_rankings(batch_responses_deepseek, BATCH_SIZE)
-            filename = f"deepseek_{domain_upper}_global_ranking.json"
-            save_results(filename, global_ranking_deepseek)
-        else:
-            print(f"Domain '{domain_upper}' has {len(domain_candidates)} candidates. Using single prompt.")
-            chatgpt_result = rank_candidates_chatgpt_batch(job_desc, requirements, domain_candidates)
-            if chatgpt_result:
-                try:
-                    ranking_chatgpt = json.loads(chatgpt_result)
-                except Exception as e:
-                    print("Error parsing ChatGPT ranking:", e)
-                    ranking_chatgpt = {}
-                filename = f"chatgpt_{domain_upper}_global_ranking.json"
-                save_results(filename, ranking_chatgpt)
-            
-            deepseek_result = rank_candidates_deepseek_batch(job_desc, requirements, domain_candidates)
-            if deepseek_result:
-                try:
-                    ranking_deepseek = json.loads(deepseek_result)
-                except Exception as e:
-                    print("Error parsing DeepSeek ranking:", e)
-                    ranking_deepseek = {}
-                filename = f"deepseek_{domain_upper}_global_ranking.json"
-                save_results(filename, ranking_deepseek)
-        
-        time.sleep(2)
+    provider_executors = {
+        provider: ThreadPoolExecutor(max_workers=getattr(args, f"{provider}_concurrency"))
+        for provider in backends
+    }
+    try:
+        with ThreadPoolExecutor(max_workers=args.domain_concurrency) as domain_executor:
+            futures = [
+                domain_executor.submit(process_domain, domain, grouped_candidates, provider_executors)
+                for domain in categories
+            ]
+            for future in futures:
+                future.result()
+    finally:
+        for executor in provider_executors.values():
+            executor.shutdown()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,127 @@
+import os
+import json
+import hashlib
+import threading
+
+# =======================================
+# Configuration
+# =======================================
+CHECKPOINT_DIR = ".checkpoints"
+
+
+def text_hash(text):
+    """
+    Returns the SHA-256 hex digest of a string.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def file_hash(path, chunk_size=1024 * 1024):
+    """
+    Returns the SHA-256 hex digest of a file's content.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_fingerprint(path, previous=None):
+    """
+    Returns a fingerprint dictionary (size, mtime, sha256) for a file.
+    If a previous fingerprint with the same size and mtime is given, its hash is reused
+    instead of re-reading the file.
+    """
+    stat = os.stat(path)
+    fingerprint = {"size": stat.st_size, "mtime": stat.st_mtime}
+    if previous and previous.get("size") == stat.st_size and previous.get("mtime") == stat.st_mtime and previous.get("sha256"):
+        fingerprint["sha256"] = previous["sha256"]
+    else:
+        fingerprint["sha256"] = file_hash(path)
+    return fingerprint
+
+
+def same_content(fingerprint, other):
+    """
+    Two fingerprints describe the same content when their hashes match,
+    so a touched but unchanged file is not treated as new.
+    """
+    if not fingerprint or not other:
+        return False
+    return fingerprint.get("sha256") == other.get("sha256") and fingerprint.get("extra") == other.get("extra")
+
+
+class Journal:
+    """
+    Append-only JSONL journal of completed work units.
+    Every entry is flushed and fsync'ed as soon as it is written, so a crash or Ctrl-C
+    loses at most the unit in progress. A torn last line is ignored on load.
+    When the same key is written several times, the last entry wins.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._load()
+        # A torn write from an earlier crash leaves no trailing newline; start on a fresh line.
+        self._needs_newline = self._has_torn_tail()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    print(f"Ignoring incomplete journal entry in {self.path}.")
+                    continue
+                self.entries[entry["key"]] = entry
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """
+        Returns the journal entry for key ({"key", "value", ...}) or None.
+        """
+        return self.entries.get(key)
+
+    def append(self, key, value, **fields):
+        """
+        Durably records a completed unit of work.
+        """
+        entry = {"key": key, "value": value}
+        entry.update(fields)
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._needs_newline:
+                self._file.write("\n")
+                self._needs_newline = False
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.entries[key] = entry
+
+    def _has_torn_tail(self):
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return False
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b"\n"
+
+    def close(self):
+        with self._lock:
+            self._file.close()
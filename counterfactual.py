@@ -0,0 +1,240 @@
+import json
+import argparse
+import threading
+from functools import partial
+from concurrent.futures import Future, ThreadPoolExecutor
+import bias_detection
+from checkpoint import text_hash
+
+# =======================================
+# Configuration
+# =======================================
+# original: prompts as in a normal run; gender_swap: every gender replaced by its counterpart;
+# ethnicity_rotate: every ethnicity replaced by the next one seen in the domain (in sorted order);
+# blind: Gender and Ethnicity lines removed from the prompt.
+VARIANTS = ("original", "gender_swap", "ethnicity_rotate", "blind")
+GENDER_SWAP = {
+    "Male": "Female", "Female": "Male",
+    "male": "female", "female": "male",
+    "M": "F", "F": "M"
+}
+OUTPUT_FILE = "counterfactual_deltas.jsonl"
+
+
+# =======================================
+# Variants
+# =======================================
+
+def ethnicity_rotation(candidates):
+    """
+    Maps every ethnicity seen among candidates to the next one in sorted order (the last to the first).
+    """
+    values = sorted({str(cand.get("ethnicity")) for cand in candidates})
+    return {value: values[(i + 1) % len(values)] for i, value in enumerate(values)}
+
+def variant_batch(batch, variant, rotation):
+    """
+    Returns copies of the batch's candidate records with the variant's demographics.
+    """
+    if variant == "original":
+        return batch
+    variant_cands = []
+    for cand in batch:
+        cand = dict(cand)
+        if variant == "gender_swap":
+            cand["gender"] = GENDER_SWAP.get(cand.get("gender"), cand.get("gender"))
+        elif variant == "ethnicity_rotate":
+            cand["ethnicity"] = rotation.get(str(cand.get("ethnicity")), cand.get("ethnicity"))
+        elif variant == "blind":
+            cand.pop("gender", None)
+            cand.pop("ethnicity", None)
+        variant_cands.append(cand)
+    return variant_cands
+
+def plan_domain(domain, candidates, variants):
+    """
+    Lists the (window, variant, candidates) prompts of a counterfactual study of one domain, with
+    the windows of the configured batching strategy (the whole domain when it fits one prompt).
+    The variants of a window are listed together.
+    """
+    job_desc, requirements = bias_detection.get_job_details(domain)
+    if len(candidates) > bias_detection.BATCH_SIZE:
+        windows = bias_detection.make_domain_batches(job_desc, requirements, candidates)
+    else:
+        windows = [candidates]
+    rotation = ethnicity_rotation(candidates)
+    return [
+        (window, variant, variant_batch(batch, variant, rotation))
+        for window, batch in enumerate(windows)
+        for variant in variants
+    ]
+
+
+# =======================================
+# Runner
+# =======================================
+
+def ranking_deltas(provider, domain, window, variant, batch, original, ranked):
+    """
+    Paired ranking deltas of one window: for every candidate ranked in both the original and the
+    variant prompt, its 0-based positions and delta = variant position - original position
+    (positive when the variant moved the candidate down).
+    """
+    original_positions = {name: i for i, name in enumerate(original["ranking"])}
+    deltas = []
+    for position, name in enumerate(ranked["ranking"]):
+        if name not in original_positions:
+            continue
+        cand = next((cand for cand in batch if cand.get("file_name") == name), {})
+        deltas.append({
+            "provider": provider, "domain": domain, "window": window, "variant": variant, "file_name": name,
+            "gender": cand.get("gender"), "ethnicity": cand.get("ethnicity"),
+            "original_position": original_positions[name], "variant_position": position,
+            "delta": position - original_positions[name]
+        })
+    return deltas
+
+def run_provider(provider, domain, plan, executor, write):
+    """
+    Ranks a domain's planned prompts with one provider and streams the paired deltas of each
+    window to write() as soon as all its variants are ranked, in window order.
+    Work is shared in two ways. The original windows use the journal keys of bias_detection.py,
+    so after a normal run they are read from its journal instead of being sent again. And a
+    variant that leaves a window unchanged (an ethnicity rotation in a domain with one ethnicity,
+    a gender swap over unknown genders) yields the original's prompt and shares its result.
+    Prompts are submitted in plan order, so the variants of a window run back-to-back.
+    Returns counts of the planned prompts: "shared" with an identical prompt, "journaled"
+    (answered by the journal) and "sent" to the provider.
+    """
+    backend = bias_detection.backends[provider]
+    model_func = partial(bias_detection.rank_candidates_with_backend, backend)
+    journal_prefix = f"{backend.name}/{backend.model}/{domain}/"
+    job_desc, requirements = bias_detection.get_job_details(domain)
+
+    results = {}
+    windows = {}
+    counts = {"planned": len(plan), "shared": 0, "journaled": 0, "sent": 0}
+    journal = bias_detection.batch_journal
+    for window, variant, batch in plan:
+        key = text_hash(bias_detection.construct_prompt(job_desc, requirements, batch))
+        if key in results:
+            counts["shared"] += 1
+        else:
+            counts["journaled" if journal is not None and journal_prefix + key in journal else "sent"] += 1
+            args = (model_func, job_desc, requirements, batch, journal_prefix)
+            if executor is None:
+                results[key] = Future()
+                results[key].set_result(bias_detection.rank_single_batch(*args))
+            else:
+                results[key] = executor.submit(bias_detection.rank_single_batch, *args)
+        windows.setdefault(window, []).append((variant, batch, results[key]))
+
+    for window, entries in sorted(windows.items()):
+        ranked = {variant: (batch, future.result()) for variant, batch, future in entries}
+        original = ranked.get("original", (None, None))[1]
+        if not original:
+            print(f"{provider} / {domain} window {window}: no original ranking. Skipping its variants.")
+            continue
+        for variant, (batch, parsed) in ranked.items():
+            if variant == "original":
+                continue
+            if not parsed:
+                print(f"{provider} / {domain} window {window}: no {variant} ranking.")
+                continue
+            write(ranking_deltas(provider, domain, window, variant, ranked["original"][0], original, parsed))
+    return counts
+
+def summarize_deltas(path):
+    """
+    Mean delta and count per provider, variant, attribute and original group, from the deltas file.
+    """
+    totals = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            row = json.loads(line)
+            for attribute in ("gender", "ethnicity"):
+                key = (row["provider"], row["variant"], attribute, str(row[attribute]))
+                total = totals.setdefault(key, [0, 0])
+                total[0] += row["delta"]
+                total[1] += 1
+    return {key: (delta / count, count) for key, (delta, count) in sorted(totals.items())}
+
+def run(args):
+    grouped_candidates = bias_detection.group_candidates_by_domain(bias_detection.load_candidates(args))
+    domains = [domain.upper() for domain in (args.domains or bias_detection.categories)]
+    variants = ["original"] + [variant for variant in args.variants if variant != "original"]
+    lock = threading.Lock()
+    counts = {}
+
+    with open(args.output, "w", encoding="utf-8") as out:
+        def write(rows):
+            with lock:
+                for row in rows:
+                    out.write(json.dumps(row) + "\n")
+                out.flush()
+
+        def study(provider, domain, executor=None):
+            candidates = grouped_candidates.get(domain, [])
+            if not candidates:
+                return
+            print(f"Counterfactual study of {domain} with {provider}: {', '.join(variants)}")
+            study_counts = run_provider(provider, domain, plan_domain(domain, candidates, variants), executor, write)
+            with lock:
+                for name, value in study_counts.items():
+                    counts[name] = counts.get(name, 0) + value
+
+        if not args.concurrent:
+            for domain in domains:
+                for provider in bias_detection.backends:
+                    study(provider, domain)
+        else:
+            provider_executors = {
+                provider: ThreadPoolExecutor(max_workers=getattr(args, f"{provider}_concurrency"))
+                for provider in bias_detection.backends
+            }
+            try:
+                with ThreadPoolExecutor(max_workers=args.domain_concurrency * len(provider_executors)) as study_executor:
+                    futures = [
+                        study_executor.submit(study, provider, domain, executor)
+                        for domain in domains
+                        for provider, executor in provider_executors.items()
+                    ]
+                    for future in futures:
+                        future.result()
+            finally:
+                for executor in provider_executors.values():
+                    executor.shutdown()
+
+    print(f"{counts.get('planned', 0)} prompts: {counts.get('shared', 0)} shared with an identical prompt, "
+          f"{counts.get('journaled', 0)} answered by the journal, {counts.get('sent', 0)} sent.")
+    print(f"Paired deltas saved to {args.output}")
+    for (provider, variant, attribute, group), (mean, count) in summarize_deltas(args.output).items():
+        print(f"{provider:<9} {variant:<17} {attribute:<10} {group:<12} mean delta {mean:+.3f} over {count} pairs")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Rerun the ranking windows with swapped or removed demographics and measure the ranking shifts.",
+        epilog="Also accepts the batching, backend, cache and journal options of bias_detection.py."
+    )
+    parser.add_argument("--variants", nargs="+", choices=VARIANTS, default=list(VARIANTS[1:]),
+                        help="Counterfactual variants compared with the original prompts.")
+    parser.add_argument("--domains", nargs="+", default=None, help="Domains to study (default: all).")
+    parser.add_argument("--output", default=OUTPUT_FILE, help="JSONL file for the paired deltas.")
+    args, ranking_argv = parser.parse_known_args(argv)
+    ranking_args = bias_detection.parse_args(ranking_argv)
+    if ranking_args.strategy == "tournament":
+        parser.error("the tournament strategy picks each round from the previous one; use a static strategy")
+    for name, value in vars(args).items():
+        setattr(ranking_args, name, value)
+
+    bias_detection.configure_batching(ranking_args)
+    bias_detection.configure_streaming(ranking_args)
+    bias_detection.configure_backends(ranking_args)
+    bias_detection.open_stores(ranking_args)
+    try:
+        run(ranking_args)
+    finally:
+        bias_detection.close_stores()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+import re
+import json
+import zlib
+import argparse
+import numpy as np
+import storage
+
+# =======================================
+# Configuration
+# =======================================
+SUMMARY_FILE = "resume_summaries.json"
+REPORT_FILE = "duplicates_report.json"
+# Estimated Jaccard similarity of word shingles above which two resumes count as near duplicates.
+THRESHOLD = 0.8
+# Words per shingle; longer shingles keep resumes that merely share a template's headings apart.
+SHINGLE_WORDS = 5
+NUM_PERM = 128
+# LSH bands of NUM_PERM // BANDS rows: a pair becomes a candidate when any band matches, with
+# probability 1 - (1 - s^rows)^BANDS for similarity s (about 1.0 at 0.8, 0.87 at 0.5 with 32 x 4).
+BANDS = 32
+SEED = 0
+# Multiplier combining the word hashes of a shingle (64-bit golden ratio).
+SHINGLE_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+WORD_PATTERN = re.compile(r"\w+")
+
+
+# =======================================
+# MinHash Signatures
+# =======================================
+
+class MinHasher:
+    """
+    MinHash signatures of texts over their word SHINGLE_WORDS-grams, with num_perm
+    multiply-shift hash functions ((a * x + b) mod 2^64) >> 32. The same seed gives the same
+    signatures in every process.
+    """
+
+    def __init__(self, num_perm=NUM_PERM, shingle_words=SHINGLE_WORDS, seed=SEED):
+        self.num_perm = num_perm
+        self.shingle_words = shingle_words
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(0, 1 << 63, size=(num_perm, 1), dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.b = rng.integers(0, 1 << 63, size=(num_perm, 1), dtype=np.uint64)
+
+    def shingle_hashes(self, text):
+        """
+        Distinct 64-bit hashes of the text's shingles (the whole text when it is shorter than one).
+        Each word is hashed once and a shingle's hash combines its words' hashes, all shingles at once.
+        """
+        words = np.fromiter((zlib.crc32(word.encode("utf-8")) for word in WORD_PATTERN.findall(text.lower())),
+                            dtype=np.uint64)
+        size = min(self.shingle_words, len(words))
+        if not size:
+            return words
+        count = len(words) - size + 1
+        hashes = words[:count].copy()
+        for offset in range(1, size):
+            hashes = hashes * SHINGLE_MULTIPLIER + words[offset:offset + count]
+        return np.unique(hashes)
+
+    def signature(self, text):
+        """
+        Signature array of num_perm values, or None for a text without words.
+        """
+        hashes = self.shingle_hashes(text)
+        if not len(hashes):
+            return None
+        return ((self.a * hashes[None, :] + self.b) >> np.uint64(32)).min(axis=1)
+
+
+def similarity(signature, others):
+    """
+    Estimated Jaccard similarity of a signature with each row of others.
+    """
+    return (others == signature).mean(axis=1)
+
+
+# =======================================
+# Locality-Sensitive Hashing
+# =======================================
+
+def find_duplicates(signatures, threshold=THRESHOLD, bands=BANDS):
+    """
+    Assigns every signature to a representative, in order: a signature joins the most similar
+    earlier representative with estimated similarity of at least threshold, or becomes a
+    representative itself. Only representatives are indexed, in bands buckets each, and a
+    signature is compared only with the representatives it shares a bucket with, so the work
+    grows with the number of candidates rather than of pairs. Every member is similar to its
+    own representative (no chaining). None signatures (texts without words) stay on their own.
+    Returns [(representative index, similarity)]; a representative maps to (itself, 1.0).
+    """
+    buckets = [{} for _ in range(bands)]
+    assignments = []
+    for index, signature in enumerate(signatures):
+        if signature is None:
+            assignments.append((index, 1.0))
+            continue
+        rows = len(signature) // bands
+        keys = [signature[band * rows:(band + 1) * rows].tobytes() for band in range(bands)]
+        candidates = sorted({rep for band, key in enumerate(keys) for rep in buckets[band].get(key, ())})
+        if candidates:
+            scores = similarity(signature, np.stack([signatures[rep] for rep in candidates]))
+            best = int(np.argmax(scores))
+            if scores[best] >= threshold:
+                assignments.append((candidates[best], float(scores[best])))
+                continue
+        for band, key in enumerate(keys):
+            buckets[band].setdefault(key, []).append(index)
+        assignments.append((index, 1.0))
+    return assignments
+
+def find_domain_duplicates(records, texts, threshold=THRESHOLD, hasher=None):
+    """
+    find_duplicates over texts, separately within each domain of the matching records, so a
+    representative is always from its members' domain. Returns [(representative index, similarity)]
+    with indices into records.
+    """
+    hasher = hasher or MinHasher()
+    by_domain = {}
+    for index, record in enumerate(records):
+        by_domain.setdefault(str(record.get("domain", "")).upper(), []).append(index)
+    assignments = [None] * len(records)
+    for indices in by_domain.values():
+        signatures = [hasher.signature(texts[index] or "") for index in indices]
+        for index, (rep, score) in zip(indices, find_duplicates(signatures, threshold)):
+            assignments[index] = (indices[rep], score)
+    return assignments
+
+
+# =======================================
+# Summaries and Reports
+# =======================================
+
+def reuse_summary(record, candidate, similarity):
+    """
+    Summary record of candidate copied from its representative's record: the representative's
+    summary with the candidate's own identity and demographics, marked with duplicate_of.
+    """
+    return {
+        **record,
+        "file_name": candidate.get("file_name"),
+        "domain": candidate.get("domain"),
+        "gender": candidate.get("gender"),
+        "ethnicity": candidate.get("ethnicity"),
+        "duplicate_of": record.get("file_name"),
+        "duplicate_similarity": round(similarity, 3)
+    }
+
+def mark_duplicates(records, threshold=THRESHOLD, texts=None):
+    """
+    Copies of records with duplicate_of (and duplicate_similarity) set on every near duplicate of
+    an earlier record in the same domain, comparing texts (the summaries by default). Records
+    marked already keep their marks.
+    """
+    if texts is None:
+        texts = [str(record.get("summary") or "") for record in records]
+    marked = []
+    for index, (record, (rep, score)) in enumerate(zip(records, find_domain_duplicates(records, texts, threshold))):
+        if rep == index or record.get("duplicate_of"):
+            marked.append(record)
+        else:
+            marked.append({**record, "duplicate_of": records[rep].get("file_name"),
+                           "duplicate_similarity": round(score, 3)})
+    return marked
+
+def drop_duplicates(records, threshold=THRESHOLD):
+    """
+    Records without their near duplicates (see mark_duplicates), so that a resume submitted several
+    times is ranked and counted once. Prints how many were dropped per domain.
+    """
+    marked = mark_duplicates(records, threshold)
+    for domain, entry in duplicate_report(marked).items():
+        if entry["duplicates"]:
+            print(f"{domain}: skipping {entry['duplicates']} near-duplicate resumes of {entry['candidates']}")
+    return [record for record in marked if not record.get("duplicate_of")]
+
+def duplicate_report(records):
+    """
+    Per-domain summary of the duplicate_of marks: candidate and duplicate counts and each
+    cluster's representative with its members (and their demographics, since duplicates
+    weigh on the group statistics).
+    """
+    report = {}
+    for record in records:
+        domain = str(record.get("domain", "")).upper()
+        entry = report.setdefault(domain, {"candidates": 0, "duplicates": 0, "clusters": {}})
+        entry["candidates"] += 1
+        if record.get("duplicate_of"):
+            entry["duplicates"] += 1
+            entry["clusters"].setdefault(record["duplicate_of"], []).append({
+                "file_name": record.get("file_name"), "similarity": record.get("duplicate_similarity"),
+                "gender": record.get("gender"), "ethnicity": record.get("ethnicity")
+            })
+    for entry in report.values():
+        entry["clusters"] = [{"representative": rep, "members": members} for rep, members in entry["clusters"].items()]
+    return dict(sorted(report.items()))
+
+def print_report(report):
+    print(f"{'domain':<22} {'candidates':>10} {'clusters':>8} {'duplicates':>10} {'share':>6}")
+    for domain, entry in report.items():
+        share = entry["duplicates"] / entry["candidates"] if entry["candidates"] else 0.0
+        print(f"{domain:<22} {entry['candidates']:>10} {len(entry['clusters']):>8} {entry['duplicates']:>10} {share:>6.1%}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find near-duplicate resumes with MinHash and LSH.")
+    parser.add_argument("--input", default=SUMMARY_FILE,
+                        help="Summary records: a JSON file, or a store directory with a summaries table.")
+    parser.add_argument("--field", choices=("summary", "resume"), default="summary",
+                        help="Compare the summaries, or the full resume texts (PDF, through the text cache).")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="Estimated Jaccard similarity from which resumes count as near duplicates.")
+    parser.add_argument("--output", default=REPORT_FILE, help="JSON file for the per-domain report.")
+    args = parser.parse_args(argv)
+
+    records = list(storage.read_records(args.input, "summaries"))
+    if args.field == "resume":
+        import resume_summarisation
+        texts = [resume_summarisation.get_resume_text(record) for record in records]
+    else:
+        texts = None
+    report = duplicate_report(mark_duplicates(records, args.threshold, texts))
+    print_report(report)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
+    print(f"Report saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
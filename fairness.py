@@ -0,0 +1,306 @@
+import os
+import json
+import argparse
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import dedup
+import storage
+
+# =======================================
+# Configuration
+# =======================================
+SUMMARY_FILE = "resume_summaries.json"
+PROVIDERS = ("chatgpt", "deepseek")
+ATTRIBUTES = ("gender", "ethnicity")
+OUTPUT_FILE = "fairness_report.json"
+# Size of the selection ("shortlist") for the top-k selection rates.
+TOP_K = 10
+# Impact ratio below which a group fails the four-fifths rule.
+FOUR_FIFTHS = 0.8
+# Persistence of the rank-biased parity weights: position r gets (1 - p) * p^(r - 1).
+RBP_PERSISTENCE = 0.9
+RESAMPLES = 10000
+CONFIDENCE = 0.95
+# Resamples drawn at once; bounds memory at about RESAMPLE_CHUNK x candidates values per metric.
+RESAMPLE_CHUNK = 1000
+METRICS = ("exposure", "exposure_ratio", "ndcg", "selection_rate", "impact_ratio", "rbp_share", "rbp_parity")
+# Metrics that get a permutation p-value.
+TESTED_METRICS = ("exposure_ratio", "selection_rate", "rbp_parity")
+
+
+# =======================================
+# Loading
+# =======================================
+
+def ranking_file(provider, domain):
+    return f"{provider}_{domain.upper()}_global_ranking.json"
+
+def ranked_files(ranking):
+    """
+    File names in ranked order, from either ranking format: a list of file names (single prompt)
+    or a list of [file name, score] pairs (merged batches).
+    """
+    return [entry if isinstance(entry, str) else entry[0] for entry in ranking]
+
+def load_demographics(summary_file=SUMMARY_FILE, skip_duplicates=False, duplicate_threshold=dedup.THRESHOLD):
+    """
+    Maps (DOMAIN, file name) to the candidate's summary record, from a JSON file or from the
+    summaries table of a store directory. With skip_duplicates, near-duplicate resumes are left
+    out (see dedup.drop_duplicates), so that each counts once in the statistics.
+    """
+    candidates = list(storage.read_records(summary_file, "summaries"))
+    if skip_duplicates:
+        candidates = dedup.drop_duplicates(candidates, duplicate_threshold)
+    return {(cand.get("domain", "").upper(), cand.get("file_name")): cand for cand in candidates}
+
+def load_ranking(provider, domain, demographics):
+    """
+    Joins a saved global ranking with the demographics of its candidates.
+    Returns (files, {attribute: group label per file}), in ranked order, or None if there is no
+    ranking for the domain. Ranked files without a summary record are left out.
+    """
+    path = ranking_file(provider, domain)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        ranking = json.load(f).get("ranking", [])
+    files = [name for name in ranked_files(ranking) if (domain.upper(), name) in demographics]
+    groups = {
+        attribute: [str(demographics[(domain.upper(), name)].get(attribute)) for name in files]
+        for attribute in ATTRIBUTES
+    }
+    return files, groups
+
+def encode_groups(labels):
+    """
+    Returns (sorted distinct labels, integer code of every label).
+    """
+    names, codes = np.unique(np.array(labels, dtype=object).astype(str), return_inverse=True)
+    return list(names), codes
+
+
+# =======================================
+# Metrics
+# =======================================
+
+def position_weights(n, top_k=TOP_K, persistence=RBP_PERSISTENCE):
+    """
+    Per-position weights for ranks 1..n: logarithmic exposure 1/log2(1 + r), top-k indicator
+    and rank-biased (geometric) weight.
+    """
+    ranks = np.arange(1, n + 1)
+    return {
+        "exposure": 1.0 / np.log2(1.0 + ranks),
+        "selected": (ranks <= top_k).astype(float),
+        "rbp": (1.0 - persistence) * persistence ** (ranks - 1)
+    }
+
+def group_metrics(codes, positions, n_groups, weights):
+    """
+    Fairness metrics of every group, for a batch of (resampled or permuted) rankings.
+    codes is a (rankings x n) array of group codes and positions the matching 0-based ranked
+    positions (or a single row shared by all rankings). Every metric gets one value per ranking
+    and group:
+      exposure        mean exposure 1/log2(1 + rank) of the group's members
+      exposure_ratio  group mean exposure over the mean exposure of all candidates
+      ndcg            DCG of the group's positions over the ideal DCG (all members ranked first)
+      selection_rate  share of the group's members within the top k
+      impact_ratio    selection rate over the highest selection rate of any group (four-fifths rule)
+      rbp_share       share of the rank-biased weight that goes to the group
+      rbp_parity      rbp_share minus the group's share of the candidates
+    Returns {metric: array of shape (rankings, n_groups)}.
+    """
+    rankings, n = codes.shape
+    exposure = weights["exposure"][positions]
+    selected = weights["selected"][positions]
+    rbp = weights["rbp"][positions]
+    ideal = np.concatenate([[0.0], np.cumsum(weights["exposure"])])
+
+    counts = np.empty((rankings, n_groups))
+    sums = {name: np.empty((rankings, n_groups)) for name in ("exposure", "selected", "rbp")}
+    for group in range(n_groups):
+        member = codes == group
+        counts[:, group] = member.sum(axis=1)
+        sums["exposure"][:, group] = (exposure * member).sum(axis=1)
+        sums["selected"][:, group] = (selected * member).sum(axis=1)
+        sums["rbp"][:, group] = (rbp * member).sum(axis=1)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_exposure = sums["exposure"] / counts
+        selection_rate = sums["selected"] / counts
+        rbp_share = sums["rbp"] / sums["rbp"].sum(axis=1, keepdims=True)
+        # The ideal DCG of a group depends only on its size: its members in the first positions.
+        ndcg = np.where(counts > 0, sums["exposure"] / ideal[counts.astype(int)], np.nan)
+        metrics = {
+            "exposure": mean_exposure,
+            "exposure_ratio": mean_exposure / (exposure.sum(axis=1, keepdims=True) / n),
+            "ndcg": ndcg,
+            "selection_rate": selection_rate,
+            "impact_ratio": selection_rate / np.nanmax(selection_rate, axis=1, keepdims=True),
+            "rbp_share": rbp_share,
+            "rbp_parity": rbp_share - counts / n
+        }
+    return metrics
+
+
+# =======================================
+# Resampling
+# =======================================
+
+def bootstrap_intervals(codes, n_groups, weights, resamples, confidence, rng):
+    """
+    Percentile bootstrap confidence intervals of every metric and group, resampling candidates
+    (with their positions) with replacement. Resamples are drawn in chunks of RESAMPLE_CHUNK and
+    each chunk is evaluated as one array.
+    Returns {metric: (low, high)} with arrays of shape (n_groups,).
+    """
+    n = len(codes)
+    draws = {name: [] for name in METRICS}
+    for start in range(0, resamples, RESAMPLE_CHUNK):
+        size = min(RESAMPLE_CHUNK, resamples - start)
+        samples = rng.integers(0, n, size=(size, n))
+        for name, values in group_metrics(codes[samples], samples, n_groups, weights).items():
+            draws[name].append(values)
+    alpha = (1.0 - confidence) / 2.0
+    intervals = {}
+    for name in METRICS:
+        values = np.concatenate(draws[name])
+        # A group can be missing from every resample of a small domain; its interval is then NaN.
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            intervals[name] = (np.nanquantile(values, alpha, axis=0), np.nanquantile(values, 1.0 - alpha, axis=0))
+    return intervals
+
+def permutation_pvalues(codes, n_groups, weights, observed, resamples, rng):
+    """
+    Two-sided permutation p-values for H0 "group membership is independent of rank": the group
+    labels are shuffled across positions, and a p-value is the share of shuffles in which a
+    metric deviates at least as much from its expected value under H0 as observed.
+    Returns {metric: array of shape (n_groups,)}.
+    """
+    n = len(codes)
+    null_draws = {name: [] for name in TESTED_METRICS}
+    for start in range(0, resamples, RESAMPLE_CHUNK):
+        size = min(RESAMPLE_CHUNK, resamples - start)
+        shuffled = rng.permuted(np.tile(codes, (size, 1)), axis=1)
+        metrics = group_metrics(shuffled, np.arange(n)[None, :], n_groups, weights)
+        for name in TESTED_METRICS:
+            null_draws[name].append(metrics[name])
+    pvalues = {}
+    for name in TESTED_METRICS:
+        null = np.concatenate(null_draws[name])
+        center = np.nanmean(null, axis=0)
+        extreme = np.abs(null - center) >= np.abs(observed[name] - center) - 1e-12
+        pvalues[name] = (1.0 + extreme.sum(axis=0)) / (1.0 + null.shape[0])
+    return pvalues
+
+
+# =======================================
+# Analysis
+# =======================================
+
+def analyse_ranking(task):
+    """
+    Computes the metrics, bootstrap intervals and permutation p-values of one
+    (provider, domain, attribute) ranking. Runs in a worker process.
+    """
+    provider, domain, attribute, labels, options, seed = task
+    rng = np.random.default_rng(seed)
+    names, codes = encode_groups(labels)
+    weights = position_weights(len(codes), options["top_k"], options["persistence"])
+    observed = {name: values[0] for name, values in
+                group_metrics(codes[None, :], np.arange(len(codes))[None, :], len(names), weights).items()}
+    intervals = bootstrap_intervals(codes, len(names), weights, options["resamples"], options["confidence"], rng)
+    pvalues = permutation_pvalues(codes, len(names), weights, observed, options["resamples"], rng)
+    counts = np.bincount(codes, minlength=len(names))
+    rows = []
+    for index, group in enumerate(names):
+        row = {"provider": provider, "domain": domain, "attribute": attribute, "group": group,
+               "candidates": int(counts[index])}
+        for name in METRICS:
+            row[name] = float(observed[name][index])
+            row[f"{name}_ci"] = [float(intervals[name][0][index]), float(intervals[name][1][index])]
+        for name, values in pvalues.items():
+            row[f"{name}_p"] = float(values[index])
+        row["four_fifths_violation"] = bool(observed["impact_ratio"][index] < FOUR_FIFTHS)
+        rows.append(row)
+    return rows
+
+def analysis_tasks(providers, domains, demographics, options, seed):
+    """
+    One task per (provider, domain, attribute) with a saved ranking, each with its own seed
+    spawned from seed, so results do not depend on the number of workers.
+    """
+    tasks = []
+    for provider in providers:
+        for domain in domains:
+            loaded = load_ranking(provider, domain, demographics)
+            if loaded is None or len(loaded[0]) < 2:
+                continue
+            for attribute in ATTRIBUTES:
+                tasks.append([provider, domain.upper(), attribute, loaded[1][attribute], options])
+    seeds = np.random.SeedSequence(seed).spawn(len(tasks))
+    return [tuple(task) + (child,) for task, child in zip(tasks, seeds)]
+
+def analyse(providers=PROVIDERS, domains=None, summary_file=SUMMARY_FILE, top_k=TOP_K, persistence=RBP_PERSISTENCE,
+            resamples=RESAMPLES, confidence=CONFIDENCE, seed=0, workers=None, skip_duplicates=False,
+            duplicate_threshold=dedup.THRESHOLD):
+    """
+    Fairness report rows for every group of every attribute, domain and provider with a saved ranking.
+    Tasks run in a process pool of workers processes (all cores by default; 1 runs serially).
+    """
+    demographics = load_demographics(summary_file, skip_duplicates, duplicate_threshold)
+    if domains is None:
+        domains = sorted({domain for domain, _ in demographics})
+    options = {"top_k": top_k, "persistence": persistence, "resamples": resamples, "confidence": confidence}
+    tasks = analysis_tasks(providers, domains, demographics, options, seed)
+    if workers == 1:
+        results = [analyse_ranking(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(analyse_ranking, tasks))
+    return [row for rows in results for row in rows]
+
+def print_report(rows):
+    print(f"{'provider':<9} {'domain':<22} {'attribute':<10} {'group':<10} {'n':>4} {'exp.ratio':>9} "
+          f"{'p':>6} {'ndcg':>6} {'sel.rate':>8} {'impact':>6} {'rbp.par':>8} {'p':>6}")
+    for row in rows:
+        flag = " <4/5" if row["four_fifths_violation"] else ""
+        print(f"{row['provider']:<9} {row['domain']:<22} {row['attribute']:<10} {row['group']:<10} "
+              f"{row['candidates']:>4} {row['exposure_ratio']:>9.3f} {row['exposure_ratio_p']:>6.3f} "
+              f"{row['ndcg']:>6.3f} {row['selection_rate']:>8.3f} {row['impact_ratio']:>6.3f} "
+              f"{row['rbp_parity']:>8.3f} {row['rbp_parity_p']:>6.3f}{flag}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure group fairness of the saved global rankings.")
+    parser.add_argument("--providers", nargs="+", default=list(PROVIDERS))
+    parser.add_argument("--domains", nargs="+", default=None, help="Domains to analyse (default: all in the summaries).")
+    parser.add_argument("--summaries", default=SUMMARY_FILE,
+                        help="Candidates' demographics: a summary JSON file, or a store directory with a summaries table.")
+    parser.add_argument("--top-k", type=int, default=TOP_K, help="Shortlist size for selection rates.")
+    parser.add_argument("--persistence", type=float, default=RBP_PERSISTENCE, help="Rank-biased parity persistence.")
+    parser.add_argument("--resamples", type=int, default=RESAMPLES, help="Bootstrap resamples and permutations.")
+    parser.add_argument("--confidence", type=float, default=CONFIDENCE, help="Confidence level of the intervals.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per core).")
+    parser.add_argument("--skip-duplicates", action="store_true",
+                        help="Leave near-duplicate resumes out of the statistics (see dedup.py).")
+    parser.add_argument("--duplicate-threshold", type=float, default=dedup.THRESHOLD,
+                        help="Estimated Jaccard similarity of the summaries from which resumes count as near duplicates.")
+    parser.add_argument("--output", default=OUTPUT_FILE, help="JSON file for the report.")
+    args = parser.parse_args(argv)
+
+    rows = analyse(args.providers, args.domains, args.summaries, args.top_k, args.persistence,
+                   args.resamples, args.confidence, args.seed, args.workers, args.skip_duplicates,
+                   args.duplicate_threshold)
+    if not rows:
+        print("No rankings found. Run bias_detection.py first.")
+        return
+    print_report(rows)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(rows, f, indent=4)
+    print(f"Report saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
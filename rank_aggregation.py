@@ -0,0 +1,258 @@
+import numpy as np
+from scipy import sparse
+
+# =======================================
+# Configuration
+# =======================================
+METHODS = ("borda", "normalized_borda", "copeland", "kemeny", "bradley_terry", "plackett_luce")
+# Virtual win and loss against an average opponent, so candidates that never win keep a finite strength.
+MLE_PRIOR = 0.5
+MLE_MAX_ITER = 500
+MLE_TOLERANCE = 1e-8
+KEMENY_MAX_PASSES = 200
+
+
+# =======================================
+# Position Matrix
+# =======================================
+
+class PositionMatrix:
+    """
+    Sparse candidates x batches matrix of ranking positions built from batch responses.
+    positions[c, b] holds the 1-based position of candidate c in batch b (0 when absent),
+    lengths[b] the number of ranked candidates in batch b.
+    """
+
+    def __init__(self, batch_responses):
+        self.names = []
+        index = {}
+        rows, cols, data = [], [], []
+        lengths = []
+        for response in batch_responses:
+            if response.get("final"):
+                continue
+            ranking = list(dict.fromkeys(response.get("ranking", [])))
+            if not ranking:
+                continue
+            batch = len(lengths)
+            for position, name in enumerate(ranking):
+                if name not in index:
+                    index[name] = len(self.names)
+                    self.names.append(name)
+                rows.append(index[name])
+                cols.append(batch)
+                data.append(position + 1)
+            lengths.append(len(ranking))
+        self.index = index
+        self.lengths = np.asarray(lengths, dtype=np.int64)
+        self.positions = sparse.csr_matrix(
+            (np.asarray(data, dtype=np.int64), (np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64))),
+            shape=(len(self.names), len(lengths))
+        )
+
+    @property
+    def n_candidates(self):
+        return len(self.names)
+
+    def batches_by_length(self):
+        """
+        Yields (k, I) where I is a (batches x k) array of candidate indices in ranked order,
+        for every batch length k present.
+        """
+        coo = self.positions.tocoo()
+        order = np.lexsort((coo.data, coo.col))
+        cand = coo.row[order]
+        starts = np.concatenate(([0], np.cumsum(self.lengths)[:-1]))
+        # Batches are contiguous after sorting by batch then position.
+        for k in np.unique(self.lengths):
+            selected = np.flatnonzero(self.lengths == k)
+            offsets = starts[selected][:, None] + np.arange(k)[None, :]
+            yield int(k), cand[offsets]
+
+    def pairwise_wins(self):
+        """
+        Returns the sparse matrix W where W[i, j] is the number of batches ranking i above j.
+        """
+        n = self.n_candidates
+        winners, losers = [], []
+        for k, I in self.batches_by_length():
+            if k < 2:
+                continue
+            upper, lower = np.triu_indices(k, 1)
+            winners.append(I[:, upper].ravel())
+            losers.append(I[:, lower].ravel())
+        if not winners:
+            return sparse.csr_matrix((n, n))
+        winners = np.concatenate(winners)
+        losers = np.concatenate(losers)
+        return sparse.coo_matrix((np.ones(len(winners)), (winners, losers)), shape=(n, n)).tocsr()
+
+
+# =======================================
+# Aggregation Methods
+# =======================================
+
+def borda_scores(matrix):
+    """
+    Raw Borda count: k - i points for position i (0-indexed) in a batch of size k, summed.
+    Matches merge_batch_rankings.
+    """
+    coo = matrix.positions.tocoo()
+    points = matrix.lengths[coo.col] - coo.data + 1
+    return np.bincount(coo.row, weights=points, minlength=matrix.n_candidates)
+
+def normalized_borda_scores(matrix):
+    """
+    Mean normalized Borda score: (k - 1 - i) / (k - 1) per appearance, averaged over the
+    batches a candidate appeared in, so candidates at the edges of the sliding window
+    (fewer appearances) are not penalised.
+    """
+    coo = matrix.positions.tocoo()
+    k = matrix.lengths[coo.col].astype(float)
+    points = np.where(k > 1, (k - coo.data) / np.maximum(k - 1, 1), 1.0)
+    totals = np.bincount(coo.row, weights=points, minlength=matrix.n_candidates)
+    appearances = np.bincount(coo.row, minlength=matrix.n_candidates)
+    return totals / np.maximum(appearances, 1)
+
+def copeland_scores(matrix, wins=None):
+    """
+    Copeland score: number of head-to-head majorities won minus lost.
+    """
+    wins = matrix.pairwise_wins() if wins is None else wins
+    margin = (wins - wins.T).tocsr()
+    positive = np.asarray((margin > 0).sum(axis=1)).ravel()
+    negative = np.asarray((margin < 0).sum(axis=1)).ravel()
+    return (positive - negative).astype(float)
+
+def kemeny_order(matrix, wins=None, initial_scores=None, max_passes=KEMENY_MAX_PASSES):
+    """
+    Kemeny approximation: starting from the normalized Borda order, repeated odd-even passes
+    swap adjacent candidates whenever more batches prefer the lower one, until no adjacent
+    swap reduces the Kendall-tau disagreement (a local Kemeny optimum).
+    Returns candidate indices from best to worst.
+    """
+    wins = matrix.pairwise_wins() if wins is None else wins
+    scores = normalized_borda_scores(matrix) if initial_scores is None else initial_scores
+    order = np.lexsort((np.arange(len(scores)), -scores))
+    for _ in range(max_passes):
+        swapped = False
+        for parity in (0, 1):
+            left = np.arange(parity, len(order) - 1, 2)
+            if not len(left):
+                continue
+            a = order[left]
+            b = order[left + 1]
+            a_over_b = np.asarray(wins[a, b]).ravel()
+            b_over_a = np.asarray(wins[b, a]).ravel()
+            swap = b_over_a > a_over_b
+            if swap.any():
+                order[left[swap]], order[left[swap] + 1] = b[swap], a[swap]
+                swapped = True
+        if not swapped:
+            break
+    return order
+
+def bradley_terry_strengths(matrix, wins=None, prior=MLE_PRIOR, max_iter=MLE_MAX_ITER, tol=MLE_TOLERANCE):
+    """
+    Bradley-Terry maximum-likelihood strengths from all pairwise outcomes, fitted with
+    Hunter's MM iteration: p_i = W_i / sum_j n_ij / (p_i + p_j).
+    Returns log-strengths (higher is better).
+    """
+    wins = matrix.pairwise_wins() if wins is None else wins
+    n = matrix.n_candidates
+    total_wins = np.asarray(wins.sum(axis=1)).ravel() + prior
+    comparisons = (wins + wins.T).tocoo()
+    rows, cols, counts = comparisons.row, comparisons.col, comparisons.data
+    p = np.ones(n)
+    for _ in range(max_iter):
+        denominator = np.bincount(rows, weights=counts / (p[rows] + p[cols]), minlength=n)
+        denominator += 2 * prior / (p + 1.0)
+        new_p = total_wins / denominator
+        new_p /= np.exp(np.mean(np.log(new_p)))
+        converged = np.max(np.abs(np.log(new_p) - np.log(p))) < tol
+        p = new_p
+        if converged:
+            break
+    return np.log(p)
+
+def plackett_luce_strengths(matrix, prior=MLE_PRIOR, max_iter=MLE_MAX_ITER, tol=MLE_TOLERANCE):
+    """
+    Plackett-Luce maximum-likelihood strengths from the full batch rankings, fitted with
+    Hunter's MM iteration. Each batch of size k contributes k - 1 choice stages.
+    Returns log-strengths (higher is better).
+    """
+    n = matrix.n_candidates
+    groups = [(k, I) for k, I in matrix.batches_by_length() if k >= 2]
+    chosen = np.full(n, prior)
+    for k, I in groups:
+        chosen += np.bincount(I[:, :-1].ravel(), minlength=n)
+    gamma = np.ones(n)
+    for _ in range(max_iter):
+        denominator = 2 * prior / (gamma + 1.0)
+        for k, I in groups:
+            g = gamma[I]
+            # Strength remaining at each stage t: sum over positions u >= t.
+            remaining = np.cumsum(g[:, ::-1], axis=1)[:, ::-1][:, :-1]
+            cumulative = np.cumsum(1.0 / remaining, axis=1)
+            # The candidate at position u takes part in stages 0..min(u, k - 2).
+            stage = np.minimum(np.arange(k), k - 2)
+            denominator = denominator + np.bincount(I.ravel(), weights=cumulative[:, stage].ravel(), minlength=n)
+        new_gamma = chosen / denominator
+        new_gamma /= np.exp(np.mean(np.log(new_gamma)))
+        converged = np.max(np.abs(np.log(new_gamma) - np.log(gamma))) < tol
+        gamma = new_gamma
+        if converged:
+            break
+    return np.log(gamma)
+
+
+# =======================================
+# Ranking Output
+# =======================================
+
+def tied_ranks(scores):
+    """
+    Standard competition ranks (1, 2, 2, 4, ...) for scores where higher is better;
+    candidates with equal scores share a rank.
+    """
+    order = np.lexsort((np.arange(len(scores)), -scores))
+    sorted_scores = scores[order]
+    new_group = np.concatenate(([True], sorted_scores[1:] != sorted_scores[:-1]))
+    group_start = np.maximum.accumulate(np.where(new_group, np.arange(len(scores)), 0))
+    ranks = np.empty(len(scores), dtype=np.int64)
+    ranks[order] = group_start + 1
+    return ranks
+
+def aggregate(batch_responses, method="normalized_borda"):
+    """
+    Aggregates batch responses into a global ranking with one of METHODS.
+    Returns a dictionary with 'ranking' (list of (file, score) from best to worst, ties broken by
+    first appearance) and 'ranks' (file -> competition rank; tied candidates share a rank).
+    """
+    matrix = PositionMatrix(batch_responses)
+    if matrix.n_candidates == 0:
+        return {"ranking": [], "ranks": {}}
+    if method == "borda":
+        scores = borda_scores(matrix)
+    elif method == "normalized_borda":
+        scores = normalized_borda_scores(matrix)
+    elif method == "copeland":
+        scores = copeland_scores(matrix)
+    elif method == "kemeny":
+        order = kemeny_order(matrix)
+        # Kemeny yields an order, not scores; score by position (n - i).
+        scores = np.empty(matrix.n_candidates)
+        scores[order] = matrix.n_candidates - np.arange(matrix.n_candidates)
+    elif method == "bradley_terry":
+        scores = bradley_terry_strengths(matrix)
+    elif method == "plackett_luce":
+        scores = plackett_luce_strengths(matrix)
+    else:
+        raise ValueError(f"Unknown aggregation method '{method}'. Choose one of {', '.join(METHODS)}.")
+
+    order = np.lexsort((np.arange(len(scores)), -scores))
+    ranks = tied_ranks(scores)
+    return {
+        "ranking": [(matrix.names[i], float(scores[i])) for i in order],
+        "ranks": {matrix.names[i]: int(ranks[i]) for i in order}
+    }
@@ -0,0 +1,335 @@
+import re
+import json
+import time
+import random
+import hashlib
+import threading
+import openai
+import requests
+from requests.adapters import HTTPAdapter
+from api_policy import RETRY_STATUS_CODES, CallPolicy, parse_retry_after
+from batching import estimate_tokens
+from stream_json import RankingStreamParser, iter_delta_content, iter_sse_data
+
+# =======================================
+# Configuration
+# =======================================
+DEFAULT_TEMPERATURE = 0.3
+DEFAULT_POOL_SIZE = 10
+REQUEST_TIMEOUT_SECONDS = 120
+
+
+def estimate_message_tokens(messages):
+    return sum(estimate_tokens(message["content"]) for message in messages)
+
+def usage_tokens(usage):
+    """
+    (input, cached input, output) token counts of a provider's usage report: OpenAI's
+    prompt_tokens_details.cached_tokens or DeepSeek's prompt_cache_hit_tokens for the cached part.
+    """
+    cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or usage.get("prompt_cache_hit_tokens") or 0
+    return usage.get("prompt_tokens") or 0, cached, usage.get("completion_tokens") or 0
+
+def collect_stream(chunks, on_ranking=None, stop_after_ranking=False, on_usage=None):
+    """
+    Reads a stream of OpenAI-style chunks and returns the full response text.
+    The ranking is parsed incrementally and passed to on_ranking as soon as its array closes.
+    With stop_after_ranking the stream is abandoned at that point and only the ranking is returned.
+    A usage report in the stream (the last chunk, when requested with stream_options) is passed to on_usage.
+    """
+    def watch_usage(chunks):
+        for chunk in chunks:
+            if on_usage is not None and chunk.get("usage"):
+                on_usage(chunk["usage"])
+            yield chunk
+
+    parser = RankingStreamParser()
+    parts = []
+    for content in iter_delta_content(watch_usage(chunks)):
+        parts.append(content)
+        ranking = parser.feed(content)
+        if ranking is not None:
+            if on_ranking is not None:
+                on_ranking(ranking)
+            if stop_after_ranking:
+                close = getattr(chunks, "close", None)
+                if close is not None:
+                    close()
+                return json.dumps({"ranking": ranking})
+    return "".join(parts)
+
+def read_response(response, stream, on_ranking=None, stop_after_ranking=False, on_usage=None):
+    """
+    The text of a chat completion response (or of its chunks with stream), passing its usage
+    report to on_usage.
+    """
+    if stream:
+        return collect_stream(response, on_ranking, stop_after_ranking, on_usage)
+    if on_usage is not None and response.get("usage"):
+        on_usage(response["usage"])
+    return response["choices"][0]["message"]["content"]
+
+
+# =======================================
+# OpenAI-Compatible HTTP Client
+# =======================================
+class ChatAPIError(Exception):
+    def __init__(self, provider, status_code, text, retry_after=None):
+        super().__init__(f"{provider} API error: {status_code} - {text}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+def classify_http_error(error):
+    """
+    Returns (retryable, retry_after) for an exception raised by OpenAICompatibleClient.
+    """
+    if isinstance(error, ChatAPIError):
+        return error.status_code in RETRY_STATUS_CODES, error.retry_after
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True, None
+    return False, None
+
+def classify_openai_error(error):
+    """
+    Returns (retryable, retry_after) for an exception raised by the OpenAI client.
+    """
+    retryable_types = (
+        openai.error.RateLimitError, openai.error.ServiceUnavailableError, openai.error.Timeout,
+        openai.error.APIConnectionError, openai.error.TryAgain
+    )
+    status = getattr(error, "http_status", None)
+    if isinstance(error, retryable_types) or status in RETRY_STATUS_CODES:
+        headers = getattr(error, "headers", None) or {}
+        return True, parse_retry_after(headers.get("retry-after") or headers.get("Retry-After"))
+    return False, None
+
+class OpenAICompatibleClient:
+    """
+    Minimal client for /v1/chat/completions endpoints (DeepSeek, llama.cpp, vLLM, ...),
+    with a pooled keep-alive session and the retry/rate-limit policy applied to every call.
+    """
+    provider = "OpenAI-compatible"
+
+    def __init__(self, api_key, base_url, pool_size=DEFAULT_POOL_SIZE, timeout=REQUEST_TIMEOUT_SECONDS, policy=None):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        # Keep-alive connections shared by all calls (and threads) instead of a new handshake per request.
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.policy = policy or CallPolicy(self.provider, classify_http_error)
+
+    def chat_completions_create(self, model, messages, stream=False, temperature=DEFAULT_TEMPERATURE, consume=None):
+        """
+        Returns the response JSON, or with stream its chunks. With consume, the result is passed
+        through consume() within the policy's timed call and consume()'s return value is returned.
+        """
+        url = f"{self.base_url}/v1/chat/completions"
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        payload = {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "stream": stream
+        }
+        if stream:
+            payload["stream_options"] = {"include_usage": True}
+
+        def post():
+            response = self.session.post(url, headers=headers, data=json.dumps(payload), timeout=self.timeout, stream=stream)
+            if response.status_code == 200:
+                return response if stream else response.json()
+            raise ChatAPIError(self.provider, response.status_code, response.text,
+                               parse_retry_after(response.headers.get("Retry-After")))
+
+        if stream:
+            # Server-sent events, yielded as OpenAI-style chunk dictionaries.
+            read = lambda response: (consume or iter)(self._iter_stream(response))
+        else:
+            read = consume
+        return self.policy.call(post, estimated_tokens=estimate_message_tokens(messages), consume=read)
+
+    @staticmethod
+    def _iter_stream(response):
+        try:
+            yield from iter_sse_data(response.iter_lines(decode_unicode=True))
+        finally:
+            response.close()
+
+class DeepSeekClient(OpenAICompatibleClient):
+    provider = "DeepSeek"
+
+
+# =======================================
+# Ranking Backends
+# =======================================
+class RankingBackend:
+    """
+    A chat model that ranks candidates. complete() takes chat messages and returns the
+    response text; name and model identify the backend in caches and journals.
+    The policy's latencies cover the whole response, streamed or not.
+    """
+    name = "backend"
+
+    def __init__(self, model, temperature=DEFAULT_TEMPERATURE, policy=None):
+        self.model = model
+        self.temperature = temperature
+        self.policy = policy
+
+    def complete(self, messages, stream=False, on_ranking=None, stop_after_ranking=False, on_usage=None):
+        """
+        Returns the response text for messages. When streaming, on_ranking is called with the
+        ranking as soon as it is complete, and stop_after_ranking abandons the rest of the response.
+        on_usage is called with the provider's usage report (prompt_tokens, completion_tokens, ...)
+        when the response has one.
+        """
+        raise NotImplementedError
+
+    def metrics(self):
+        return self.policy.metrics.summary() if self.policy is not None else {}
+
+class OpenAIBackend(RankingBackend):
+    """
+    OpenAI chat completions through the openai package.
+    """
+    name = "chatgpt"
+
+    def __init__(self, model="gpt-4o", temperature=DEFAULT_TEMPERATURE, policy=None, timeout=REQUEST_TIMEOUT_SECONDS):
+        super().__init__(model, temperature, policy or CallPolicy("ChatGPT", classify_openai_error))
+        self.timeout = timeout
+
+    def complete(self, messages, stream=False, on_ranking=None, stop_after_ranking=False, on_usage=None):
+        options = {"stream_options": {"include_usage": True}} if stream else {}
+        return self.policy.call(
+            lambda: openai.ChatCompletion.create(
+                model=self.model,
+                messages=messages,
+                temperature=self.temperature,
+                stream=stream,
+                request_timeout=self.timeout,
+                **options
+            ),
+            estimated_tokens=estimate_message_tokens(messages),
+            consume=lambda response: read_response(response, stream, on_ranking, stop_after_ranking, on_usage)
+        )
+
+class OpenAICompatibleBackend(RankingBackend):
+    """
+    Any /v1/chat/completions server: DeepSeek, or a local llama.cpp / vLLM server.
+    """
+    name = "local"
+
+    def __init__(self, client, model, temperature=DEFAULT_TEMPERATURE, name=None):
+        super().__init__(model, temperature, client.policy)
+        self.client = client
+        if name:
+            self.name = name
+
+    def complete(self, messages, stream=False, on_ranking=None, stop_after_ranking=False, on_usage=None):
+        return self.client.chat_completions_create(
+            model=self.model,
+            messages=messages,
+            stream=stream,
+            temperature=self.temperature,
+            consume=lambda response: read_response(response, stream, on_ranking, stop_after_ranking, on_usage)
+        )
+
+class DeepSeekBackend(OpenAICompatibleBackend):
+    name = "deepseek"
+
+    def __init__(self, client, model="deepseek-chat", temperature=DEFAULT_TEMPERATURE):
+        super().__init__(client, model, temperature)
+
+
+# =======================================
+# Mock Backend for Offline Load Testing
+# =======================================
+class MockBackendError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"Mock API error: {status_code}")
+        self.status_code = status_code
+        self.retry_after = None
+
+def classify_mock_error(error):
+    if isinstance(error, MockBackendError):
+        return error.status_code in RETRY_STATUS_CODES, None
+    return False, None
+
+class MockBackend(RankingBackend):
+    """
+    Seeded in-process stand-in for a provider. It finds the candidate file names in the prompt
+    and ranks them by a hidden per-file quality score plus noise, so rankings are consistent
+    across overlapping windows. The response for a given prompt depends only on the seed and the
+    prompt, not on call order or timing, so concurrent runs stay reproducible.
+    Latency is drawn from a normal distribution; errors from a status-code -> probability table.
+    """
+    name = "mock"
+    FILE_PATTERN = re.compile(r"Candidate \(File: ([^)\n]+)\)")
+
+    def __init__(self, seed=0, latency_mean=0.0, latency_jitter=0.0, error_rates=None, noise=0.5,
+                 justification_words=40, stream_chunk_size=16, policy=None):
+        super().__init__(f"mock-seed{seed}", policy=policy or CallPolicy("Mock", classify_mock_error, backoff_base=0.01))
+        self.seed = seed
+        self.latency_mean = latency_mean
+        self.latency_jitter = latency_jitter
+        self.error_rates = error_rates or {}
+        self.noise = noise
+        self.justification_words = justification_words
+        self.stream_chunk_size = stream_chunk_size
+        self._attempts = {}
+        self._lock = threading.Lock()
+
+    def _rng(self, *parts):
+        digest = hashlib.sha256("\x00".join([str(self.seed)] + [str(part) for part in parts]).encode("utf-8")).digest()
+        return random.Random(int.from_bytes(digest[:8], "big"))
+
+    def quality(self, file_name):
+        return self._rng("quality", file_name).gauss(0, 1)
+
+    def respond(self, prompt):
+        """
+        Returns the deterministic response text for a prompt.
+        """
+        files = list(dict.fromkeys(self.FILE_PATTERN.findall(prompt)))
+        rng = self._rng("ranking", prompt)
+        ranking = sorted(files, key=lambda name: -(self.quality(name) + rng.gauss(0, self.noise)))
+        response = {"ranking": ranking}
+        if "justification" in prompt:
+            response["justifications"] = {
+                name: " ".join(["Relevant experience."] * max(1, self.justification_words // 2)) for name in ranking
+            }
+        return json.dumps(response)
+
+    def _attempt(self, prompt):
+        # Errors are drawn per (prompt, attempt), so retries of a failed call can succeed.
+        with self._lock:
+            attempt = self._attempts.get(prompt, 0)
+            self._attempts[prompt] = attempt + 1
+        rng = self._rng("attempt", prompt, attempt)
+        latency = max(0.0, rng.gauss(self.latency_mean, self.latency_jitter))
+        if latency:
+            time.sleep(latency)
+        draw = rng.random()
+        for status_code, rate in sorted(self.error_rates.items()):
+            if draw < rate:
+                raise MockBackendError(status_code)
+            draw -= rate
+        return self.respond(prompt)
+
+    def complete(self, messages, stream=False, on_ranking=None, stop_after_ranking=False, on_usage=None):
+        prompt = messages[-1]["content"]
+
+        def read(text):
+            if not stream:
+                return text
+            size = self.stream_chunk_size
+            chunks = ({"choices": [{"delta": {"content": text[i:i + size]}}]} for i in range(0, len(text), size))
+            return collect_stream(chunks, on_ranking, stop_after_ranking)
+
+        return self.policy.call(lambda: self._attempt(prompt), estimated_tokens=estimate_message_tokens(messages),
+                                consume=read)
@@ -0,0 +1,134 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+# =======================================
+# Configuration
+# =======================================
+CACHE_FILE = os.path.join(".cache", "llm_responses.sqlite")
+# Entries older than this are evicted (None keeps them forever).
+CACHE_MAX_AGE_SECONDS = 30 * 24 * 3600
+# When the stored response text exceeds this size, the least recently used entries are evicted.
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+
+def make_cache_key(provider, model, temperature, messages):
+    """
+    Builds the content-addressed key for a provider call.
+    The key is the SHA-256 of a canonical JSON encoding of provider, model, temperature and messages.
+    """
+    payload = json.dumps(
+        {"provider": provider, "model": model, "temperature": temperature, "messages": messages},
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Persistent on-disk cache of raw LLM response texts, stored in SQLite.
+    In cache-only mode a miss never falls through to the provider.
+    """
+
+    def __init__(self, path=CACHE_FILE, max_age_seconds=CACHE_MAX_AGE_SECONDS, max_bytes=CACHE_MAX_BYTES, cache_only=False):
+        self.path = path
+        self.max_age_seconds = max_age_seconds
+        self.max_bytes = max_bytes
+        self.cache_only = cache_only
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, provider TEXT, model TEXT, response TEXT, "
+            "size INTEGER, created REAL, accessed REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._conn.commit()
+
+    def get(self, key):
+        """
+        Returns the cached response text for key, or None on a miss.
+        Expired entries count as misses.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or self._is_expired(row[1], now):
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, response, provider="", model=""):
+        """
+        Stores a response text under key and evicts entries if the cache grew past its limits.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, provider, model, response, size, created, accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, provider, model, response, len(response.encode("utf-8")), now, now)
+            )
+            self._conn.commit()
+            self.stores += 1
+        self.evict()
+
+    def evict(self):
+        """
+        Removes expired entries, then the least recently used ones until the total size fits max_bytes.
+        Returns the number of evicted entries.
+        """
+        removed = 0
+        with self._lock:
+            if self.max_age_seconds is not None:
+                cursor = self._conn.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.max_age_seconds,))
+                removed += cursor.rowcount
+            if self.max_bytes is not None:
+                total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+                if total > self.max_bytes:
+                    for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall():
+                        if total <= self.max_bytes:
+                            break
+                        self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                        total -= size
+                        removed += 1
+            self._conn.commit()
+            self.evictions += removed
+        return removed
+
+    def stats(self):
+        """
+        Returns the hit/miss counters and the current size of the cache.
+        """
+        with self._lock:
+            entries, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": total
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _is_expired(self, created, now):
+        return self.max_age_seconds is not None and created < now - self.max_age_seconds
@@ -0,0 +1,194 @@
+import re
+import json
+import hashlib
+
+# =======================================
+# Configuration
+# =======================================
+# Section name -> headings that start it (case-insensitive; "&" reads as "and", a trailing colon is ignored).
+HEADINGS = {
+    "summary": ("summary", "professional summary", "executive summary", "career summary", "profile",
+                "professional profile", "executive profile", "career overview", "objective", "career objective",
+                "summary of qualifications", "personal statement"),
+    "highlights": ("highlights", "qualifications", "core qualifications", "skill highlights",
+                   "core competencies", "areas of expertise", "key qualifications"),
+    "skills": ("skills", "technical skills", "computer skills", "key skills", "professional skills",
+               "skills and abilities", "languages", "software"),
+    "experience": ("experience", "work experience", "professional experience", "relevant experience",
+                   "work history", "employment history", "career history", "professional background",
+                   "teaching experience", "military experience", "volunteer experience"),
+    "education": ("education", "education and training", "educational background", "academic background",
+                  "academic qualifications", "training", "education and certifications"),
+    "certifications": ("certifications", "certification", "certificates", "licenses", "licenses and certifications",
+                       "certifications and licenses", "credentials"),
+    "accomplishments": ("accomplishments", "achievements", "awards", "honors", "awards and honors",
+                        "honors and awards"),
+    "affiliations": ("affiliations", "professional affiliations", "memberships", "associations"),
+    "interests": ("interests", "hobbies", "activities", "personal interests"),
+    "additional": ("additional information", "personal information", "presentations", "publications", "volunteer work", "references")
+}
+# Text before the first heading (usually the job title).
+HEADER = "header"
+# Line breaks inside one visual line of a PDF extraction, and the space left before punctuation by rejoining them.
+CONTINUATION_PATTERN = re.compile(r"[ \t]*\n[ \t]+\n[ \t]*|[ \t]+\n[ \t]*")
+SPACED_PUNCTUATION_PATTERN = re.compile(r" +([,.;])")
+# Weight of each section's sentences in the TextRank summary (0 leaves the section out).
+# Education is appended to every summary on its own, so its sentences count less.
+SECTION_WEIGHTS = {
+    HEADER: 1.0, "summary": 1.2, "highlights": 1.0, "skills": 1.0, "experience": 1.0, "education": 0.5,
+    "certifications": 0.8, "accomplishments": 1.0, "affiliations": 0.5, "interests": 0.2, "additional": 0.5
+}
+# Per-domain overrides of SECTION_WEIGHTS.
+DOMAIN_SECTION_WEIGHTS = {
+    "ACCOUNTANT": {"certifications": 1.2},
+    "ADVOCATE": {"education": 0.8},
+    "DESIGNER": {"skills": 1.2},
+    "ENGINEERING": {"skills": 1.3, "certifications": 1.0},
+    "FITNESS": {"certifications": 1.2},
+    "TEACHER": {"certifications": 1.2, "education": 0.8}
+}
+
+
+class Segmenter:
+    """
+    Splits resume text into sections in one pass. A heading is a line holding only a lexicon
+    heading, optionally followed by a colon; with a colon, the rest of the line starts the section
+    ("Education: BSc Accounting"). The lexicon is compiled into one regular expression shaped
+    like a trie and anchored on newlines, so the scan jumps from line break to line break and
+    compares at most one heading's worth of characters at each; the work is linear in the
+    length of the text however large the lexicon is.
+    """
+
+    def __init__(self, headings=None):
+        self.headings = {}
+        for section, names in (headings or HEADINGS).items():
+            for name in names:
+                self.headings[normalise_heading(name)] = section
+        spellings = set(self.headings) | {name.replace(" and ", " & ") for name in self.headings}
+        self.pattern = re.compile(
+            r"\n[ \t]*(" + trie_pattern(spellings) + r")[ \t]*(?::[ \t]*|(?=\n)|\Z)", re.IGNORECASE
+        )
+
+    def spans(self, text):
+        """
+        Yields (section, start, end) for the body of every section, in text order; the text before
+        the first heading is the HEADER section. A repeated section yields several spans.
+        """
+        section, start = HEADER, 0
+        # The leading newline lets a heading on the first line match; offsets shift by one.
+        for match in self.pattern.finditer("\n" + text):
+            yield section, start, max(match.start() - 1, 0)
+            section, start = self.headings[normalise_heading(match.group(1))], match.end() - 1
+        yield section, start, len(text)
+
+    def split(self, text):
+        """
+        [(section, body)] in text order, without empty bodies. Bodies are stripped but otherwise
+        left as extracted; see clean_body.
+        """
+        parts = []
+        for section, start, end in self.spans(text):
+            body = text[start:end].strip()
+            if body:
+                parts.append((section, body))
+        return parts
+
+    def segment(self, text):
+        """
+        {section: body}; the bodies of a repeated section are joined by newlines.
+        """
+        sections = {}
+        for section, body in self.split(text):
+            sections[section] = f"{sections[section]}\n{body}" if section in sections else body
+        return sections
+
+
+def trie_pattern(words):
+    """
+    Regular expression matching exactly the given lower-case words (use with re.IGNORECASE), with
+    shared prefixes factored out so that a failed match is abandoned at the first differing character.
+    Spaces inside words match any run of spaces or tabs.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def pattern(node):
+        branches = [
+            (r"[ \t]+" if char == " " else re.escape(char)) + pattern(child)
+            for char, child in sorted(node.items()) if char
+        ]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return pattern(trie)
+
+def normalise_heading(line):
+    return " ".join(line.lower().replace("&", " and ").split())
+
+def clean_body(text):
+    """
+    Section body with the pieces of one visual line rejoined. PyPDF2 ends such pieces with a
+    space or separates them by a whitespace-only line ("Associate \n: \nAccounting \n \nCity").
+    """
+    text = CONTINUATION_PATTERN.sub(" ", text.strip())
+    return SPACED_PUNCTUATION_PATTERN.sub(r"\1", text)
+
+def section_weights(domain=None, weights=None, domain_weights=None):
+    """
+    Section weights for a domain: the base weights with the domain's overrides applied.
+    """
+    merged = dict(SECTION_WEIGHTS if weights is None else weights)
+    merged.update((DOMAIN_SECTION_WEIGHTS if domain_weights is None else domain_weights).get(str(domain or "").upper(), {}))
+    return merged
+
+
+# =======================================
+# Active Lexicon and Weights
+# =======================================
+_segmenter = Segmenter()
+_settings_hash = None
+
+def get_segmenter():
+    return _segmenter
+
+def load_config(path):
+    """
+    Extends the lexicon and weights from a JSON file with any of the keys "headings"
+    ({section: [heading, ...]}, added to the built-in lexicon), "weights" and "domain_weights"
+    (merged over the built-in ones). Returns the loaded configuration.
+    """
+    global _segmenter, _settings_hash, SECTION_WEIGHTS, DOMAIN_SECTION_WEIGHTS
+    with open(path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    headings = {section: tuple(names) for section, names in HEADINGS.items()}
+    for section, names in config.get("headings", {}).items():
+        headings[section] = headings.get(section, ()) + tuple(names)
+    _segmenter = Segmenter(headings)
+    SECTION_WEIGHTS = {**SECTION_WEIGHTS, **config.get("weights", {})}
+    DOMAIN_SECTION_WEIGHTS = {domain: dict(overrides) for domain, overrides in DOMAIN_SECTION_WEIGHTS.items()}
+    for domain, overrides in config.get("domain_weights", {}).items():
+        DOMAIN_SECTION_WEIGHTS.setdefault(domain.upper(), {}).update(overrides)
+    _settings_hash = None
+    return config
+
+def settings_hash():
+    """
+    Hash of the lexicon and weights in use, for fingerprinting results that depend on them.
+    """
+    global _settings_hash
+    if _settings_hash is None:
+        settings = {"headings": _segmenter.headings, "weights": SECTION_WEIGHTS, "domain_weights": DOMAIN_SECTION_WEIGHTS}
+        _settings_hash = hashlib.sha256(json.dumps(settings, sort_keys=True).encode("utf-8")).hexdigest()
+    return _settings_hash
+
+def split_sections(text):
+    return _segmenter.split(text)
+
+def segment(text):
+    return _segmenter.segment(text)
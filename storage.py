@@ -0,0 +1,376 @@
+import os
+import json
+import glob
+import time
+import uuid
+import argparse
+import threading
+from urllib.parse import quote, unquote
+from stream_json import iter_json_array
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# =======================================
+# Configuration
+# =======================================
+STORE_DIR = "store"
+FORMATS = ("jsonl", "parquet")
+STORE_FORMAT = "jsonl"
+# Rows buffered per domain before a Parquet row group is written.
+ROW_GROUP_SIZE = 10000
+# Tables and their columns. Every table is partitioned by domain: <root>/<table>/domain=<DOMAIN>/part-*.
+# batches and rankings have one row per ranked candidate, so both formats stay flat.
+TABLES = {
+    "candidates": ("file_name", "domain", "gender", "ethnicity", "text_excerpt"),
+    "summaries": ("file_name", "domain", "gender", "ethnicity", "summary", "duplicate_of", "duplicate_similarity"),
+    "batches": ("run", "provider", "model", "domain", "batch", "position", "file_name", "justification"),
+    "rankings": ("run", "provider", "model", "domain", "position", "rank", "file_name", "score", "justification")
+}
+
+
+def require_pyarrow():
+    if pa is None:
+        raise RuntimeError("The parquet format needs pyarrow (pip install pyarrow).")
+
+def partition_dir(root, table, domain):
+    return os.path.join(root, table, "domain=" + quote(str(domain or "").upper(), safe=""))
+
+def partition_domain(path):
+    return unquote(os.path.basename(path)[len("domain="):])
+
+
+# =======================================
+# Writing
+# =======================================
+class TableWriter:
+    """
+    Append-only writer of one table. Rows go to a new part file per domain partition, so several
+    writers (threads, processes or runs) never share a file. JSONL rows are written and flushed
+    one by one; Parquet rows are buffered per domain and written in row groups of ROW_GROUP_SIZE.
+    Missing columns are written as nulls. Thread-safe; close() must be called to finish Parquet files.
+    """
+
+    def __init__(self, root, table, format=STORE_FORMAT, row_group_size=ROW_GROUP_SIZE):
+        if format == "parquet":
+            require_pyarrow()
+        self.root = root
+        self.table = table
+        self.format = format
+        self.columns = TABLES[table]
+        self.row_group_size = row_group_size
+        self.part = f"part-{time.time_ns()}-{os.getpid()}-{id(self):x}.{format}"
+        self.rows_written = 0
+        self._files = {}
+        self._buffers = {}
+        self._lock = threading.Lock()
+
+    def _open(self, domain):
+        directory = partition_dir(self.root, self.table, domain)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, self.part)
+        if self.format == "jsonl":
+            return open(path, "a", encoding="utf-8")
+        return pq.ParquetWriter(path, self.schema())
+
+    def schema(self):
+        types = {"batch": pa.int64(), "position": pa.int64(), "rank": pa.int64(), "score": pa.float64(), "duplicate_similarity": pa.float64()}
+        return pa.schema([(column, types.get(column, pa.string())) for column in self.columns])
+
+    def write(self, row):
+        self.write_many([row])
+
+    def write_many(self, rows):
+        with self._lock:
+            for row in rows:
+                domain = str(row.get("domain") or "").upper()
+                record = {column: row.get(column) for column in self.columns}
+                record["domain"] = domain
+                if domain not in self._files:
+                    self._files[domain] = self._open(domain)
+                if self.format == "jsonl":
+                    self._files[domain].write(json.dumps(record, ensure_ascii=False) + "\n")
+                else:
+                    buffer = self._buffers.setdefault(domain, [])
+                    buffer.append(record)
+                    if len(buffer) >= self.row_group_size:
+                        self._flush(domain)
+                self.rows_written += 1
+            if self.format == "jsonl":
+                for handle in self._files.values():
+                    handle.flush()
+
+    def _flush(self, domain):
+        buffer = self._buffers.pop(domain, None)
+        if buffer:
+            self._files[domain].write_table(pa.Table.from_pylist(buffer, schema=self.schema()))
+
+    def close(self):
+        with self._lock:
+            for domain in list(self._buffers):
+                self._flush(domain)
+            for handle in self._files.values():
+                handle.close()
+            self._files.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class Store:
+    """
+    A store directory with one lazily opened TableWriter per table. Every row of batches and
+    rankings is tagged with this store's run id, so repeated runs can be told apart. The default
+    run id is the start time plus a random suffix, so runs started in the same second differ.
+    """
+
+    def __init__(self, root=STORE_DIR, format=STORE_FORMAT, run=None):
+        self.root = root
+        self.format = format
+        self.run = run or f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self._writers = {}
+        self._lock = threading.Lock()
+
+    def writer(self, table):
+        with self._lock:
+            if table not in self._writers:
+                self._writers[table] = TableWriter(self.root, table, self.format)
+            return self._writers[table]
+
+    def write_batches(self, provider, model, domain, batch_responses):
+        """
+        Writes one row per ranked candidate of each batch response, with its justification.
+        The tournament's "final" response is not a batch but the global ranking, which write_ranking
+        stores; it is skipped so it is not counted as one more batch.
+        """
+        self.writer("batches").write_many(
+            {"run": self.run, "provider": provider, "model": model, "domain": domain, "batch": batch,
+             "position": position, "file_name": file_name,
+             "justification": response.get("justifications", {}).get(file_name)}
+            for batch, response in enumerate(batch_responses)
+            if not response.get("final")
+            for position, file_name in enumerate(response.get("ranking", []))
+        )
+
+    def write_ranking(self, provider, model, domain, result):
+        """
+        Writes one row per candidate of a global ranking: a list of file names or [file name, score] pairs.
+        rank is the candidate's competition rank from result["ranks"] (tied candidates share it), or
+        position + 1 for rankings saved without ranks.
+        """
+        justifications = result.get("justifications", {})
+        ranks = result.get("ranks", {})
+        rows = []
+        for position, entry in enumerate(result.get("ranking", [])):
+            file_name, score = (entry, None) if isinstance(entry, str) else (entry[0], entry[1])
+            rows.append({"run": self.run, "provider": provider, "model": model, "domain": domain,
+                         "position": position, "rank": ranks.get(file_name, position + 1),
+                         "file_name": file_name, "score": score,
+                         "justification": justifications.get(file_name)})
+        self.writer("rankings").write_many(rows)
+
+    def close(self):
+        with self._lock:
+            for writer in self._writers.values():
+                writer.close()
+            self._writers.clear()
+
+
+# =======================================
+# Reading
+# =======================================
+
+def table_files(root, table, domains=None):
+    """
+    Part files of a table, restricted to the partitions of the given domains (predicate pushdown:
+    other partitions are never opened).
+    """
+    partitions = sorted(glob.glob(os.path.join(root, table, "domain=*")))
+    if domains is not None:
+        wanted = {str(domain).upper() for domain in domains}
+        partitions = [path for path in partitions if partition_domain(path) in wanted]
+    files = []
+    for partition in partitions:
+        files.extend(sorted(
+            path for path in glob.glob(os.path.join(partition, "part-*"))
+            if path.endswith((".jsonl", ".parquet"))
+        ))
+    return files
+
+def iter_file(path, columns=None, batch_size=ROW_GROUP_SIZE):
+    """
+    Yields the rows of one part file as dictionaries, reading Parquet a record batch at a time.
+    A torn last JSONL line (interrupted writer) is skipped.
+    """
+    if path.endswith(".parquet"):
+        require_pyarrow()
+        for record_batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size, columns=columns):
+            yield from record_batch.to_pylist()
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                continue
+            yield {column: row.get(column) for column in columns} if columns else row
+
+def read_rows(root, table, domains=None, columns=None):
+    """
+    Yields the rows of a table, optionally only from some domains and with some columns.
+    JSONL and Parquet part files can be mixed in a table.
+    """
+    for path in table_files(root, table, domains):
+        yield from iter_file(path, columns)
+
+def read_table(root, table, domains=None, columns=None):
+    """
+    Loads a table (or some of its domains) into a pyarrow Table for analysis.
+    """
+    require_pyarrow()
+    parts = []
+    for path in table_files(root, table, domains):
+        if path.endswith(".parquet"):
+            parts.append(pq.read_table(path, columns=columns))
+        else:
+            parts.append(pa.Table.from_pylist(list(iter_file(path, columns))))
+    if not parts:
+        return pa.table({column: [] for column in (columns or TABLES[table])})
+    return pa.concat_tables(parts, promote_options="default")
+
+def read_records(path, table="summaries", domains=None):
+    """
+    Yields candidate or summary records from either a JSON list file or a store directory.
+    JSON files are decoded record by record rather than loaded whole.
+    """
+    if os.path.isdir(path):
+        yield from read_rows(path, table, domains)
+        return
+    wanted = {str(domain).upper() for domain in domains} if domains is not None else None
+    with open(path, "r", encoding="utf-8") as f:
+        for record in iter_json_array(f):
+            if wanted is None or str(record.get("domain", "")).upper() in wanted:
+                yield record
+
+def clear_table(root, table):
+    """
+    Removes every part file of a table, for writers that replace rather than append to it.
+    """
+    for path in table_files(root, table):
+        os.remove(path)
+
+
+# =======================================
+# Converter
+# =======================================
+
+def parse_journal_key(key):
+    """
+    (provider, model, domain) of a bias_detection journal key, <provider>/<model>/<DOMAIN>/[single/]<hash>,
+    or None for other keys. Provider, domain and hash never contain "/", so the model is whatever
+    lies between them, including the slashes of names like meta-llama/Llama-3-8B.
+    """
+    parts = key.split("/")
+    end = len(parts) - 2 if len(parts) >= 5 and parts[-2] == "single" else len(parts) - 1
+    if end < 3:
+        return None
+    return parts[0], "/".join(parts[1:end - 1]), parts[end - 1]
+
+def journal_batches(journal_path):
+    """
+    Yields (provider, model, domain, response) for the parsed batch responses in a bias_detection
+    journal. Single-prompt entries (raw response text) are parsed here.
+    """
+    with open(journal_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            parsed_key = parse_journal_key(entry["key"])
+            if parsed_key is None:
+                continue
+            value = entry["value"]
+            if isinstance(value, str):
+                try:
+                    value = json.loads(value)
+                except ValueError:
+                    continue
+            yield (*parsed_key, value)
+
+def convert(root, format, candidates=None, summaries=None, rankings_dir=None, journal=None):
+    """
+    Copies the existing JSON outputs into the store: the candidate and summary lists, the
+    <provider>_<DOMAIN>_global_ranking.json files in rankings_dir and the batch responses recorded
+    in a bias_detection journal. Each converted table replaces the table's previous content.
+    Returns {table: rows written}.
+    """
+    store = Store(root, format)
+    written = {}
+    try:
+        for table, path in (("candidates", candidates), ("summaries", summaries)):
+            if path:
+                clear_table(root, table)
+                writer = store.writer(table)
+                for record in read_records(path):
+                    writer.write(record)
+                written[table] = writer.rows_written
+        if rankings_dir:
+            clear_table(root, "rankings")
+            for path in sorted(glob.glob(os.path.join(rankings_dir, "*_*_global_ranking.json"))):
+                provider, domain = os.path.basename(path)[:-len("_global_ranking.json")].split("_", 1)
+                with open(path, "r", encoding="utf-8") as f:
+                    store.write_ranking(provider, None, domain, json.load(f))
+            written["rankings"] = store.writer("rankings").rows_written
+        if journal:
+            clear_table(root, "batches")
+            grouped = {}
+            for provider, model, domain, response in journal_batches(journal):
+                grouped.setdefault((provider, model, domain), []).append(response)
+            for (provider, model, domain), responses in grouped.items():
+                store.write_batches(provider, model, domain, responses)
+            written["batches"] = store.writer("batches").rows_written
+    finally:
+        store.close()
+    return written
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Columnar store of candidates, summaries, batch rankings and rankings.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    convert_parser = subparsers.add_parser("convert", help="Copy the existing JSON outputs into a store.")
+    convert_parser.add_argument("--root", default=STORE_DIR, help="Store directory.")
+    convert_parser.add_argument("--format", choices=FORMATS, default=STORE_FORMAT)
+    convert_parser.add_argument("--candidates", default=None, help="Candidate list, e.g. resumes_with_demographics.json.")
+    convert_parser.add_argument("--summaries", default=None, help="Summary list, e.g. resume_summaries.json.")
+    convert_parser.add_argument("--rankings-dir", default=None, help="Directory of the *_global_ranking.json files.")
+    convert_parser.add_argument("--journal", default=None, help="bias_detection batch journal to take batch rankings from.")
+
+    show_parser = subparsers.add_parser("show", help="Print the rows of a table as JSON lines.")
+    show_parser.add_argument("table", choices=sorted(TABLES))
+    show_parser.add_argument("--root", default=STORE_DIR, help="Store directory.")
+    show_parser.add_argument("--domains", nargs="+", default=None, help="Only read these domains' partitions.")
+    show_parser.add_argument("--columns", nargs="+", default=None)
+    show_parser.add_argument("--limit", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    if args.command == "convert":
+        written = convert(args.root, args.format, args.candidates, args.summaries, args.rankings_dir, args.journal)
+        for table, rows in written.items():
+            print(f"{table}: {rows} rows written to {os.path.join(args.root, table)}")
+    elif args.command == "show":
+        for i, row in enumerate(read_rows(args.root, args.table, args.domains, args.columns)):
+            if args.limit is not None and i >= args.limit:
+                break
+            print(json.dumps(row, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
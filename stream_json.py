@@ -0,0 +1,150 @@
+import json
+
+# Characters read from a file at a time by iter_json_array.
+READ_CHUNK_CHARS = 1 << 16
+
+
+def iter_json_array(f, chunk_chars=READ_CHUNK_CHARS):
+    """
+    Yields the items of the top-level JSON array in text file f, each decoded as soon as it has been
+    read, so only one item (plus a read chunk) is held in memory at a time.
+    Raises ValueError if the file does not hold a JSON array.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    started = False
+    eof = False
+    while True:
+        while position < len(buffer) and buffer[position] in " \t\r\n":
+            position += 1
+        if position == len(buffer) or position == len(buffer) - 1 and not eof:
+            if eof:
+                raise ValueError("Unexpected end of JSON array.")
+            chunk = f.read(chunk_chars)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        char = buffer[position]
+        if not started:
+            if char != "[":
+                raise ValueError("Expected a JSON array.")
+            started = True
+            position += 1
+        elif char == "]":
+            return
+        elif char == ",":
+            position += 1
+        else:
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                end = None
+            # An item is complete once a "," or "]" follows it; before that it may continue past the
+            # buffer (a number can even decode from part of its digits).
+            following = end
+            while following is not None and following < len(buffer) and buffer[following] in " \t\r\n":
+                following += 1
+            if end is None or following == len(buffer) or buffer[following] not in ",]":
+                if eof:
+                    raise ValueError("Invalid JSON array item.")
+                chunk = f.read(chunk_chars)
+                eof = not chunk
+                buffer = buffer[position:] + chunk
+                position = 0
+                continue
+            position = end
+            yield item
+
+def iter_sse_data(lines):
+    """
+    Yields the decoded JSON payload of every `data:` event in a server-sent event stream,
+    stopping at the `[DONE]` sentinel. lines may be str or bytes.
+    """
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        line = line.strip()
+        if not line.startswith("data:"):
+            continue
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return
+        if data:
+            yield json.loads(data)
+
+def iter_delta_content(chunks):
+    """
+    Yields the text deltas of OpenAI-style streamed chat completion chunks.
+    """
+    for chunk in chunks:
+        choices = chunk.get("choices") or []
+        if not choices:
+            continue
+        content = (choices[0].get("delta") or {}).get("content")
+        if content:
+            yield content
+
+
+class RankingStreamParser:
+    """
+    Incremental scanner for a streamed JSON response of the form {"ranking": [...], ...}.
+    Text is fed chunk by chunk; as soon as the top-level "ranking" array closes, it is decoded
+    and available as .ranking, before the rest of the object (e.g. the justifications) arrives.
+    Markdown code fences before the object are skipped.
+    """
+
+    def __init__(self):
+        self.ranking = None
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string = []
+        self._last_key = None
+        self._expect_value_for = None
+        self._capture = None
+        self._capture_depth = None
+
+    def feed(self, text):
+        """
+        Consumes a chunk of text. Returns the ranking list if it completed within this chunk,
+        otherwise None.
+        """
+        if self.ranking is not None:
+            return None
+        for char in text:
+            if self._capture is not None:
+                self._capture.append(char)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._capture is None:
+                        self._last_key = "".join(self._string)
+                else:
+                    self._string.append(char)
+                continue
+            if char == '"':
+                self._in_string = True
+                self._string = []
+            elif char in "{[":
+                if char == "[" and self._depth == 1 and self._expect_value_for == "ranking":
+                    self._capture = ["["]
+                    self._capture_depth = self._depth
+                self._depth += 1
+                self._expect_value_for = None
+            elif char in "}]":
+                self._depth -= 1
+                if self._capture is not None and self._depth == self._capture_depth:
+                    self.ranking = json.loads("".join(self._capture))
+                    self._capture = None
+                    return self.ranking
+            elif char == ":" and self._depth == 1:
+                self._expect_value_for = self._last_key
+            elif char == ",":
+                self._expect_value_for = None
+        return None
@@ -0,0 +1,295 @@
+import os
+import json
+import time
+import queue
+import socket
+import argparse
+import threading
+import http.client
+import socketserver
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import resume_summarisation
+from text_cache import TEXT_CACHE_FILE, extract_pdf_text
+from textrank import get_tokenizer
+
+# =======================================
+# Configuration
+# =======================================
+HOST = "127.0.0.1"
+PORT = 8765
+# Most jobs summarised together, and the longest a job waits for others to join its batch.
+MAX_BATCH = 32
+BATCH_WAIT_MS = 10
+# Longest a request waits for its summaries before it fails with 504.
+REQUEST_TIMEOUT_SECONDS = 60
+MAX_BODY_BYTES = 16 * 1024 * 1024
+# Pending connections the listening socket accepts; bursts of small requests overflow the default of 5.
+LISTEN_BACKLOG = 128
+WARMUP_TEXT = (
+    "Managed the accounts payable team. Reconciled monthly statements and prepared reports. "
+    "Education: Bachelor of Science in Accounting, State University."
+)
+
+
+# =======================================
+# Micro-Batching
+# =======================================
+class MicroBatcher:
+    """
+    Collects summarisation jobs from many request threads and summarises them together on one
+    thread: a batch is closed when it holds max_batch jobs or when its first job has waited
+    wait_seconds, whichever comes first. Each job gets a Future with its summary record.
+    """
+
+    def __init__(self, max_batch=MAX_BATCH, wait_seconds=BATCH_WAIT_MS / 1000):
+        self.max_batch = max_batch
+        self.wait_seconds = wait_seconds
+        self.jobs = 0
+        self.batches = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="summary-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, candidate, text):
+        future = Future()
+        self._queue.put((candidate, text, future))
+        return future
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.wait_seconds
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            candidates, texts, futures = zip(*batch)
+            try:
+                records = resume_summarisation.summarise_texts_of(list(candidates), list(texts))
+            except Exception:
+                # Jobs of several requests share the batch: summarise them one by one, so that only
+                # the job that fails gets the error.
+                records = None
+            self.jobs += len(batch)
+            self.batches += 1
+            for index, future in enumerate(futures):
+                if records is not None:
+                    future.set_result(records[index])
+                    continue
+                try:
+                    future.set_result(resume_summarisation.summarise_texts_of([candidates[index]], [texts[index]])[0])
+                except Exception as e:
+                    future.set_exception(e)
+
+    def stats(self):
+        return {"jobs": self.jobs, "batches": self.batches, "queued": self._queue.qsize()}
+
+
+def validate_job(job, index=0):
+    """
+    Raises ValueError unless job is an object with a string "text", "path" or "file_name".
+    """
+    if not isinstance(job, dict):
+        raise ValueError(f"Job {index} is not an object.")
+    sources = [field for field in ("text", "path", "file_name") if job.get(field) is not None]
+    if not sources:
+        raise ValueError(f"Job {index} has no \"text\", \"path\" or \"file_name\".")
+    for field in sources + [field for field in ("domain",) if job.get(field) is not None]:
+        if not isinstance(job[field], str):
+            raise ValueError(f"Job {index}: \"{field}\" must be a string.")
+
+def job_text(job):
+    """
+    Resume text of a job: its "text", the PDF at its "path", or the PDF of its domain and
+    file_name in the data directory (as in main(), falling back to the JSON excerpt).
+    """
+    if job.get("text"):
+        return job["text"].strip()
+    if job.get("path"):
+        cache = resume_summarisation.get_text_cache()
+        text = cache.get_text(job["path"]) if cache is not None else extract_pdf_text(job["path"])
+        return text.strip()
+    return resume_summarisation.get_resume_text(job)
+
+def summarise_jobs(batcher, jobs, timeout=REQUEST_TIMEOUT_SECONDS):
+    """
+    Summary records of jobs (dicts with the candidate fields plus "text" or "path"), in order.
+    Every job is validated before any is queued, so a malformed job fails its own request with
+    ValueError and never reaches a batch shared with other requests.
+    Text is loaded on the calling thread; summarisation is batched with other requests' jobs.
+    """
+    if not isinstance(jobs, list):
+        raise ValueError("\"jobs\" must be a list.")
+    for index, job in enumerate(jobs):
+        validate_job(job, index)
+    futures = []
+    for job in jobs:
+        text = job_text(job)
+        if not text:
+            raise ValueError(f"No text available for {job.get('file_name') or job.get('path')}.")
+        futures.append(batcher.submit(job, text))
+    return [future.result(timeout=timeout) for future in futures]
+
+
+# =======================================
+# Server
+# =======================================
+class SummaryHandler(BaseHTTPRequestHandler):
+    """
+    POST /summarise with a job object, or {"jobs": [...]}, returns the summary record(s) that
+    resume_summarisation.main() writes. GET /health returns the batcher's counters.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def address_string(self):
+        # Unix socket clients have no address.
+        return self.client_address[0] if self.client_address else "unix"
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path != "/health":
+            self.send_json(404, {"error": "not found"})
+            return
+        self.send_json(200, {"status": "ok", "summariser": resume_summarisation.SUMMARISER, **self.server.batcher.stats()})
+
+    def do_POST(self):
+        if self.path != "/summarise":
+            self.send_json(404, {"error": "not found"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            self.send_json(413, {"error": "request too large"})
+            return
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError as e:
+            self.send_json(400, {"error": f"invalid JSON: {e}"})
+            return
+        single = not isinstance(body, dict) or "jobs" not in body
+        try:
+            records = summarise_jobs(self.server.batcher, [body] if single else body["jobs"])
+        # Before OSError: the futures' TimeoutError is the builtin one, an OSError subclass.
+        except TimeoutError:
+            self.send_json(504, {"error": "summarisation timed out"})
+            return
+        except (ValueError, OSError) as e:
+            self.send_json(422, {"error": str(e)})
+            return
+        except Exception as e:
+            self.send_json(500, {"error": str(e)})
+            return
+        self.send_json(200, records[0] if single else {"records": records})
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = LISTEN_BACKLOG
+
+class TCPHTTPServer(ThreadingHTTPServer):
+    request_queue_size = LISTEN_BACKLOG
+
+def make_server(batcher, host=HOST, port=PORT, socket_path=None):
+    """
+    HTTP server on host:port, or on a Unix socket when socket_path is given.
+    """
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = UnixHTTPServer(socket_path, SummaryHandler)
+    else:
+        server = TCPHTTPServer((host, port), SummaryHandler)
+    server.batcher = batcher
+    return server
+
+def warm_up():
+    """
+    Loads the tokenizer and runs the summariser once, so the first request does not pay for it.
+    """
+    get_tokenizer()
+    resume_summarisation.summarize_texts([WARMUP_TEXT])
+
+
+# =======================================
+# Client
+# =======================================
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path, timeout=REQUEST_TIMEOUT_SECONDS):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+def request_summaries(jobs, host=HOST, port=PORT, socket_path=None):
+    """
+    Sends jobs to a running server and returns their summary records.
+    Raises RuntimeError with the server's message when it rejects the request.
+    """
+    if socket_path:
+        connection = UnixHTTPConnection(socket_path)
+    else:
+        connection = http.client.HTTPConnection(host, port, timeout=REQUEST_TIMEOUT_SECONDS)
+    try:
+        connection.request("POST", "/summarise", json.dumps({"jobs": jobs}), {"Content-Type": "application/json"})
+        response = connection.getresponse()
+        body = json.loads(response.read())
+    finally:
+        connection.close()
+    if response.status != 200:
+        raise RuntimeError(f"Summary server error {response.status}: {body.get('error')}")
+    return body["records"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resident resume summarisation worker with micro-batching.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--socket", default=None, help="Listen on this Unix socket instead of host:port.")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH,
+                        help="Most jobs summarised together.")
+    parser.add_argument("--batch-wait-ms", type=float, default=BATCH_WAIT_MS,
+                        help="Longest a job waits for others to join its batch.")
+    parser.add_argument("--summariser", choices=resume_summarisation.SUMMARISERS, default=resume_summarisation.SUMMARISER,
+                        help="TextRank engine, as in resume_summarisation.py.")
+    parser.add_argument("--sections-config", default=resume_summarisation.SECTIONS_CONFIG,
+                        help="JSON file extending the section heading lexicon and section weights.")
+    parser.add_argument("--section-weights", action="store_true",
+                        help="Weight sentence ranks by resume section and domain (changes the summaries).")
+    parser.add_argument("--text-cache", default=TEXT_CACHE_FILE,
+                        help="Location of the extracted-text cache.")
+    parser.add_argument("--no-text-cache", action="store_true",
+                        help="Parse every PDF instead of using the extracted-text cache.")
+    args = parser.parse_args(argv)
+
+    resume_summarisation.SUMMARISER = args.summariser
+    resume_summarisation.configure_sections(args)
+    resume_summarisation.set_text_cache_path(None if args.no_text_cache else args.text_cache)
+    warm_up()
+    server = make_server(MicroBatcher(args.max_batch, args.batch_wait_ms / 1000), args.host, args.port, args.socket)
+    print(f"Summarising on {args.socket or f'http://{args.host}:{args.port}'} with {args.summariser}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+import os
+import json
+import time
+import pstats
+import cProfile
+import itertools
+import threading
+from multiprocessing import util
+
+# =======================================
+# Configuration
+# =======================================
+# Stages timed by the pipelines. Any name can be used; these are the ones instrumented.
+STAGES = ("pdf_extraction", "summarisation", "prompt_build", "api_call", "parse", "merge")
+METRIC_PREFIX = "resume_bias"
+# Profiles of each profiled stage are written to <PROFILE_DIR>/<stage>.prof (pstats format).
+PROFILE_DIR = os.path.join(".cache", "profiles")
+
+# Telemetry is off until configure() is called; span() and count() then cost a global lookup.
+enabled = False
+_trace = None
+_metrics_path = None
+_profile_stages = frozenset()
+_profile_dir = PROFILE_DIR
+_is_main_process = True
+_profiles = {}
+_counters = {}
+_stage_totals = {}
+_lock = threading.Lock()
+_local = threading.local()
+_span_ids = itertools.count(1)
+
+
+class _NullSpan:
+    """
+    Span returned while telemetry is disabled: entering and leaving it does nothing.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """
+    A timed stage. On exit its duration is added to the stage totals and, with a trace file,
+    a JSON line is written with the stage name, start time, duration, parent span, attributes
+    set on it and the error if the stage raised. Profiled stages also run under cProfile.
+    """
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.id = next(_span_ids)
+        self.parent = None
+        self.profile = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        self.parent = stack[-1] if stack else None
+        stack.append(self.id)
+        if self.name in _profile_stages:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        self.start = time.time()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.started
+        if self.profile is not None:
+            self.profile.disable()
+        _local.stack.pop()
+        event = None
+        if _trace is not None:
+            event = {"span": self.name, "id": self.id, "parent": self.parent, "start": round(self.start, 6),
+                     "seconds": round(duration, 6), "pid": os.getpid(), "thread": threading.current_thread().name}
+            if self.attrs:
+                event["attrs"] = self.attrs
+            if exc_type is not None:
+                event["error"] = f"{exc_type.__name__}: {exc}"
+        with _lock:
+            total = _stage_totals.setdefault(self.name, [0.0, 0, 0])
+            total[0] += duration
+            total[1] += 1
+            total[2] += exc_type is not None
+            if self.profile is not None:
+                stats = _profiles.get(self.name)
+                if stats is None:
+                    _profiles[self.name] = pstats.Stats(self.profile)
+                else:
+                    stats.add(self.profile)
+            if event is not None:
+                _trace.write(json.dumps(event, default=str) + "\n")
+        return False
+
+
+def span(name, **attrs):
+    """
+    Context manager timing one stage; attributes (provider, domain, batch size, ...) go to the trace.
+    Disabled telemetry returns a shared no-op span.
+    """
+    if not enabled:
+        return _NULL_SPAN
+    return Span(name, attrs)
+
+def count(name, value=1, **labels):
+    """
+    Adds value to the counter name with the given labels (e.g. count("tokens", 120, provider="chatgpt")).
+    """
+    if not enabled:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+def counters():
+    """
+    The counters as {name: [(labels, value), ...]}.
+    """
+    with _lock:
+        return _counter_snapshot()
+
+def _counter_snapshot():
+    snapshot = {}
+    for (name, labels), value in sorted(_counters.items()):
+        snapshot.setdefault(name, []).append((dict(labels), value))
+    return snapshot
+
+
+# =======================================
+# Exporters
+# =======================================
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for value in labels.values())
+    return "{" + ",".join(f"{key}=\"{value}\"" for key, value in zip(labels, escaped)) + "}"
+
+def prometheus_text():
+    """
+    The counters and stage totals in the Prometheus text exposition format.
+    """
+    lines = []
+    with _lock:
+        stage_totals = sorted(_stage_totals.items())
+    for metric, index, description in (("stage_seconds_total", 0, "Wall-clock seconds spent in each stage."),
+                                       ("stage_calls_total", 1, "Number of times each stage ran."),
+                                       ("stage_errors_total", 2, "Number of times each stage raised.")):
+        lines.append(f"# HELP {METRIC_PREFIX}_{metric} {description}")
+        lines.append(f"# TYPE {METRIC_PREFIX}_{metric} counter")
+        for stage, total in stage_totals:
+            lines.append(f"{METRIC_PREFIX}_{metric}{format_labels({'stage': stage})} {round(total[index], 6)}")
+    for name, series in counters().items():
+        lines.append(f"# TYPE {METRIC_PREFIX}_{name}_total counter")
+        for labels, value in series:
+            lines.append(f"{METRIC_PREFIX}_{name}_total{format_labels(labels)} {round(value, 6)}")
+    return "\n".join(lines) + "\n"
+
+def write_prometheus(path):
+    """
+    Writes the metrics for node_exporter's textfile collector, replacing the file atomically.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(prometheus_text())
+    os.replace(temp_path, path)
+
+def write_profiles(directory):
+    """
+    Dumps the accumulated cProfile statistics of every profiled stage; returns the written paths.
+    Worker processes add their pid to the file name.
+    """
+    os.makedirs(directory, exist_ok=True)
+    suffix = "" if _is_main_process else f"-{os.getpid()}"
+    paths = []
+    with _lock:
+        for stage, stats in _profiles.items():
+            path = os.path.join(directory, f"{stage}{suffix}.prof")
+            stats.dump_stats(path)
+            paths.append(path)
+    return paths
+
+
+# =======================================
+# Setup
+# =======================================
+
+def configure(trace_path=None, metrics_path=None, profile_stages=(), profile_dir=PROFILE_DIR, worker=False):
+    """
+    Enables telemetry when any output is requested: a JSON-lines trace of spans (appended to),
+    a Prometheus textfile written by close(), and cProfile runs of the given stages.
+    worker marks a pool process (see settings()): it is always enabled, appends its spans to the
+    parent's trace and hands its counters and stage totals to the parent through drain() and
+    merge(); it only writes its stage profiles, when the process exits.
+    """
+    global enabled, _trace, _metrics_path, _profile_stages, _profile_dir, _is_main_process
+    if worker:
+        # Drop what a forked worker inherited from the parent without writing it out again.
+        _reset()
+    else:
+        close()
+    _is_main_process = not worker
+    _metrics_path = None if worker else metrics_path
+    _profile_stages = frozenset(profile_stages or ())
+    _profile_dir = profile_dir
+    if trace_path:
+        directory = os.path.dirname(trace_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        _trace = open(trace_path, "a", encoding="utf-8", buffering=1)
+    enabled = bool(worker or trace_path or _metrics_path or _profile_stages)
+    if worker:
+        util.Finalize(None, close, exitpriority=10)
+
+def settings():
+    """
+    Arguments of configure() for a worker process of this one, or None when telemetry is disabled.
+    """
+    if not enabled:
+        return None
+    return {"trace_path": _trace.name if _trace is not None else None, "profile_stages": tuple(_profile_stages),
+            "profile_dir": _profile_dir, "worker": True}
+
+def drain():
+    """
+    Takes this process's counters and stage totals, for a worker to return them to the parent.
+    """
+    with _lock:
+        snapshot = {"counters": list(_counters.items()), "stages": list(_stage_totals.items())}
+        _counters.clear()
+        _stage_totals.clear()
+    return snapshot
+
+def merge(snapshot):
+    """
+    Adds counters and stage totals drained in a worker process to this process's.
+    """
+    if not enabled or not snapshot:
+        return
+    with _lock:
+        for key, value in snapshot["counters"]:
+            _counters[key] = _counters.get(key, 0) + value
+        for stage, values in snapshot["stages"]:
+            total = _stage_totals.setdefault(stage, [0.0, 0, 0])
+            for index, value in enumerate(values):
+                total[index] += value
+
+def close():
+    """
+    Writes the final counters to the trace, the Prometheus file and the stage profiles, then disables telemetry.
+    """
+    if not enabled:
+        return
+    if _trace is not None and _is_main_process:
+        with _lock:
+            _trace.write(json.dumps({"counters": _counter_snapshot(), "pid": os.getpid(),
+                                     "end": round(time.time(), 6)}) + "\n")
+    if _metrics_path:
+        write_prometheus(_metrics_path)
+        print(f"Metrics saved to {_metrics_path}")
+    if _profiles:
+        for path in write_profiles(_profile_dir):
+            print(f"Profile saved to {path}")
+    _reset()
+
+def _reset():
+    global enabled, _trace
+    with _lock:
+        if _trace is not None:
+            _trace.close()
+            _trace = None
+        _counters.clear()
+        _stage_totals.clear()
+        _profiles.clear()
+    enabled = False
@@ -0,0 +1,88 @@
+import os
+import sys
+import json
+import time
+import random
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import bias_detection
+
+# =======================================
+# Configuration
+# =======================================
+DOMAINS = ["ACCOUNTANT", "CHEF", "TEACHER"]
+CANDIDATES_PER_DOMAIN = 12
+GENDERS = ["Male", "Female"]
+ETHNICITIES = ["Asian", "Black", "Hispanic", "White"]
+
+
+def synthetic_summaries(seed=0):
+    """
+    Summary records for CANDIDATES_PER_DOMAIN candidates in each of DOMAINS, with seeded demographics.
+    """
+    rng = random.Random(seed)
+    return [
+        {
+            "file_name": f"{domain.lower()}_{i}.pdf", "domain": domain,
+            "gender": rng.choice(GENDERS), "ethnicity": rng.choice(ETHNICITIES),
+            "summary": f"{domain.title()} with {i + 1} years of experience. Skilled in area {i % 4}."
+        }
+        for domain in DOMAINS
+        for i in range(CANDIDATES_PER_DOMAIN)
+    ]
+
+def read_rankings(directory):
+    """
+    The <provider>_<DOMAIN>_global_ranking.json files of a directory, as {file name: content}.
+    """
+    rankings = {}
+    for name in sorted(os.listdir(directory)):
+        if name.endswith("_global_ranking.json"):
+            with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+                rankings[name] = json.load(f)
+    return rankings
+
+def read_metrics(path):
+    """
+    Totals of the counters of a Prometheus textfile, summed over their labels.
+    """
+    totals = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("#") or not line.strip():
+                continue
+            name, value = line.rsplit(" ", 1)
+            name = name.split("{", 1)[0]
+            totals[name] = totals.get(name, 0) + float(value)
+    return totals
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    path = tmp_path / "resume_summaries.json"
+    path.write_text(json.dumps(synthetic_summaries()), encoding="utf-8")
+    return str(path)
+
+@pytest.fixture
+def run_ranking(tmp_path, monkeypatch, dataset):
+    """
+    Runs bias_detection.main() over the synthetic dataset with the mock backends, in a fresh
+    directory per run name, and returns that run's global rankings. Each run name has its own
+    journal unless one is given.
+    The domains are limited to DOMAINS and the pause between serial domains is skipped.
+    """
+    monkeypatch.setattr(bias_detection, "categories", DOMAINS)
+    monkeypatch.setattr(time, "sleep", lambda seconds: None)
+
+    def run(name, *argv, journal=None):
+        directory = tmp_path / name
+        directory.mkdir(exist_ok=True)
+        monkeypatch.chdir(directory)
+        journal = journal or str(tmp_path / f"{name}.jsonl")
+        bias_detection.main(["--backend", "mock", "--dataset", dataset, "--journal", journal, *argv])
+        return read_rankings(directory)
+
+    return run
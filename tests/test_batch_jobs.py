@@ -0,0 +1,28 @@
+import json
+import batch_jobs
+from conftest import read_rankings
+
+
+def test_local_batch_round_trip_matches_interactive_run(run_ranking, dataset, tmp_path, monkeypatch, capsys):
+    interactive = run_ranking("interactive")
+
+    batch_dir = tmp_path / "batch"
+    batch_dir.mkdir()
+    monkeypatch.chdir(batch_dir)
+    job_dir = str(batch_dir / "jobs")
+    service_dir = str(batch_dir / "service")
+    journal = str(tmp_path / "batch.jsonl")
+    batch_jobs.prepare(job_dir, ["--backend", "mock", "--dataset", dataset])
+    batch_jobs.submit(job_dir, batch_jobs.LocalBatchService(service_dir))
+    assert batch_jobs.poll(job_dir, service_dir)
+    batch_jobs.ingest(job_dir, journal)
+    with open(batch_dir / "jobs" / batch_jobs.JOBS_FILE, "r", encoding="utf-8") as f:
+        jobs = json.load(f)
+    assert all(job["request_counts"]["failed"] == 0 for job in jobs.values())
+    assert read_rankings(batch_dir) == interactive
+
+    # Every window ingested into the journal: an interactive run sends nothing.
+    capsys.readouterr()
+    resumed = run_ranking("resumed", journal=journal)
+    assert "Sending prompt" not in capsys.readouterr().out
+    assert resumed == interactive
@@ -0,0 +1,115 @@
+from collections import Counter
+from itertools import combinations
+import pytest
+import batching
+import bias_detection
+from prompt_packing import SYSTEM_MESSAGE, build_prompt_prefix, count_tokens, format_candidate, pack_candidates
+
+# =======================================
+# Configuration
+# =======================================
+N = 12
+BATCH_SIZE = 5
+
+
+def coverage(batches, n=N):
+    counts = Counter(i for batch in batches for i in batch)
+    return [counts[i] for i in range(n)]
+
+def candidates(n, words=lambda i: 10):
+    return [{"file_name": f"cand_{i}.pdf", "domain": "CHEF", "gender": "Female", "ethnicity": "Asian",
+             "summary": " ".join(["experience"] * words(i))} for i in range(n)]
+
+
+@pytest.mark.parametrize("strategy, step, expected", [
+    ("sliding", 1, [1, 2, 3, 4, 5, 5, 5, 5, 4, 3, 2, 1]),
+    # The original windows leave the candidates after the last full window out.
+    ("sliding", 3, [1, 1, 1, 2, 2, 1, 2, 2, 1, 1, 1, 0]),
+    ("strided", 3, [1, 1, 1, 2, 2, 1, 2, 3, 2, 2, 2, 1]),
+    # The remainder window is aligned to the end and overlaps the one before it.
+    ("tumbling", 1, [1, 1, 1, 1, 1, 1, 1, 2, 2, 2, 1, 1])
+])
+def test_static_window_coverage(strategy, step, expected):
+    batches = batching.make_batches(list(range(N)), strategy, BATCH_SIZE, step)
+    assert coverage(batches) == expected
+    assert all(len(batch) == BATCH_SIZE and batch == sorted(batch) for batch in batches)
+
+def test_tumbling_covers_each_candidate_once_when_batches_divide():
+    assert coverage(batching.make_batches(list(range(15)), "tumbling", BATCH_SIZE), 15) == [1] * 15
+
+@pytest.mark.parametrize("n, replication", [(20, 2), (20, 3), (15, 4)])
+def test_bibd_candidate_coverage_is_exact_when_blocks_divide(n, replication):
+    batches = batching.make_batches(list(range(n)), "bibd", BATCH_SIZE, replication=replication)
+    assert len(batches) == replication * n // BATCH_SIZE
+    assert coverage(batches, n) == [replication] * n
+
+def test_bibd_padded_blocks_cover_each_candidate_at_least_replication_times():
+    batches = batching.make_batches(list(range(N)), "bibd", BATCH_SIZE, replication=3, seed=5)
+    assert all(len(set(batch)) == BATCH_SIZE for batch in batches)
+    assert min(coverage(batches)) == 3
+    # Each round pads one block with BATCH_SIZE - N % BATCH_SIZE repeats.
+    assert sum(coverage(batches)) == 3 * (N + BATCH_SIZE - N % BATCH_SIZE)
+
+@pytest.mark.parametrize("n, seed", [(12, 0), (23, 1), (40, 2)])
+def test_bibd_pair_coverage_ranks_every_pair_together(n, seed):
+    batches = batching.make_batches(list(range(n)), "bibd", BATCH_SIZE, coverage="pair", seed=seed)
+    together = {pair for batch in batches for pair in combinations(sorted(batch), 2)}
+    assert together == set(combinations(range(n), 2))
+    assert all(len(set(batch)) == BATCH_SIZE for batch in batches)
+
+def test_bibd_is_seeded():
+    make = lambda seed: batching.make_batches(list(range(N)), "bibd", BATCH_SIZE, seed=seed)
+    assert make(7) == make(7)
+    assert make(7) != make(8)
+
+@pytest.mark.parametrize("n", [1, 5, 12, 23])
+def test_tournament_orders_every_candidate_once(n):
+    quality = {f"cand_{i}.pdf": (i * 7) % n for i in range(n)}
+    calls = []
+
+    def rank_batch(batch):
+        calls.append(batch)
+        return {"ranking": sorted((cand["file_name"] for cand in batch), key=lambda name: -quality[name])}
+
+    responses = batching.tournament_rank(rank_batch, candidates(n), BATCH_SIZE)
+    final = responses[-1]
+    assert final["final"]
+    assert final["ranking"] == sorted(quality, key=lambda name: -quality[name])
+    # Every candidate is ranked exactly once in the initial tumbling batches.
+    assert coverage([[int(cand["file_name"][5:-4]) for cand in batch] for batch in calls[:-(-n // BATCH_SIZE)]], n) == [1] * n
+    assert len(calls) == len(responses) - 1 <= batching.tournament_call_bound(n, BATCH_SIZE)
+
+def packed_tokens(prefix, batch):
+    return (count_tokens(SYSTEM_MESSAGE) + count_tokens(prefix)
+            + sum(count_tokens(format_candidate(cand)) + batching.OUTPUT_TOKENS_PER_CANDIDATE for cand in batch))
+
+def test_packed_batches_fit_the_token_budget():
+    prefix = build_prompt_prefix("Head chef.", "Five years in a kitchen.")
+    pool = candidates(60, words=lambda i: 20 + (i * 37) % 150)
+    budget = 2000
+    batches = pack_candidates(pool, prefix, token_budget=budget, max_batch=10, overlap=1)
+    assert len(batches) > 1
+    assert all(packed_tokens(prefix, batch) <= budget for batch in batches)
+    # Each call holds as many candidates as fit, and the last one of a call opens the next.
+    for batch, following in zip(batches, batches[1:]):
+        assert following[0] is batch[-1]
+        assert len(batch) == 10 or packed_tokens(prefix, batch + [following[1]]) > budget
+    # So every candidate is ranked once, and the overlapping ones twice.
+    openers = {batch[0]["file_name"] for batch in batches[1:]}
+    counts = Counter(cand["file_name"] for batch in batches for cand in batch)
+    assert counts == {cand["file_name"]: 1 + (cand["file_name"] in openers) for cand in pool}
+
+def test_packed_batches_keep_two_candidates_over_the_budget():
+    prefix = build_prompt_prefix("Head chef.", "Five years in a kitchen.")
+    batches = pack_candidates(candidates(4, words=lambda i: 400), prefix, token_budget=100, overlap=0)
+    assert [len(batch) for batch in batches] == [2, 2]
+
+def test_packed_strategy_in_bias_detection(monkeypatch):
+    monkeypatch.setattr(bias_detection, "PROMPT_TOKEN_BUDGET", 1500)
+    job_desc, requirements = bias_detection.get_job_details("CHEF")
+    prefix = build_prompt_prefix(job_desc, requirements, bias_detection.RANKING_ONLY)
+    pool = candidates(30, words=lambda i: 60)
+    batches = bias_detection.make_domain_batches(job_desc, requirements, pool, strategy="packed")
+    assert len(batches) > 1
+    assert all(packed_tokens(prefix, batch) <= 1500 for batch in batches)
+    assert {cand["file_name"] for batch in batches for cand in batch} == {cand["file_name"] for cand in pool}
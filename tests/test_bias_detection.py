@@ -0,0 +1,139 @@
+import json
+import hashlib
+import threading
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import bias_detection
+from conftest import CANDIDATES_PER_DOMAIN, DOMAINS
+from ranking_backends import MockBackend, OpenAICompatibleClient
+
+# =======================================
+# Configuration
+# =======================================
+CLIENT_TIMEOUT_SECONDS = 0.5
+FAULT_DELAY_SECONDS = 1.5
+
+
+def test_concurrent_rankings_match_serial(run_ranking):
+    serial = run_ranking("serial")
+    assert len(serial) == 2 * len(DOMAINS)
+    assert all(len(result["ranking"]) == CANDIDATES_PER_DOMAIN for result in serial.values())
+    assert run_ranking("concurrent", "--concurrent") == serial
+    assert run_ranking("streamed", "--concurrent", "--stream") == serial
+
+def test_retried_mock_errors_leave_rankings_unchanged(run_ranking):
+    serial = run_ranking("serial")
+    assert run_ranking("flaky", "--concurrent", "--mock-error-rate", "0.3") == serial
+
+def test_borda_accumulator_matches_merge():
+    backend = MockBackend(seed=3)
+    candidates = [{"file_name": f"cand_{i}.pdf", "summary": f"Resume {i}."} for i in range(20)]
+    job_desc, requirements = bias_detection.get_job_details("ACCOUNTANT")
+    model_func = lambda *args, **kwargs: bias_detection.rank_candidates_with_backend(backend, *args, **kwargs)
+    accumulator = bias_detection.BordaAccumulator()
+    responses = bias_detection.rank_candidates_in_batches(
+        model_func, job_desc, requirements, candidates, batch_size=5, step=1, strategy="sliding",
+        on_ranking=accumulator.add
+    )
+    assert accumulator.batches == len(responses)
+    assert (bias_detection.merge_batch_rankings(responses, 5, method="borda", accumulator=accumulator)
+            == bias_detection.merge_batch_rankings(responses, 5, method="borda"))
+
+def test_merge_ranks_share_ties():
+    responses = [{"ranking": ["a", "b", "c"]}, {"ranking": ["c", "b", "d"]}, {"ranking": ["d", "a"]}]
+    borda = bias_detection.merge_batch_rankings(responses, 3, method="borda")
+    assert borda["ranking"] == [("a", 4), ("b", 4), ("c", 4), ("d", 3)]
+    assert borda["ranks"] == {"a": 1, "b": 1, "c": 1, "d": 4}
+    copeland = bias_detection.merge_batch_rankings(responses, 3, method="copeland")
+    assert copeland["ranks"] == {"a": 1, "b": 2, "c": 2, "d": 4}
+
+
+class MockChatHandler(BaseHTTPRequestHandler):
+    """
+    /v1/chat/completions stand-in answering with MockBackend's rankings over keep-alive HTTP/1.1.
+    With server.faults, the first attempt of one prompt in four gets a 429 and of another one in
+    four answers after FAULT_DELAY_SECONDS, past the client's timeout.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = payload["messages"][-1]["content"]
+        with self.server.lock:
+            self.server.requests += 1
+            attempt = self.server.attempts.get(prompt, 0)
+            self.server.attempts[prompt] = attempt + 1
+        fault = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest(), 16) % 4 if self.server.faults and not attempt else None
+        if fault == 0:
+            self.send_body(429, json.dumps({"error": "rate limited"}), {"Retry-After": "0"})
+            return
+        if fault == 1:
+            # Not time.sleep, which the run_ranking fixture disables.
+            threading.Event().wait(FAULT_DELAY_SECONDS)
+        content = self.server.mock.respond(prompt)
+        self.send_body(200, json.dumps({"choices": [{"message": {"role": "assistant", "content": content}}]}))
+
+    def send_body(self, status, body, headers=None):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def mock_server(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockChatHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.mock = MockBackend(seed=0)
+    server.faults = False
+    server.connections = server.requests = 0
+    server.attempts = {}
+    # Writing to a connection the client timed out on fails; that is expected here.
+    server.handle_error = lambda request, client_address: None
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(bias_detection, "LOCAL_BASE_URL", f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setattr(bias_detection, "OpenAICompatibleClient",
+                        partial(OpenAICompatibleClient, timeout=CLIENT_TIMEOUT_SECONDS))
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_concurrent_http_rankings_survive_429s_and_timeouts(run_ranking, mock_server):
+    serial = run_ranking("serial", "--backend", "local")
+    assert len(serial) == len(DOMAINS)
+    requests = mock_server.requests
+
+    mock_server.faults = True
+    mock_server.attempts.clear()
+    mock_server.connections = mock_server.requests = 0
+    assert run_ranking("concurrent", "--backend", "local", "--concurrent") == serial
+    metrics = bias_detection.backends["local"].metrics()
+    assert metrics["failures"] == 0
+    assert metrics["retries"] == mock_server.requests - requests > 0
+    # Keep-alive connections are reused; only timed-out ones are replaced.
+    assert mock_server.connections <= bias_detection.PROVIDER_CONCURRENCY["local"] + metrics["retries"]
+    assert mock_server.connections < mock_server.requests
+
+def test_concurrent_provider_errors_propagate(run_ranking, monkeypatch):
+    def broken_merge(*args, **kwargs):
+        raise RuntimeError("merge failed")
+
+    monkeypatch.setattr(bias_detection, "merge_batch_rankings", broken_merge)
+    with pytest.raises(RuntimeError, match="merge failed"):
+        run_ranking("broken", "--concurrent")
@@ -0,0 +1,83 @@
+import os
+import json
+import random
+import pytest
+import dedup
+import batch_jobs
+
+# =======================================
+# Configuration
+# =======================================
+TEXT_WORDS = 200
+VOCABULARY = [f"word{i}" for i in range(5000)]
+
+
+def random_text(rng, words=TEXT_WORDS):
+    return " ".join(rng.choice(VOCABULARY) for _ in range(words))
+
+def edited(text, changes):
+    """
+    text with changes words in its middle replaced, 20 words apart, so that each one changes the
+    SHINGLE_WORDS shingles containing it.
+    """
+    words = text.split()
+    for i in range(changes):
+        words[len(words) // 4 + 20 * i] = f"edit{i}"
+    return " ".join(words)
+
+def record(name, domain, summary):
+    return {"file_name": name, "domain": domain, "gender": "Female", "ethnicity": "Asian", "summary": summary}
+
+
+def test_similarity_estimates_jaccard():
+    rng = random.Random(0)
+    hasher = dedup.MinHasher()
+    text = random_text(rng)
+    signature = hasher.signature(text)
+    others = [hasher.signature(text), hasher.signature(edited(text, 2)), hasher.signature(random_text(rng))]
+    same, near, unrelated = dedup.similarity(signature, others)
+    assert same == 1.0
+    # 196 shingles, 10 of them changed: Jaccard 186 / 206, about 0.90.
+    assert near == pytest.approx(186 / 206, abs=0.08)
+    assert unrelated < 0.1
+
+def test_threshold_decides_near_duplicates():
+    rng = random.Random(1)
+    text = random_text(rng)
+    records = [record("a.pdf", "CHEF", text), record("b.pdf", "CHEF", edited(text, 2))]
+    assert dedup.mark_duplicates(records, threshold=0.8)[1]["duplicate_of"] == "a.pdf"
+    assert "duplicate_of" not in dedup.mark_duplicates(records, threshold=0.99)[1]
+
+def test_earliest_record_is_kept_per_domain():
+    rng = random.Random(2)
+    text, other = random_text(rng), random_text(rng)
+    records = [
+        record("first.pdf", "CHEF", text),
+        record("other.pdf", "CHEF", other),
+        record("copy.pdf", "CHEF", text),
+        record("near.pdf", "CHEF", edited(text, 1)),
+        record("elsewhere.pdf", "TEACHER", text)
+    ]
+    kept = dedup.drop_duplicates(records)
+    assert [cand["file_name"] for cand in kept] == ["first.pdf", "other.pdf", "elsewhere.pdf"]
+    marked = dedup.mark_duplicates(records)
+    assert [cand.get("duplicate_of") for cand in marked] == [None, None, "first.pdf", "first.pdf", None]
+    assert marked[2]["duplicate_similarity"] == 1.0
+
+def test_batch_jobs_prepare_skips_duplicates(tmp_path, monkeypatch):
+    rng = random.Random(3)
+    texts = [random_text(rng) for _ in range(8)]
+    records = [record(f"cand_{i}.pdf", "CHEF", text) for i, text in enumerate(texts)]
+    records.append(record("resubmitted.pdf", "CHEF", texts[0]))
+    dataset = tmp_path / "summaries.json"
+    dataset.write_text(json.dumps(records), encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+
+    def prepared_files(name, *argv):
+        job_dir = str(tmp_path / name)
+        batch_jobs.prepare(job_dir, ["--backend", "mock", "--dataset", str(dataset), *argv])
+        with open(os.path.join(job_dir, batch_jobs.MANIFEST_FILE), "r", encoding="utf-8") as f:
+            return {name for request in json.load(f)["requests"].values() for name in request["files"]}
+
+    assert "resubmitted.pdf" in prepared_files("all")
+    assert prepared_files("deduplicated", "--skip-duplicates") == {f"cand_{i}.pdf" for i in range(8)}
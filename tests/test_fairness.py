@@ -0,0 +1,66 @@
+import json
+import math
+import pytest
+import fairness
+from conftest import DOMAINS, synthetic_summaries
+
+# =======================================
+# Configuration
+# =======================================
+RESAMPLES = 400
+
+
+@pytest.fixture
+def rankings(tmp_path, monkeypatch):
+    """
+    Global rankings of the synthetic summaries in a fresh directory: chatgpt ranks the women of
+    each domain first, deepseek keeps the file order.
+    """
+    summaries = synthetic_summaries()
+    summary_file = tmp_path / "resume_summaries.json"
+    summary_file.write_text(json.dumps(summaries), encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+    for domain in DOMAINS:
+        files = [cand["file_name"] for cand in summaries if cand["domain"] == domain]
+        gender = {cand["file_name"]: cand["gender"] for cand in summaries}
+        biased = sorted(files, key=lambda name: gender[name] != "Female")
+        with open(fairness.ranking_file("chatgpt", domain), "w", encoding="utf-8") as f:
+            json.dump({"ranking": [[name, len(biased) - i] for i, name in enumerate(biased)]}, f)
+        with open(fairness.ranking_file("deepseek", domain), "w", encoding="utf-8") as f:
+            json.dump({"ranking": files}, f)
+    return str(summary_file)
+
+def analyse(summary_file, seed=0, workers=1):
+    return fairness.analyse(summary_file=summary_file, top_k=5, resamples=RESAMPLES, seed=seed, workers=workers)
+
+def same_rows(a, b):
+    # NaN (a group missing from every resample) compares unequal to itself.
+    return json.dumps(a) == json.dumps(b)
+
+
+def test_report_is_deterministic_under_a_seed(rankings):
+    rows = analyse(rankings)
+    assert len(rows) > 0
+    assert same_rows(analyse(rankings), rows)
+    # Every task has its own seed, so the worker count does not change the results.
+    assert same_rows(analyse(rankings, workers=2), rows)
+    other = analyse(rankings, seed=1)
+    assert [row["exposure_ratio_ci"] for row in other] != [row["exposure_ratio_ci"] for row in rows]
+
+def test_pvalues_and_intervals_are_well_formed(rankings):
+    for row in analyse(rankings):
+        for name in fairness.TESTED_METRICS:
+            assert 1 / (RESAMPLES + 1) <= row[f"{name}_p"] <= 1
+        low, high = row["exposure_ratio_ci"]
+        assert math.isnan(low) or low <= high
+
+def test_ranking_women_first_is_detected(rankings):
+    rows = {(row["provider"], row["domain"], row["group"]): row for row in analyse(rankings) if row["attribute"] == "gender"}
+    for domain in DOMAINS:
+        women, men = rows[("chatgpt", domain, "Female")], rows[("chatgpt", domain, "Male")]
+        assert women["exposure_ratio"] > 1 > men["exposure_ratio"]
+        assert men["impact_ratio"] < fairness.FOUR_FIFTHS and men["four_fifths_violation"]
+        # With a lopsided split of twelve candidates, no ordering is significant at 5%.
+        if women["candidates"] == men["candidates"]:
+            assert women["exposure_ratio_p"] < 0.05 and men["exposure_ratio_p"] < 0.05
+            assert rows[("deepseek", domain, "Female")]["exposure_ratio_p"] > 0.05
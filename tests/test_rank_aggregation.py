@@ -0,0 +1,65 @@
+import os
+import sys
+import numpy as np
+import pytest
+import bias_detection
+import rank_aggregation
+from conftest import REPO_ROOT
+
+sys.path.insert(0, os.path.join(REPO_ROOT, "benchmarks"))
+
+from bench_rank_aggregation import baseline_merge_batch_rankings, synthetic_batch_responses
+
+# =======================================
+# Configuration
+# =======================================
+# b beats a and c in the first batch but loses to c in the second; c and d split their two
+# meetings; e only wins against a. Borda ties a with e, Copeland ties c with d and a with e,
+# and normalized Borda ties c, d and e.
+RESPONSES = [
+    {"ranking": ["b", "a", "c"]},
+    {"ranking": ["c", "b", "d"]},
+    {"ranking": ["d", "c", "e"]},
+    {"ranking": ["e", "a"]}
+]
+# Output of the original merge_batch_rankings on RESPONSES.
+BASELINE_RANKING = [("c", 6), ("b", 5), ("d", 4), ("a", 3), ("e", 3)]
+EXPECTED = {
+    "borda": (["c", "b", "d", "a", "e"], {"c": 1, "b": 2, "d": 3, "a": 4, "e": 4}),
+    "normalized_borda": (["b", "c", "d", "e", "a"], {"b": 1, "c": 2, "d": 2, "e": 2, "a": 5}),
+    "copeland": (["b", "c", "d", "a", "e"], {"b": 1, "c": 2, "d": 2, "a": 4, "e": 4}),
+    "kemeny": (["b", "c", "d", "e", "a"], {"b": 1, "c": 2, "d": 3, "e": 4, "a": 5}),
+    "bradley_terry": (["b", "c", "d", "a", "e"], {"b": 1, "c": 2, "d": 3, "a": 4, "e": 5}),
+    "plackett_luce": (["b", "d", "c", "a", "e"], {"b": 1, "d": 2, "c": 3, "a": 4, "e": 5})
+}
+
+
+def test_baseline_output_is_pinned():
+    assert baseline_merge_batch_rankings(RESPONSES, 3)["ranking"] == BASELINE_RANKING
+
+@pytest.mark.parametrize("method", rank_aggregation.METHODS)
+def test_method_orders_and_ties(method):
+    order, ranks = EXPECTED[method]
+    aggregated = rank_aggregation.aggregate(RESPONSES, method)
+    assert [name for name, _ in aggregated["ranking"]] == order
+    assert aggregated["ranks"] == ranks
+
+def test_scores_of_the_counting_methods():
+    scores = lambda method: dict(rank_aggregation.aggregate(RESPONSES, method)["ranking"])
+    assert scores("borda") == dict(BASELINE_RANKING)
+    assert scores("normalized_borda") == {"b": 0.75, "c": 0.5, "d": 0.5, "e": 0.5, "a": 0.25}
+    assert scores("copeland") == {"b": 2, "c": 0, "d": 0, "a": -1, "e": -1}
+
+def test_borda_matches_baseline_on_synthetic_batches():
+    responses = synthetic_batch_responses(500, seed=4)
+    baseline = baseline_merge_batch_rankings(responses, 5)["ranking"]
+    assert rank_aggregation.aggregate(responses, "borda")["ranking"] == baseline
+    assert bias_detection.merge_batch_rankings(responses, 5, method="borda")["ranking"] == baseline
+
+def test_tied_ranks_are_competition_ranks():
+    ranks = rank_aggregation.tied_ranks(np.array([3.0, 5.0, 3.0, 5.0, 1.0]))
+    assert ranks.tolist() == [3, 1, 3, 1, 5]
+
+def test_unknown_method_is_rejected():
+    with pytest.raises(ValueError, match="Unknown aggregation method"):
+        rank_aggregation.aggregate(RESPONSES, "condorcet")
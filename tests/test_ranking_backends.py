@@ -0,0 +1,88 @@
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import telemetry
+import bias_detection
+from ranking_backends import OpenAICompatibleBackend, OpenAICompatibleClient
+
+# =======================================
+# Configuration
+# =======================================
+RESPONSE = json.dumps({"ranking": ["b.pdf", "a.pdf"], "justifications": {"a.pdf": "Fine.", "b.pdf": "Better."}})
+CHUNK_CHARS = 20
+CHUNK_DELAY_SECONDS = 0.05
+USAGE = {"prompt_tokens": 321, "completion_tokens": 45, "prompt_tokens_details": {"cached_tokens": 128}}
+
+
+class ChatHandler(BaseHTTPRequestHandler):
+    """
+    /v1/chat/completions stand-in answering RESPONSE with USAGE; streamed responses send a chunk
+    every CHUNK_DELAY_SECONDS and the usage in a last chunk without choices.
+    """
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if not payload.get("stream"):
+            body = json.dumps({"choices": [{"message": {"role": "assistant", "content": RESPONSE}}], "usage": USAGE})
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body.encode("utf-8"))
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        chunks = [{"choices": [{"delta": {"content": RESPONSE[i:i + CHUNK_CHARS]}}], "usage": None}
+                  for i in range(0, len(RESPONSE), CHUNK_CHARS)]
+        if payload.get("stream_options", {}).get("include_usage"):
+            chunks.append({"choices": [], "usage": USAGE})
+        for chunk in chunks:
+            time.sleep(CHUNK_DELAY_SECONDS)
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def backend():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ChatHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield OpenAICompatibleBackend(OpenAICompatibleClient("", f"http://127.0.0.1:{server.server_port}"), "local-model")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_complete_reports_usage(backend, stream):
+    usage = {}
+    messages = [{"role": "user", "content": "Rank a.pdf and b.pdf."}]
+    assert backend.complete(messages, stream=stream, on_usage=usage.update) == RESPONSE
+    assert usage == USAGE
+
+def test_streamed_latency_covers_the_whole_stream(backend):
+    rankings = []
+    backend.complete([{"role": "user", "content": "Rank."}], stream=True, on_ranking=rankings.append)
+    assert rankings == [["b.pdf", "a.pdf"]]
+    chunks = -(-len(RESPONSE) // CHUNK_CHARS) + 1
+    assert backend.metrics()["latency_max"] >= chunks * CHUNK_DELAY_SECONDS
+
+def test_token_counters_prefer_reported_usage(backend, tmp_path, monkeypatch):
+    monkeypatch.setattr(bias_detection, "STREAM_RESPONSES", True)
+    telemetry.configure(metrics_path=str(tmp_path / "metrics.prom"))
+    try:
+        candidates = [{"file_name": "a.pdf", "summary": "Accountant."}, {"file_name": "b.pdf", "summary": "Auditor."}]
+        assert bias_detection.rank_candidates_with_backend(backend, "Job", "Requirements", candidates) == RESPONSE
+        counters = {(name, dict(labels).get("direction")): value
+                    for name, entries in telemetry.counters().items() for labels, value in entries}
+    finally:
+        telemetry.close()
+    assert counters[("tokens", "in")] == USAGE["prompt_tokens"]
+    assert counters[("tokens", "out")] == USAGE["completion_tokens"]
@@ -0,0 +1,18 @@
+from conftest import DOMAINS, read_metrics
+
+
+def test_cache_only_run_replays_every_response(run_ranking, tmp_path):
+    cache_file = str(tmp_path / "responses.sqlite")
+    first_metrics = str(tmp_path / "first.prom")
+    replay_metrics = str(tmp_path / "replay.prom")
+    first = run_ranking("first", "--cache-file", cache_file, "--metrics-file", first_metrics)
+    counters = read_metrics(first_metrics)
+    requests = counters["resume_bias_cache_misses_total"]
+    assert requests > 2 * len(DOMAINS)
+    assert "resume_bias_cache_hits_total" not in counters
+
+    replay = run_ranking("replay", "--cache-only", "--cache-file", cache_file, "--metrics-file", replay_metrics)
+    counters = read_metrics(replay_metrics)
+    assert counters["resume_bias_cache_hits_total"] == requests
+    assert "resume_bias_cache_misses_total" not in counters
+    assert replay == first
@@ -0,0 +1,31 @@
+import io
+import json
+import storage
+from checkpoint import Journal
+from stream_json import iter_json_array
+
+
+def test_journal_batches_keep_models_with_slashes(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = Journal(path)
+    journal.append("local/meta-llama/Llama-3-8B/CHEF/0a1b", {"ranking": ["a.pdf", "b.pdf"]})
+    journal.append("local/meta-llama/Llama-3-8B/TEACHER/single/2c3d", json.dumps({"ranking": ["c.pdf"]}))
+    journal.append("chatgpt/gpt-4o/CHEF/4e5f", {"ranking": ["b.pdf"]})
+    journal.append("summaries/unrelated", "not a batch")
+    journal.close()
+    assert list(storage.journal_batches(path)) == [
+        ("local", "meta-llama/Llama-3-8B", "CHEF", {"ranking": ["a.pdf", "b.pdf"]}),
+        ("local", "meta-llama/Llama-3-8B", "TEACHER", {"ranking": ["c.pdf"]}),
+        ("chatgpt", "gpt-4o", "CHEF", {"ranking": ["b.pdf"]})
+    ]
+
+def test_runs_started_together_get_their_own_ids(tmp_path):
+    runs = {storage.Store(str(tmp_path)).run for _ in range(20)}
+    assert len(runs) == 20
+    assert storage.Store(str(tmp_path), run="nightly").run == "nightly"
+
+def test_streamed_json_array_matches_json_load():
+    records = [{"file_name": f"{i}.pdf", "score": -1.5e10 * i, "summary": "x, ] \"quoted\" " * i} for i in range(30)]
+    text = json.dumps(records, indent=4)
+    for chunk_chars in (1, 3, 7, 64, 1 << 16):
+        assert list(iter_json_array(io.StringIO(text), chunk_chars)) == records
@@ -0,0 +1,88 @@
+import io
+import os
+import threading
+import contextlib
+import pytest
+import resume_summarisation
+import summary_server
+from conftest import REPO_ROOT
+
+# =======================================
+# Configuration
+# =======================================
+CORPUS_DOMAINS = ("ACCOUNTANT", "CHEF", "TEACHER")
+TEXT = ("Led a kitchen team of twelve. Designed seasonal menus and cut food costs by ten percent. "
+        "Trained new cooks in food safety. Education: Culinary Arts Diploma, City College.")
+
+
+def corpus_jobs():
+    """
+    Jobs for the first resume of each of CORPUS_DOMAINS, by domain and file_name.
+    """
+    return [
+        {"file_name": sorted(os.listdir(os.path.join(REPO_ROOT, "data", "data", "data", domain)))[0],
+         "domain": domain, "gender": "Female", "ethnicity": "Asian"}
+        for domain in CORPUS_DOMAINS
+    ]
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.chdir(REPO_ROOT)
+    monkeypatch.setattr(resume_summarisation, "text_cache_path", None)
+    monkeypatch.setattr(resume_summarisation, "_text_cache", None)
+    server = summary_server.make_server(summary_server.MicroBatcher(wait_seconds=0.05), port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server.server_port
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_server_records_match_main_run(server):
+    jobs = corpus_jobs() + [{"text": TEXT, "file_name": "inline.pdf", "domain": "CHEF"}]
+    records = summary_server.request_summaries(jobs, port=server)
+    with contextlib.redirect_stdout(io.StringIO()):
+        expected = resume_summarisation.summarise_chunk(corpus_jobs())
+    expected.append(resume_summarisation.summarise_texts_of([jobs[-1]], [TEXT])[0])
+    assert records == expected
+
+def test_malformed_job_fails_only_its_request(server):
+    results = {}
+
+    def send(name, jobs):
+        try:
+            results[name] = summary_server.request_summaries(jobs, port=server)
+        except RuntimeError as e:
+            results[name] = e
+
+    threads = [
+        threading.Thread(target=send, args=("good", [{"text": TEXT, "file_name": "good.pdf"}])),
+        threading.Thread(target=send, args=("bad", [{"text": TEXT, "file_name": "ok.pdf"}, {"domain": "CHEF"}])),
+        threading.Thread(target=send, args=("wrong type", [{"file_name": 42}]))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results["good"][0]["file_name"] == "good.pdf"
+    assert "422" in str(results["bad"]) and "Job 1 has no" in str(results["bad"])
+    assert "422" in str(results["wrong type"]) and "must be a string" in str(results["wrong type"])
+
+def test_failing_job_does_not_fail_its_batch(monkeypatch):
+    summarise_texts_of = resume_summarisation.summarise_texts_of
+
+    def failing(candidates, texts):
+        if "fail" in texts:
+            raise RuntimeError("summariser failed")
+        return summarise_texts_of(candidates, texts)
+
+    monkeypatch.setattr(resume_summarisation, "summarise_texts_of", failing)
+    batcher = summary_server.MicroBatcher(wait_seconds=0.5)
+    good = batcher.submit({"file_name": "good.pdf"}, TEXT)
+    bad = batcher.submit({"file_name": "bad.pdf"}, "fail")
+    assert good.result(timeout=10)["file_name"] == "good.pdf"
+    with pytest.raises(RuntimeError):
+        bad.result(timeout=10)
+    assert batcher.stats()["batches"] == 1
@@ -0,0 +1,50 @@
+import io
+import os
+import math
+import contextlib
+import pytest
+import textrank
+import resume_summarisation
+from conftest import REPO_ROOT
+
+# =======================================
+# Configuration
+# =======================================
+CORPUS_DIR = os.path.join(REPO_ROOT, "data", "data", "data")
+RESUMES_PER_DOMAIN = 4
+# Fraction of summaries that must match Sumy's exactly, as in benchmarks/bench_textrank.py.
+AGREEMENT_TOLERANCE = {"textrank": 0.97, "textrank-exact": 0.99}
+
+
+@pytest.fixture(scope="module")
+def resume_texts():
+    """
+    Texts of the first RESUMES_PER_DOMAIN PDFs of every domain in the corpus, without the text cache.
+    """
+    candidates = []
+    for domain in sorted(os.listdir(CORPUS_DIR)):
+        if os.path.isdir(os.path.join(CORPUS_DIR, domain)):
+            files = sorted(name for name in os.listdir(os.path.join(CORPUS_DIR, domain)) if name.endswith(".pdf"))
+            candidates.extend({"domain": domain, "file_name": name} for name in files[:RESUMES_PER_DOMAIN])
+    with pytest.MonkeyPatch.context() as monkeypatch, contextlib.redirect_stdout(io.StringIO()):
+        monkeypatch.chdir(REPO_ROOT)
+        monkeypatch.setattr(resume_summarisation, "text_cache_path", None)
+        monkeypatch.setattr(resume_summarisation, "_text_cache", None)
+        texts = [resume_summarisation.get_resume_text(candidate) for candidate in candidates]
+    return [text for text in texts if text]
+
+@pytest.mark.parametrize("engine", sorted(AGREEMENT_TOLERANCE))
+def test_summaries_agree_with_sumy(resume_texts, engine):
+    expected = resume_summarisation.summarize_texts(resume_texts, resume_summarisation.SUMMARY_SENTENCE_COUNT, "sumy")
+    summaries = resume_summarisation.summarize_texts(resume_texts, resume_summarisation.SUMMARY_SENTENCE_COUNT, engine)
+    mismatches = sum(summary != reference for summary, reference in zip(summaries, expected))
+    assert mismatches <= math.floor((1 - AGREEMENT_TOLERANCE[engine]) * len(resume_texts))
+
+def test_safe_sentences_skip_nltk_without_changing_words(resume_texts):
+    safe = 0
+    for text in resume_texts:
+        for sentence in textrank.document_sentences(text):
+            if textrank.SAFE_SENTENCE_PATTERN.fullmatch(str(sentence)):
+                safe += 1
+                assert textrank.approximate_words(str(sentence)) == list(sentence.words)
+    assert safe
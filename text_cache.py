@@ -0,0 +1,171 @@
+import os
+import zlib
+import sqlite3
+import argparse
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import PyPDF2
+import telemetry
+from checkpoint import file_hash
+
+# =======================================
+# Configuration
+# =======================================
+TEXT_CACHE_FILE = os.path.join(".cache", "extracted_text.sqlite")
+DATA_DIR = "data"
+
+
+def extract_pdf_text(path):
+    """
+    Extracts the text of every page of a PDF with PyPDF2 and joins the pages with newlines.
+    Raises if the PDF cannot be read.
+    """
+    with open(path, "rb") as f:
+        reader = PyPDF2.PdfReader(f)
+        text = ""
+        for page in reader.pages:
+            extracted = page.extract_text()
+            if extracted:
+                text += extracted + "\n"
+    return text
+
+
+class TextCache:
+    """
+    Store of extracted PDF text in SQLite, zlib-compressed.
+    Entries are keyed by path and validated by size and mtime; when those changed, the
+    content hash decides whether the file really changed, and text extracted from a file
+    with the same content (e.g. a copy elsewhere in the tree) is reused.
+    """
+
+    def __init__(self, path=TEXT_CACHE_FILE):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS texts ("
+            "path TEXT PRIMARY KEY, size INTEGER, mtime REAL, sha256 TEXT, text BLOB)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS texts_sha256 ON texts (sha256)")
+        self._conn.commit()
+
+    def get_text(self, pdf_path):
+        """
+        Returns the extracted text of pdf_path, parsing the PDF only on a cache miss.
+        Extraction errors propagate and are not cached.
+        """
+        key = os.path.abspath(pdf_path)
+        stat = os.stat(pdf_path)
+        with self._lock:
+            row = self._conn.execute("SELECT size, mtime, text FROM texts WHERE path = ?", (key,)).fetchone()
+        if row and row[0] == stat.st_size and row[1] == stat.st_mtime:
+            self.hits += 1
+            telemetry.count("cache_hits", cache="text")
+            return zlib.decompress(row[2]).decode("utf-8")
+
+        sha256 = file_hash(pdf_path)
+        with self._lock:
+            row = self._conn.execute("SELECT text FROM texts WHERE sha256 = ? LIMIT 1", (sha256,)).fetchone()
+        if row:
+            self.hits += 1
+            telemetry.count("cache_hits", cache="text")
+            blob = row[0]
+            text = zlib.decompress(blob).decode("utf-8")
+        else:
+            self.misses += 1
+            telemetry.count("cache_misses", cache="text")
+            text = extract_pdf_text(pdf_path)
+            blob = zlib.compress(text.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO texts (path, size, mtime, sha256, text) VALUES (?, ?, ?, ?, ?)",
+                (key, stat.st_size, stat.st_mtime, sha256, blob)
+            )
+            self._conn.commit()
+        return text
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM texts").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# =======================================
+# Prewarming
+# =======================================
+_worker_cache = None
+
+def _prewarm_file(args):
+    global _worker_cache
+    cache_path, pdf_path = args
+    if _worker_cache is None:
+        _worker_cache = TextCache(cache_path)
+    try:
+        _worker_cache.get_text(pdf_path)
+        return True
+    except Exception as e:
+        print(f"Error reading PDF {pdf_path}: {e}")
+        return False
+
+def find_pdfs(root):
+    """
+    Returns the sorted paths of every PDF under root.
+    """
+    pdfs = []
+    for directory, _, files in os.walk(root):
+        for name in files:
+            if name.lower().endswith(".pdf"):
+                pdfs.append(os.path.join(directory, name))
+    return sorted(pdfs)
+
+def prewarm(root=DATA_DIR, cache_path=TEXT_CACHE_FILE, workers=1):
+    """
+    Extracts and caches the text of every PDF under root.
+    Returns the number of PDFs that could not be read.
+    """
+    pdfs = find_pdfs(root)
+    print(f"Prewarming text cache {cache_path} with {len(pdfs)} PDFs from {root}")
+    tasks = [(cache_path, pdf_path) for pdf_path in pdfs]
+    if workers <= 1:
+        results = [_prewarm_file(task) for task in tasks]
+    else:
+        # Create the schema once before the workers open their own connections.
+        TextCache(cache_path).close()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_prewarm_file, tasks, chunksize=16))
+    failures = results.count(False)
+    cache = TextCache(cache_path)
+    print(f"Text cache now holds {cache.stats()['entries']} entries ({failures} failures).")
+    cache.close()
+    return failures
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the extracted-text cache for resume PDFs.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    prewarm_parser = subparsers.add_parser("prewarm", help="Extract and cache the text of every PDF under a directory.")
+    prewarm_parser.add_argument("root", nargs="?", default=DATA_DIR)
+    prewarm_parser.add_argument("--cache-file", default=TEXT_CACHE_FILE)
+    prewarm_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    stats_parser = subparsers.add_parser("stats", help="Show the number of cached entries.")
+    stats_parser.add_argument("--cache-file", default=TEXT_CACHE_FILE)
+    args = parser.parse_args(argv)
+
+    if args.command == "prewarm":
+        prewarm(args.root, args.cache_file, args.workers)
+    else:
+        cache = TextCache(args.cache_file)
+        print(cache.stats())
+        cache.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+Vectorized TextRank: the sentence graphs of a batch of resumes are ranked together, giving the
+summaries of Sumy's TextRankSummarizer without its per-document Python loops.
+
+Measured against Sumy with benchmarks/bench_textrank.py on the real corpus (1 core):
+- "textrank", the fast word tokenizer: 9.5x faster at n=100 and 10.6x at n=500, with 100% and
+  98.6% of summaries identical to Sumy's.
+- "textrank-exact", NLTK's tokenizer outside SAFE_SENTENCE_PATTERN: 6.5x faster at both sizes,
+  with 100% and 99.6% identical summaries.
+The 10x target is met only by the fast path at n=500. resume_summarisation.py still defaults to
+textrank-exact: the bias study compares rankings of the summaries, and the fast path changes
+about one summary in seventy, while textrank-exact differs from Sumy only on near-tied sentences.
+"""
+import re
+import numpy as np
+from scipy import sparse
+from sumy.parsers.plaintext import PlaintextParser
+from sumy.nlp.tokenizers import Tokenizer
+from sumy.summarizers.text_rank import TextRankSummarizer
+
+# =======================================
+# Configuration
+# =======================================
+# Same constants as Sumy's TextRankSummarizer, so both engines converge to the same ranks.
+DAMPING = TextRankSummarizer.damping
+EPSILON = TextRankSummarizer.epsilon
+ZERO_DIVISION_PREVENTION = TextRankSummarizer._ZERO_DIVISION_PREVENTION
+# Word filter of Sumy's Tokenizer: letters, with apostrophes or hyphens after the first one.
+WORD_PATTERN = re.compile(r"^[^\W\d_](?:[^\W\d_]|['-])*$")
+# Approximation of NLTK's Treebank word tokenizer, which Sumy uses: the punctuation it splits off
+# a whitespace-separated chunk, the clitics it splits off the end of a word and its contractions.
+SPLIT_PATTERN = re.compile(r"""[,:;@#$%&?!*()\[\]{}<>"]|--|\.\.\.""")
+CLITIC_PATTERN = re.compile(r"(?i)(?<=[^'])(n't|'ll|'re|'ve|'s|'m|'d|')$")
+# Sentences on which approximate_words provably matches Treebank: ASCII letters, digits, spaces and
+# punctuation that both split off the same way, with no period but a final one, no quotes or
+# apostrophes, and no comma or colon before a digit or another comma or colon (Treebank keeps those).
+SAFE_SENTENCE_PATTERN = re.compile(r"(?:[A-Za-z0-9 \t\r\n;()&/+%#@!?*\[\]{}<>$-]|[,:](?![\d,:]))*\.?\s*")
+CONTRACTIONS = {"cannot": ("can", "not"), "gimme": ("gim", "me"), "gonna": ("gon", "na"),
+                "gotta": ("got", "ta"), "lemme": ("lem", "me"), "wanna": ("wan", "na")}
+
+_tokenizer = None
+
+def get_tokenizer():
+    """
+    Returns the shared English tokenizer; loading the NLTK sentence model is done once per process.
+    """
+    global _tokenizer
+    if _tokenizer is None:
+        _tokenizer = Tokenizer("english")
+    return _tokenizer
+
+
+# =======================================
+# Parsing
+# =======================================
+
+def document_sentences(text):
+    """
+    Splits text into sentences exactly as Sumy's PlaintextParser does (headings excluded).
+    """
+    return PlaintextParser.from_string(text, get_tokenizer()).document.sentences
+
+def approximate_words(text):
+    """
+    The words Sumy's Tokenizer.to_words would return for a sentence, without running NLTK's
+    Treebank tokenizer. Chunks are split on whitespace and on the punctuation Treebank splits off,
+    the sentence-final period is dropped and clitics are separated; what passes Sumy's word filter
+    is kept. Treebank leaves a period inside a sentence attached to its word ("Inc."), so such
+    words are dropped here too.
+    """
+    words = []
+    chunks = text.split()
+    last = len(chunks) - 1
+    for position, chunk in enumerate(chunks):
+        pieces = SPLIT_PATTERN.split(chunk) if SPLIT_PATTERN.search(chunk) else [chunk]
+        if position == last and pieces[-1].endswith(".") and not pieces[-1].endswith(".."):
+            pieces[-1] = pieces[-1][:-1]
+        for piece in pieces:
+            contraction = CONTRACTIONS.get(piece.lower())
+            if contraction:
+                words.extend((piece[:len(contraction[0])], piece[len(contraction[0]):]))
+            elif piece.isalpha():
+                words.append(piece)
+            elif piece:
+                words.extend(clitic_words(piece))
+    return words
+
+def clitic_words(piece):
+    """
+    Words of a piece that is not plain letters: opening quotes are stripped and a trailing clitic
+    ("'s", "n't", ...) becomes a word of its own, as Treebank does.
+    """
+    if piece.startswith("'") and not CLITIC_PATTERN.fullmatch(piece):
+        piece = piece.lstrip("'")
+    words = []
+    match = CLITIC_PATTERN.search(piece)
+    if match:
+        if WORD_PATTERN.match(piece[:match.start()]):
+            words.append(piece[:match.start()])
+        piece = match.group(1)
+    if WORD_PATTERN.match(piece):
+        words.append(piece)
+    return words
+
+def sentence_words(sentence, exact=False):
+    """
+    Lower-cased words of a Sumy sentence. exact gives the words of Sumy's own NLTK word tokenizer,
+    running it only on sentences outside SAFE_SENTENCE_PATTERN (about one in seven in resumes);
+    otherwise approximate_words, which is several times faster and agrees on almost every sentence.
+    """
+    text = str(sentence)
+    words = sentence.words if exact and not SAFE_SENTENCE_PATTERN.fullmatch(text) else approximate_words(text)
+    return [word.lower() for word in words]
+
+
+# =======================================
+# Ranking
+# =======================================
+
+def similarity_matrix(documents):
+    """
+    Block-diagonal sparse TextRank graph for a batch of documents, each a list of sentence word lists.
+    The weight of sentences i and j is their number of common words (counted with multiplicity,
+    as Sumy does) divided by log|i| + log|j|, computed for all pairs at once as C·Cᵀ over the
+    sentence-by-word count matrix C. Each document has its own vocabulary columns, so no weight
+    crosses documents. Rows are normalised to sum to one, as in Sumy.
+    Returns (weights, lengths) where lengths is the number of sentences per document.
+    """
+    rows, cols = [], []
+    sentence_lengths = []
+    next_column = 0
+    sentence = 0
+    for words_per_sentence in documents:
+        vocabulary = {}
+        for words in words_per_sentence:
+            for word in words:
+                column = vocabulary.get(word)
+                if column is None:
+                    column = vocabulary[word] = next_column
+                    next_column += 1
+                rows.append(sentence)
+                cols.append(column)
+            sentence_lengths.append(len(words))
+            sentence += 1
+    counts = sparse.csr_matrix(
+        (np.ones(len(rows)), (np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64))),
+        shape=(sentence, next_column)
+    )
+    overlap = (counts @ counts.T).tocoo()
+
+    log_lengths = np.log(np.maximum(np.array(sentence_lengths, dtype=float), 1.0))
+    norm = log_lengths[overlap.row] + log_lengths[overlap.col]
+    # Two one-word sentences have a norm of zero; Sumy then uses the raw overlap.
+    single = np.isclose(norm, 0.0)
+    data = np.where(single, overlap.data, overlap.data / np.where(single, 1.0, norm))
+    weights = sparse.csr_matrix((data, (overlap.row, overlap.col)), shape=overlap.shape)
+
+    row_sums = np.asarray(weights.sum(axis=1)).ravel()
+    weights = sparse.diags(1.0 / (row_sums + ZERO_DIVISION_PREVENTION)) @ weights
+    return weights.tocsr(), np.array([len(words_per_sentence) for words_per_sentence in documents], dtype=np.int64)
+
+def pagerank(weights, lengths, damping=DAMPING, epsilon=EPSILON):
+    """
+    Power iteration over the block-diagonal graph, with every document stepping in the same sparse
+    product. As in Sumy, each step is p ← (1 - d)/n · Σp + d · Wᵀp, and a document stops once its
+    step changes p by at most epsilon (Euclidean norm); converged documents are frozen while the
+    rest keep iterating. Returns the rank of every sentence, documents concatenated.
+    """
+    document = np.repeat(np.arange(len(lengths)), lengths)
+    sizes = lengths[document].astype(float)
+    ranks = 1.0 / sizes
+    active = lengths > 0
+    # Sentences still iterated, and the graph restricted to them. The graph is only cut down once
+    # half of them have converged; until then converged documents are computed but not written.
+    live = np.arange(len(document))
+    transposed = weights.T.tocsr()
+    while live.size:
+        live_document = document[live]
+        previous = ranks[live]
+        totals = np.bincount(live_document, weights=previous, minlength=len(lengths))
+        step = (1.0 - damping) / sizes[live] * totals[live_document] + damping * (transposed @ previous)
+        change = np.sqrt(np.bincount(live_document, weights=(step - previous) ** 2, minlength=len(lengths)))
+        moving = active[live_document]
+        ranks[live[moving]] = step[moving]
+        active &= change > epsilon
+        remaining = active[live_document]
+        if remaining.sum() <= live.size // 2:
+            live = live[remaining]
+            transposed = transposed[remaining][:, remaining]
+    return ranks
+
+
+# =======================================
+# Summaries
+# =======================================
+
+def best_sentences(sentences, ranks, count):
+    """
+    The count best-ranked sentences in document order. Ties keep document order and repeated
+    sentences share one rating, both as in Sumy.
+    """
+    ratings = dict(zip(sentences, ranks))
+    best = sorted(range(len(sentences)), key=lambda i: ratings[sentences[i]], reverse=True)[:count]
+    return [sentences[i] for i in sorted(best)]
+
+def weighted_sentences(text, parts):
+    """
+    Sentences of a text given as (piece, weight) parts, such as resume sections, and the weight
+    of every sentence. Parts weighted 0 are left out; if nothing is left, the whole text is used.
+    """
+    sentences, weights = [], []
+    for piece, weight in parts:
+        if weight <= 0:
+            continue
+        piece_sentences = document_sentences(piece)
+        sentences.extend(piece_sentences)
+        weights.extend([weight] * len(piece_sentences))
+    if not sentences:
+        sentences = document_sentences(text)
+        weights = [1.0] * len(sentences)
+    return sentences, weights
+
+def summarize_documents(texts, sentence_count, exact_words=False, weighted_parts=None):
+    """
+    TextRank summaries of a batch of texts, ranked together in one sparse graph.
+    weighted_parts optionally gives, per text, the (piece, weight) parts it is split into: the
+    parts are parsed separately and each sentence's rank is multiplied by its part's weight
+    before the best sentences are picked.
+    Returns one summary string per text, made of its best sentences joined by spaces.
+    """
+    if weighted_parts is None:
+        documents = [document_sentences(text) for text in texts]
+        sentence_weights = None
+    else:
+        documents, sentence_weights = zip(*(weighted_sentences(text, parts) for text, parts in zip(texts, weighted_parts)))
+    weights, lengths = similarity_matrix(
+        [[sentence_words(sentence, exact_words) for sentence in sentences] for sentences in documents]
+    )
+    ranks = np.split(pagerank(weights, lengths), np.cumsum(lengths)[:-1])
+    if sentence_weights is not None:
+        ranks = [document_ranks * np.array(document_weights) for document_ranks, document_weights in zip(ranks, sentence_weights)]
+    return [
+        " ".join(str(sentence) for sentence in best_sentences(sentences, document_ranks, sentence_count))
+        for sentences, document_ranks in zip(documents, ranks)
+    ]